@@ -1,15 +1,26 @@
-from fastapi import APIRouter, HTTPException, Query, Request  # 导入FastAPI组件
+from fastapi import APIRouter, HTTPException, Query, Request, Response  # 导入FastAPI组件
 
 from app.api.models.APIResponseModel import ErrorResponseModel, ResponseModel  # 导入响应模型
 from crawlers.bilibili.web.web_crawler import BilibiliWebCrawler  # 导入哔哩哔哩web爬虫
+from crawlers.utils.availability import check_bilibili_detail  # 导入作品可用性校验
+from crawlers.utils.cache import cache_headers, metadata_cache  # 导入元数据缓存
 
 router = APIRouter()
 BilibiliWebCrawler = BilibiliWebCrawler()
 
 
+async def _fetch_one_video(bv_id: str) -> dict:
+    # 作品确定不可用时抛出异常，由缓存写入负缓存/Raise for unavailable posts so the cache stores a negative entry
+    return check_bilibili_detail(await BilibiliWebCrawler.fetch_one_video(bv_id), bv_id)
+
+
 # 获取单个视频详情信息
 @router.get("/fetch_one_video", response_model=ResponseModel, summary="获取单个视频详情信息/Get single video data")
-async def fetch_one_video(request: Request, bv_id: str = Query(example="BV1M1421t7hT", description="作品id/Video id")):
+async def fetch_one_video(
+    request: Request,
+    response: Response,
+    bv_id: str = Query(example="BV1M1421t7hT", description="作品id/Video id"),
+):
     """
     # [中文]
     ### 用途:
@@ -31,7 +42,10 @@ async def fetch_one_video(request: Request, bv_id: str = Query(example="BV1M1421
     bv_id = "BV1M1421t7hT"
     """
     try:
-        data = await BilibiliWebCrawler.fetch_one_video(bv_id)
+        data = await metadata_cache.get_or_load(
+            ("bilibili_web", bv_id), lambda: _fetch_one_video(bv_id)
+        )
+        response.headers.update(cache_headers())
         return ResponseModel(code=200, router=request.url.path, data=data)
     except Exception:
         status_code = 400
@@ -1,18 +1,27 @@
 from typing import List
 
-from fastapi import APIRouter, Body, HTTPException, Query, Request  # 导入FastAPI组件
+from fastapi import APIRouter, Body, HTTPException, Query, Request, Response  # 导入FastAPI组件
 
 from app.api.models.APIResponseModel import ErrorResponseModel, ResponseModel  # 导入响应模型
 from crawlers.douyin.web.web_crawler import DouyinWebCrawler  # 导入抖音Web爬虫
+from crawlers.utils.availability import check_douyin_detail  # 导入作品可用性校验
+from crawlers.utils.cache import cache_headers, metadata_cache  # 导入元数据缓存
 
 router = APIRouter()
 DouyinWebCrawler = DouyinWebCrawler()
 
 
+async def _fetch_one_video(aweme_id: str) -> dict:
+    # 作品确定不可用时抛出异常，由缓存写入负缓存/Raise for unavailable posts so the cache stores a negative entry
+    return check_douyin_detail(await DouyinWebCrawler.fetch_one_video(aweme_id), aweme_id)
+
+
 # 获取单个作品数据
 @router.get("/fetch_one_video", response_model=ResponseModel, summary="获取单个作品数据/Get single video data")
 async def fetch_one_video(
-    request: Request, aweme_id: str = Query(example="7372484719365098803", description="作品id/Video id")
+    request: Request,
+    response: Response,
+    aweme_id: str = Query(example="7372484719365098803", description="作品id/Video id"),
 ):
     """
     # [中文]
@@ -35,7 +44,10 @@ async def fetch_one_video(
     aweme_id = "7372484719365098803"
     """
     try:
-        data = await DouyinWebCrawler.fetch_one_video(aweme_id)
+        data = await metadata_cache.get_or_load(
+            ("douyin_web", aweme_id), lambda: _fetch_one_video(aweme_id)
+        )
+        response.headers.update(cache_headers())
         return ResponseModel(code=200, router=request.url.path, data=data)
     except Exception:
         status_code = 400
@@ -854,7 +866,7 @@ async def get_all_sec_user_id(
      ### 参数:
      - url: 用户主页链接列表
      ### 返回:
-     - 用户sec_user_id列表
+     - 用户sec_user_id列表（按输入顺序逐项返回 input/success/data/error，单个链接失败不影响其余链接）
 
      # [English]
      ### Purpose:
@@ -862,7 +874,7 @@ async def get_all_sec_user_id(
      ### Parameters:
      - url: User homepage link list
      ### Return:
-     - User sec_user_id list
+     - User sec_user_id list (per-item input/success/data/error entries in input order; one failed link does not fail the batch)
 
      # [示例/Example]
      ```json
@@ -947,7 +959,7 @@ async def get_all_aweme_id(
      ### 参数:
      - url: 作品链接列表
      ### 返回:
-     - 作品id列表
+     - 作品id列表（按输入顺序逐项返回 input/success/data/error，单个链接失败不影响其余链接）
 
      # [English]
      ### Purpose:
@@ -955,7 +967,7 @@ async def get_all_aweme_id(
      ### Parameters:
      - url: Video link list
      ### Return:
-     - Video id list
+     - Video id list (per-item input/success/data/error entries in input order; one failed link does not fail the batch)
 
      # [示例/Example]
      ```json
@@ -1041,7 +1053,7 @@ async def get_all_webcast_id(
     ### 参数:
     - url: 直播间链接列表
     ### 返回:
-    - 直播间号列表
+    - 直播间号列表（按输入顺序逐项返回 input/success/data/error，单个链接失败不影响其余链接）
 
     # [English]
     ### Purpose:
@@ -1049,7 +1061,7 @@ async def get_all_webcast_id(
     ### Parameters:
     - url: Room link list
     ### Return:
-    - Room id list
+    - Room id list (per-item input/success/data/error entries in input order; one failed link does not fail the batch)
 
     # [示例/Example]
     ```json
@@ -1,29 +1,44 @@
 import asyncio
+import hashlib
 import os
 import re
 import tempfile
 import time
 import zipfile
+from contextlib import AsyncExitStack
+from email.utils import formatdate
 from pathlib import Path
+from typing import Callable
 
 import aiofiles
+import anyio
 import httpx
 import yaml
 from fastapi import APIRouter, HTTPException, Query, Request  # 导入FastAPI组件
-from starlette.responses import FileResponse
+from starlette.responses import PlainTextResponse, RedirectResponse, StreamingResponse
 from werkzeug.utils import secure_filename
 
-from app.api.models.APIResponseModel import ErrorResponseModel  # 导入响应模型
+from app.api.models.APIResponseModel import ErrorResponseModel, ResponseModel  # 导入响应模型
+from app.download import atomic, resume  # 导入原子发布与完整性标记、断点续传
+from app.download.bandwidth import BandwidthShaper  # 导入下载带宽调度
+from app.download.conditional import cached_file_response  # 导入条件请求与字节区间响应
+from app.download.offload import offload_response  # 导入前置代理文件发送卸载
+from app.download.disk_cache import DownloadCache  # 导入下载目录LRU缓存
+from app.download.ffmpeg_pool import FFmpegPool, FFmpegQueueFullError  # 导入FFmpeg工作池
+from app.download.jobs import STATUS_DONE, DownloadJob, DownloadJobManager, JobQueueFullError  # 导入后台下载任务
+from app.download.metrics import DownloadMetrics  # 导入下载流程指标
+from app.download.single_flight import InFlightTransfer, SingleFlight, TransferStalledError  # 导入同文件下载合并
+from app.download.storage import create_storage  # 导入下载存储后端
+from app.download.streaming import ClosingStreamingResponse  # 导入发送结束后必定清理的流式响应
 from crawlers.hybrid.hybrid_crawler import HybridCrawler  # 导入混合数据爬虫
-from crawlers.utils.logger import logger
+from crawlers.utils.cache import parse_url_expiry
+from crawlers.utils.logger import log_metric, logger
+from crawlers.utils.url_router import route_url
 from crawlers.utils.utils import extract_valid_urls
 
 router = APIRouter()
 HybridCrawler = HybridCrawler()
 
-# FFmpeg 合并并发控制（作为简单队列，限制同时仅运行一个合并任务）
-_ffmpeg_sem = asyncio.Semaphore(1)
-
 # 读取上级再上级目录的配置文件
 config_path = os.path.join(
     os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))),
@@ -33,6 +48,40 @@ config_path = os.path.join(
 with open(config_path, "r", encoding="utf-8") as file:
     config = yaml.safe_load(file)
 
+# FFmpeg 合并工作池（并发数与队列长度由配置决定）/FFmpeg merge worker pool sized from config
+ffmpeg_pool = FFmpegPool.from_config(config.get("API", {}).get("FFmpeg"))
+
+# 下载流程指标（按平台与媒体类型的直方图，/api/download/metrics 导出）/Download pipeline metrics exported at /api/download/metrics
+download_metrics = DownloadMetrics()
+
+# 下载带宽调度（全局与单客户端限速、公平分配）/Download bandwidth shaping with global and per-client caps
+bandwidth = BandwidthShaper.from_config(config.get("API", {}).get("Download_Bandwidth"))
+
+# 同一目标文件的并发下载只访问一次上游/Concurrent downloads of one target file share a single upstream transfer
+single_flight = SingleFlight()
+
+# 下载存储后端（flat 平铺目录 / cas 内容寻址），按下载根目录缓存实例/Storage backends cached per download root
+_storages: dict = {}
+
+
+def _storage():
+    """当前下载根目录对应的存储后端 (Storage backend for the current download root)"""
+    cfg = config.get("API", {}).get("Download_Storage") or {}
+    key = (_norm_path(config.get("API").get("Download_Path")), str(cfg.get("Backend", "flat")).lower())
+    if key not in _storages:
+        _storages[key] = create_storage(cfg, key[0])
+    return _storages[key]
+
+
+# 下载目录有界 LRU 缓存，传输中的文件不会被淘汰/Bounded LRU cache over Download_Path; in-flight files are never evicted
+download_cache = DownloadCache.from_config(
+    config.get("API", {}).get("Download_Cache"),
+    root=config.get("API", {}).get("Download_Path", "./download"),
+    is_busy=lambda path: single_flight.get(path) is not None,
+    remove=lambda path: _storage().remove(path),
+    partial_max_age=float((config.get("API", {}).get("Download_Resume") or {}).get("Max_Age", 86400)),
+)
+
 
 def _norm_path(p: str) -> str:
     return os.path.realpath(os.path.normpath(p))
@@ -134,66 +183,83 @@ def _is_allowed_download_url(platform: str, url: str) -> bool:
         return False
 
 
-async def _safe_get(url: str, platform: str, headers: dict | None = None) -> httpx.Response:
-    sec = bool(config.get("API", {}).get("Security", {}).get("StrictValidation", True))
-    if not sec:
-        async with httpx.AsyncClient(trust_env=True, follow_redirects=True, timeout=httpx.Timeout(30)) as client:
-            response = await client.get(url, headers=headers)
-            response.raise_for_status()
-            return response
-    # 就地校验并重建安全URL，增强静态分析可见性
+# 手动跟随重定向的最大跳数/Maximum number of manually followed redirect hops
+_MAX_REDIRECTS = 10
+
+
+def _download_client(sec: bool, **kwargs) -> httpx.AsyncClient:
+    """
+    创建下载用HTTP客户端，严格模式下禁用环境代理；重定向一律由调用方逐跳处理
+    (Create the download HTTP client; env proxies are disabled in strict mode and redirects are always handled hop by hop)
+    """
+    kwargs.setdefault("timeout", httpx.Timeout(30))
+    return httpx.AsyncClient(trust_env=not sec, follow_redirects=False, **kwargs)
+
+
+def _safe_url(url: str) -> str:
+    """使用IDNA主机名重建URL/Rebuild the URL with the IDNA hostname"""
     from urllib.parse import urlparse
-    import socket
-    import ipaddress
     p = urlparse(url)
-    if p.scheme != "https":
-        raise HTTPException(status_code=400, detail=_strict_msg(platform, "仅允许HTTPS", p.hostname or ""))
-    if p.port not in (None, 443):
-        raise HTTPException(status_code=400, detail=_strict_msg(platform, "仅允许标准端口443", p.hostname or ""))
-    if p.username or p.password:
-        raise HTTPException(status_code=400, detail=_strict_msg(platform, "URL包含用户名/密码信息", p.hostname or ""))
-    host = (p.hostname or "").lower().rstrip('.')
-    try:
-        host_ascii = host.encode('idna').decode('ascii')
-    except Exception:
-        raise HTTPException(status_code=400, detail=_strict_msg(platform, "域名IDNA解析失败", host))
-    allow = (
-        config.get("API", {})
-        .get("AllowedDomains", {})
-        .get("download", {})
-        .get(platform, [])
-    )
-    if not any(host_ascii == a.lstrip('.') or host_ascii.endswith(a) for a in allow):
-        raise HTTPException(status_code=400, detail=_strict_msg(platform, "域名不在白名单", host))
-    try:
-        infos = socket.getaddrinfo(host_ascii, None)
-        addrs = {i[4][0] for i in infos if i and i[4]}
-        for addr in addrs:
-            ip_obj = ipaddress.ip_address(addr)
-            if (
-                ip_obj.is_private
-                or ip_obj.is_loopback
-                or ip_obj.is_reserved
-                or ip_obj.is_link_local
-                or ip_obj.is_multicast
-            ):
-                raise HTTPException(status_code=400, detail=_strict_msg(platform, "DNS解析到私网/保留地址", host, list(addrs)))
-    except Exception:
-        raise HTTPException(status_code=400, detail=_strict_msg(platform, "DNS解析失败", host))
-    safe_url = f"https://{host_ascii}{p.path or '/'}" + (f"?{p.query}" if p.query else "")
-    async with httpx.AsyncClient(trust_env=False, follow_redirects=True, timeout=httpx.Timeout(30)) as client:
-        response = await client.get(safe_url, headers=headers)
-        chain = list(response.history) + [response]
-        for r in chain:
-            if not _is_allowed_download_url(platform, str(r.url)):
-                from urllib.parse import urlparse as _up
-                _ru = _up(str(r.url))
-                raise HTTPException(status_code=400, detail=_strict_msg(platform, "重定向目标不在白名单", host=_ru.hostname or ""))
+    host_ascii = (p.hostname or "").lower().rstrip('.').encode('idna').decode('ascii')
+    return f"https://{host_ascii}{p.path or '/'}" + (f"?{p.query}" if p.query else "")
+
+
+async def _send_validated(
+    client: httpx.AsyncClient,
+    url: str,
+    platform: str,
+    sec: bool,
+    headers: dict | None = None,
+    method: str = "GET",
+    media_type: str = "video",
+) -> httpx.Response:
+    """
+    逐跳跟随重定向并在发起下一跳请求前校验目标，返回尚未读取响应体的流式响应
+    (Follow redirects hop by hop, validating each target before requesting it; returns an unread streaming response)
+
+    GET 请求从首跳到最终响应头到达的耗时记为上游 TTFB (For GET, the time until the final response headers arrive
+    is recorded as the upstream TTFB)
+
+    调用方负责关闭返回的响应/The caller must close the returned response.
+    """
+    from urllib.parse import urljoin, urlparse
+    if sec:
+        if not _is_allowed_download_url(platform, url):
+            raise HTTPException(status_code=400, detail=_strict_msg(platform, "初始URL不在白名单", host=urlparse(url).hostname or ""))
+        url = _safe_url(url)
+    start = time.perf_counter()
+    for _ in range(_MAX_REDIRECTS + 1):
+        request = client.build_request(method, url, headers=headers)
+        response = await client.send(request, stream=True, follow_redirects=False)
+        if not response.is_redirect:
+            if method == "GET":
+                download_metrics.ttfb.observe(time.perf_counter() - start, platform=platform, media_type=media_type)
+            return response
+        # 不读取重定向响应体，直接关闭/Close the redirect response without reading its body
+        await response.aclose()
+        url = urljoin(str(response.url), response.headers.get("location", ""))
+        if sec:
+            if not _is_allowed_download_url(platform, url):
+                raise HTTPException(status_code=400, detail=_strict_msg(platform, "重定向目标不在白名单", host=urlparse(url).hostname or ""))
+            url = _safe_url(url)
+    raise HTTPException(status_code=400, detail=_strict_msg(platform, "重定向次数过多", host=urlparse(url).hostname or ""))
+
+
+async def _safe_get(
+    url: str, platform: str, headers: dict | None = None, media_type: str = "video"
+) -> httpx.Response:
+    sec = bool(config.get("API", {}).get("Security", {}).get("StrictValidation", True))
+    async with _download_client(sec) as client:
+        response = await _send_validated(client, url, platform, sec, headers=headers, media_type=media_type)
+        try:
+            await response.aread()
+        finally:
+            await response.aclose()
         response.raise_for_status()
         return response
 
 
-async def fetch_data(url: str, platform: str, headers: dict = None):
+async def fetch_data(url: str, platform: str, headers: dict = None, media_type: str = "video"):
     headers = (
         {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
@@ -201,11 +267,26 @@ async def fetch_data(url: str, platform: str, headers: dict = None):
         if headers is None
         else headers.get("headers")
     )
-    return await _safe_get(url, platform, headers=headers)
+    return await _safe_get(url, platform, headers=headers, media_type=media_type)
 
 
 # 下载视频专用
-async def fetch_data_stream(url: str, platform: str, request: Request, headers: dict = None, file_path: str = None):
+async def fetch_data_stream(
+    url: str, platform: str, request: Request | None, headers: dict = None, file_path: str = None, progress=None
+):
+    """
+    下载视频到文件 (Download a video to a file)
+
+    启用断点续传（API.Download_Resume）时，未完成的下载保留为 <file>.partial 与进度日志，
+    再次请求同一目标或上游连接中途断开时以 Range 续传；源站不支持区间或校验值变化时才重新完整下载。
+    (With API.Download_Resume enabled, unfinished downloads are kept as <file>.partial plus a progress journal
+    and resumed with a Range request when the target is requested again or the upstream connection drops;
+    a full download happens only when the origin rejects ranges or the validator changed.)
+
+    Args:
+        request (Request | None): 用于检测客户端断开，后台任务传 None (Used to detect disconnects, None for background jobs)
+        progress (DownloadJob | None): 进度汇报对象，提供 add_progress(done, total) (Progress sink providing add_progress)
+    """
     headers = (
         {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
@@ -214,124 +295,663 @@ async def fetch_data_stream(url: str, platform: str, request: Request, headers:
         else headers.get("headers")
     )
     sec = bool(config.get("API", {}).get("Security", {}).get("StrictValidation", True))
-    if sec and not _is_allowed_download_url(platform, url):
-        from urllib.parse import urlparse as _up
-        _pu = _up(url)
-        raise HTTPException(status_code=400, detail=_strict_msg(platform, "初始URL不在白名单", host=_pu.hostname or ""))
-    async with httpx.AsyncClient(
-        trust_env=not sec,
+    resume_cfg = config.get("API", {}).get("Download_Resume", {}) or {}
+    resumable = bool(resume_cfg.get("Enabled", True))
+    attempts = 1 + max(0, int(resume_cfg.get("Retries", 2))) if resumable else 1
+    async with _download_client(
+        sec,
         timeout=httpx.Timeout(60),
         limits=httpx.Limits(max_connections=10, max_keepalive_connections=5),
-        follow_redirects=True,
     ) as client:
-        # 预检以解析最终URL并校验重定向链路（仅严格模式）
-        from urllib.parse import urlparse
-        import socket
-        import ipaddress
-        p = urlparse(url)
-        if sec and (p.scheme != "https" or p.port not in (None, 443) or p.username or p.password):
-            raise HTTPException(status_code=400, detail=_strict_msg(platform, "仅允许HTTPS且标准端口，无用户信息", host=p.hostname or ""))
-        host = (p.hostname or "").lower().rstrip('.')
-        try:
-            host_ascii = host.encode('idna').decode('ascii')
-        except Exception:
+        for attempt in range(attempts):
+            result = await _fetch_stream_once(
+                client, url, platform, sec, request, headers, file_path, progress, resumable, resume_cfg
+            )
+            if result is not None:
+                return result
+            logger.info("Upstream interrupted, resuming %s (attempt %s/%s)", file_path, attempt + 2, attempts)
+        return False
+
+
+async def _fetch_stream_once(
+    client: httpx.AsyncClient,
+    url: str,
+    platform: str,
+    sec: bool,
+    request: Request | None,
+    headers: dict | None,
+    file_path: str,
+    progress,
+    resumable: bool,
+    resume_cfg: dict,
+) -> bool | None:
+    """
+    执行一次（续传）下载 (Run one, possibly resumed, download attempt)
+
+    Returns:
+        bool | None: 完成或失败；上游中途断开且已保存续传进度时返回 None，调用方可立即续传
+        (Done or failed; None when the upstream dropped mid-transfer and resumable progress was saved)
+    """
+    journal = resume.load(file_path, float(resume_cfg.get("Max_Age", 86400))) if resumable else None
+    if resumable:
+        # 部分文件在传输期间不计入缓存，结束时按保留下来的大小重新登记/Partials are re-registered when kept
+        download_cache.forget(resume.partial_path(_norm_path(file_path)))
+    request_headers = dict(headers or {})
+    if journal is not None:
+        request_headers.update(resume.range_headers(journal))
+    fetch_start = time.perf_counter()
+    # 逐跳校验重定向链路，只读取一次最终响应体/Validate redirects hop by hop and read the final body exactly once
+    response = await _send_validated(client, url, platform, sec, headers=request_headers)
+    try:
+        offset = 0
+        if journal is not None:
+            offset = resume.resume_offset(journal, response)
+            if offset is None:
+                # 源站拒绝区间或校验值变化，重新完整下载/Range rejected or validator changed, start over
+                logger.info("Cannot resume %s (status %s), downloading from scratch", file_path, response.status_code)
+                resume.discard(file_path)
+                await response.aclose()
+                response = await _send_validated(client, url, platform, sec, headers=headers)
+                offset = 0
+            if not offset:
+                journal = None
+        response.raise_for_status()
+
+        # 流式保存文件
+        root_path = _norm_path(config.get("API").get("Download_Path"))
+        temp_root = _norm_path(tempfile.gettempdir())
+        allowed_roots = [root_path, temp_root]
+        file_path = _norm_path(file_path)
+        if not _is_under_any(file_path, allowed_roots):
             return False
-        allow = (
-            config.get("API", {})
-            .get("AllowedDomains", {})
-            .get("download", {})
-            .get(platform, [])
-        )
-        if sec and not any(host_ascii == a.lstrip('.') or host_ascii.endswith(a) for a in allow):
-            raise HTTPException(status_code=400, detail=_strict_msg(platform, "域名不在白名单", host_ascii))
+        import os as _os
+        full = _norm_path(file_path)
+        bases = [
+            _norm_path(root_path),
+            _norm_path(temp_root),
+        ]
+        if not any(_os.path.commonpath([full, b]) == b and full != b for b in bases):
+            return False
+        checks = journal if journal is not None else (resume.validator(response) if resumable else None)
+        if progress is not None and "content-encoding" not in response.headers:
+            length = response.headers.get("content-length", "")
+            progress.add_progress(done=offset, total=offset + int(length) if length.isdigit() else 0)
+        # 大文件且源站支持 Range 时分段并发下载/Segmented concurrent download for large range-capable files
+        plan = _segment_plan(response) if not offset else []
+        if plan:
+            return await _fetch_segmented(
+                client, response, platform, sec, headers, file_path, plan, request, progress
+            )
+        # 可续传时写入固定的部分文件，否则写入同目录临时文件；完整后原子发布
+        # (Write the fixed partial file when resumable, a unique temp file otherwise; publish atomically once complete)
+        part_path = resume.partial_path(file_path) if checks is not None else atomic.temp_path(file_path)
+        expected = None
+        if "content-encoding" not in response.headers and response.headers.get("content-length", "").isdigit():
+            expected = offset + int(response.headers["content-length"])
+        digest = await anyio.to_thread.run_sync(resume.hash_prefix, part_path, offset) if offset else hashlib.sha256()
+        size = saved = offset
+        interval = max(65536, int(resume_cfg.get("Journal_Interval", 4 * 1024 * 1024)))
+        complete = interrupted = False
         try:
-            infos = socket.getaddrinfo(host_ascii, None)
-            addrs = {i[4][0] for i in infos if i and i[4]}
-            for addr in addrs:
-                ip_obj = ipaddress.ip_address(addr)
-                if (
-                    ip_obj.is_private
-                    or ip_obj.is_loopback
-                    or ip_obj.is_reserved
-                    or ip_obj.is_link_local
-                    or ip_obj.is_multicast
-                ):
-                    if sec:
-                        raise HTTPException(status_code=400, detail=_strict_msg(platform, "DNS解析到私网/保留地址", host_ascii, list(addrs)))
-        except Exception:
-            if sec:
-                raise HTTPException(status_code=400, detail=_strict_msg(platform, "DNS解析失败", host_ascii))
-        safe_url = f"https://{host_ascii}{p.path or '/'}" + (f"?{p.query}" if p.query else "")
-        preflight = await client.get(safe_url if sec else url, headers=headers)
-        chain = list(preflight.history) + [preflight]
-        if sec:
-            for r in chain:
-                if not _is_allowed_download_url(platform, str(r.url)):
-                    from urllib.parse import urlparse as _up
-                    _ru = _up(str(r.url))
-                    raise HTTPException(status_code=400, detail=_strict_msg(platform, "重定向目标不在白名单", host=_ru.hostname or ""))
-        final_url = str(preflight.url)
-        async with client.stream("GET", final_url if sec else url, headers=headers, follow_redirects=not sec) as response:
-            response.raise_for_status()
-
-            # 流式保存文件
-            root_path = _norm_path(config.get("API").get("Download_Path"))
-            temp_root = _norm_path(tempfile.gettempdir())
-            allowed_roots = [root_path, temp_root]
-            file_path = _norm_path(file_path)
-            if not _is_under_any(file_path, allowed_roots):
-                return False
-            import os as _os
-            full = _norm_path(file_path)
-            bases = [
-                _norm_path(root_path),
-                _norm_path(temp_root),
-            ]
-            if not any(_os.path.commonpath([full, b]) == b and full != b for b in bases):
-                return False
-            async with aiofiles.open(file_path, "wb") as out_file:
+            async with aiofiles.open(part_path, "ab" if offset else "wb") as out_file:
                 try:
                     async for chunk in response.aiter_bytes(chunk_size=65536):
-                        if await request.is_disconnected():
-                            await out_file.close()
-                            _safe_unlink(file_path, allowed_roots)
+                        if request is not None and await request.is_disconnected():
                             return False
                         await out_file.write(chunk)
-                except Exception:
-                    try:
-                        await out_file.close()
-                    except Exception:
-                        pass
-                    _safe_unlink(file_path, allowed_roots)
-                    return False
+                        digest.update(chunk)
+                        size += len(chunk)
+                        if progress is not None:
+                            progress.add_progress(len(chunk))
+                        if checks is not None and size - saved >= interval:
+                            await out_file.flush()
+                            await anyio.to_thread.run_sync(resume.save, file_path, size, checks)
+                            saved = size
+                except httpx.TransportError as e:
+                    logger.warning("Upstream dropped after %s bytes: %s", size, e)
+                    interrupted = True
+            if interrupted:
+                return None if checks is not None and size > 0 else False
+            if expected is not None and size != expected:
+                logger.warning("Incomplete transfer: %s/%s bytes", size, expected)
+                return False
+            await _publish(part_path, file_path, size, digest.hexdigest())
+            complete = True
+            if checks is not None:
+                await anyio.to_thread.run_sync(resume.discard, file_path)
+            download_metrics.record_fetch(platform, "video", size - offset, time.perf_counter() - fetch_start)
             return True
+        except Exception as e:
+            logger.warning("Download failed: %s", e)
+            return False
+        finally:
+            if not complete:
+                if checks is not None and 0 < size < checks["length"]:
+                    # 保留部分文件与进度，下次请求续传/Keep the partial file and its progress for the next request
+                    resume.save(file_path, size, checks)
+                    download_cache.add(resume.partial_path(file_path), size)
+                elif checks is not None:
+                    resume.discard(file_path)
+                else:
+                    _safe_unlink(part_path, allowed_roots)
+    finally:
+        await response.aclose()
+
+
+def _segment_plan(response: httpx.Response) -> list[tuple[int, int]]:
+    """
+    根据配置与上游响应头规划分段区间，不满足分段条件时返回空列表
+    (Plan byte ranges from config and upstream headers; empty when segmentation does not apply)
+
+    条件：启用分段、上游声明 Accept-Ranges: bytes、无内容编码、Content-Length 不小于 Min_Size。
+    (Requires segmentation enabled, Accept-Ranges: bytes, no content encoding and Content-Length >= Min_Size.)
+
+    仅用于先写入文件再返回的 fetch_data_stream（后台任务、Bilibili 文件合并、关闭边下边传的 /api/download）；
+    边下边传必须按顺序转发字节，不分段。
+    (Only fetch_data_stream, which writes the file before serving it, segments: background jobs, the Bilibili
+    file merge and /api/download with stream-through disabled. Stream-through forwards bytes in order and is
+    never segmented.)
+
+    Returns:
+        list[tuple[int, int]]: 闭区间 [start, end] 列表 (Inclusive [start, end] ranges)
+    """
+    seg_cfg = config.get("API", {}).get("Download_Segments", {}) or {}
+    if not seg_cfg.get("Enabled", True):
+        return []
+    if response.headers.get("accept-ranges", "").lower() != "bytes" or "content-encoding" in response.headers:
+        return []
+    length = response.headers.get("content-length", "")
+    if not length.isdigit():
+        return []
+    size = int(length)
+    if size < int(seg_cfg.get("Min_Size", 8 * 1024 * 1024)):
+        return []
+    min_segment = max(1, int(seg_cfg.get("Min_Segment_Size", 2 * 1024 * 1024)))
+    count = max(1, min(int(seg_cfg.get("Count", 4)), -(-size // min_segment)))
+    if count < 2:
+        return []
+    step = -(-size // count)
+    return [(start, min(start + step, size) - 1) for start in range(0, size, step)]
+
+
+async def _fetch_segmented(
+    client: httpx.AsyncClient,
+    response: httpx.Response,
+    platform: str,
+    sec: bool,
+    headers: dict,
+    file_path: str,
+    plan: list[tuple[int, int]],
+    request: Request | None,
+    progress=None,
+) -> bool:
+    """
+    将文件按字节区间并发下载，按偏移写入预分配文件，最后校验总大小
+    (Download byte ranges concurrently, write them positionally into a preallocated file and verify the size)
+
+    第一段直接复用已打开的响应（读到段尾即关闭），其余段以 Range 请求获取，并携带 If-Range 防止源文件中途变化。
+    (The first segment reuses the already open response; the others use Range requests with If-Range.)
+
+    Returns:
+        bool: 是否下载完整 (Whether the download completed)
+    """
+    size = plan[-1][1] + 1
+    final_url = str(response.url)
+    validator = response.headers.get("etag") or response.headers.get("last-modified")
+    part_path = atomic.temp_path(file_path)
+    fd = os.open(part_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    written = [0] * len(plan)
+
+    async def write_from(resp: httpx.Response, index: int):
+        start, end = plan[index]
+        offset = start
+        async for chunk in resp.aiter_bytes(chunk_size=65536):
+            if request is not None and await request.is_disconnected():
+                raise ConnectionAbortedError("client disconnected")
+            chunk = chunk[: end + 1 - offset]
+            await anyio.to_thread.run_sync(os.pwrite, fd, chunk, offset)
+            offset += len(chunk)
+            if progress is not None:
+                progress.add_progress(len(chunk))
+            if offset > end:
+                break
+        written[index] = offset - start
+
+    async def fetch_range(index: int):
+        start, end = plan[index]
+        range_headers = dict(headers or {})
+        range_headers["Range"] = f"bytes={start}-{end}"
+        if validator:
+            range_headers["If-Range"] = validator
+        resp = await _send_validated(client, final_url, platform, sec, headers=range_headers)
+        try:
+            content_range = resp.headers.get("content-range", "")
+            if resp.status_code != 206 or not content_range.startswith(f"bytes {start}-{end}/"):
+                raise httpx.HTTPStatusError(
+                    f"Range request not honored: {resp.status_code} {content_range}", request=resp.request, response=resp
+                )
+            await write_from(resp, index)
+        finally:
+            await resp.aclose()
+
+    start_time = time.perf_counter()
+    try:
+        # 预分配文件空间，避免并发写入时的碎片与空间不足/Preallocate to avoid fragmentation and late ENOSPC
+        if hasattr(os, "posix_fallocate"):
+            os.posix_fallocate(fd, 0, size)
+        else:
+            os.ftruncate(fd, size)
+
+        async def first_segment():
+            try:
+                await write_from(response, 0)
+            finally:
+                await response.aclose()
+
+        tasks = [asyncio.create_task(first_segment())]
+        tasks.extend(asyncio.create_task(fetch_range(i)) for i in range(1, len(plan)))
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            # 任一段失败或被取消时取消其余段，等全部退出后才关闭 fd，避免向被复用的描述符写入
+            # (When a segment fails or we are cancelled, cancel the rest and wait for them all before the fd is
+            # closed, so no pwrite can reach a reused descriptor)
+            with anyio.CancelScope(shield=True):
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+        complete = sum(written) == size and os.fstat(fd).st_size == size
+    except Exception as e:
+        logger.warning("Segmented download failed: %s", e)
+        complete = False
+    finally:
+        os.close(fd)
+    try:
+        if complete:
+            # 分段乱序写入，摘要在发布时从文件计算/Segments land out of order, so the digest is computed at publish time
+            await _publish(part_path, file_path, size)
+    except Exception as e:
+        logger.warning("Publishing segmented download failed: %s", e)
+        complete = False
+    if not complete:
+        _safe_unlink(part_path, [_norm_path(config.get("API").get("Download_Path")), _norm_path(tempfile.gettempdir())])
+        return False
+    download_metrics.record_fetch(platform, "video", size, time.perf_counter() - start_time)
+    log_metric(
+        f"{platform}_segmented_download",
+        segments=len(plan),
+        elapsed_ms=int((time.perf_counter() - start_time) * 1000),
+        size_bytes=size,
+    )
+    return True
+
+
+async def _publish(part_path: str, file_path: str, size: int, sha256: str | None = None) -> str:
+    """
+    通过存储后端原子发布下载文件并登记到下载缓存，返回可服务的文件路径
+    (Publish a download atomically through the storage backend, register it with the download cache
+    and return the servable path)
+    """
+    served = await anyio.to_thread.run_sync(_storage().commit, part_path, file_path, size, sha256)
+    download_cache.add(served, size)
+    return served
+
+
+def _write_flushed(out_file, chunk: bytes):
+    """写入并刷新，使跟随请求能读到已写入的数据（在工作线程中调用）/Write and flush so followers can read it (runs in a worker thread)"""
+    out_file.write(chunk)
+    out_file.flush()
+
+
+def _aborted(failure: Exception | None) -> BaseException:
+    """领头传输未完成时交给跟随请求的异常/Error handed to followers when the leading transfer did not complete"""
+    return failure or ConnectionAbortedError("The leading download was aborted")
+
+
+def _stall_timeout() -> float | None:
+    """跟随请求等待领头下载无进展的最长秒数，0 表示不限/Seconds a follower waits for a leader without progress, 0 = forever"""
+    timeout = float(config.get("API", {}).get("Download_Stall_Timeout", 120))
+    return timeout if timeout > 0 else None
+
+
+# 下载视频并同时转发给客户端（边下边传）
+async def stream_data_tee(
+    url: str,
+    platform: str,
+    file_path: str,
+    filename: str,
+    media_type: str,
+    headers: dict = None,
+    transfer: InFlightTransfer | None = None,
+) -> StreamingResponse:
+    """
+    将上游响应逐块转发给客户端，同时写入同目录下的临时文件；仅在完整传输后原子替换为缓存文件
+    (Forward upstream chunks to the client while teeing them into a temp file in the same directory;
+    the cache file is published atomically only after a complete transfer)
+
+    背压：StreamingResponse 在每个块发送完成后才拉取下一块，慢客户端会同步减慢上游读取，内存占用恒定为单个块。
+    (Backpressure: StreamingResponse pulls the next chunk only after the previous one was sent, so memory stays at one chunk.)
+
+    Args:
+        url (str): 媒体URL (Media URL)
+        platform (str): 平台名称 (Platform name)
+        file_path (str): 缓存文件路径 (Cache file path)
+        filename (str): 下载文件名 (Download file name)
+        media_type (str): 响应类型 (Response media type)
+        headers (dict): {"headers": {...}} 形式的请求头 (Request headers wrapped as {"headers": {...}})
+        transfer (InFlightTransfer | None): 领头传输登记，供并发请求跟随读取 (Leader registration followers tail)
+
+    Returns:
+        StreamingResponse: 流式响应 (Streaming response)
+    """
+    headers = (
+        {
+            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+        }
+        if headers is None
+        else headers.get("headers")
+    )
+    root_path = _norm_path(config.get("API").get("Download_Path"))
+    file_path = _norm_path(file_path)
+    if not _is_under(root_path, file_path):
+        raise HTTPException(status_code=400, detail="Invalid file path")
+    part_path = atomic.temp_path(file_path)
+
+    sec = bool(config.get("API", {}).get("Security", {}).get("StrictValidation", True))
+    client = _download_client(
+        sec,
+        timeout=httpx.Timeout(60),
+        limits=httpx.Limits(max_connections=10, max_keepalive_connections=5),
+    )
+    # 在返回响应前打开上游，使上游错误仍能以普通错误响应返回/Open upstream before responding so its errors are reported normally
+    try:
+        response = await _send_validated(client, url, platform, sec, headers=headers)
+        if response.is_error:
+            await response.aclose()
+            response.raise_for_status()
+    except BaseException as e:
+        await client.aclose()
+        if transfer is not None:
+            transfer.finish(e)
+        raise
+
+    async def release():
+        # 响应体从未开始迭代（客户端提前断开）时同样释放上游连接并结束传输/Also runs when the body never started
+        if transfer is not None:
+            transfer.finish(_aborted(None))
+        await response.aclose()
+        await client.aclose()
+
+    expected = None
+    if "content-encoding" not in response.headers and response.headers.get("content-length", "").isdigit():
+        expected = int(response.headers["content-length"])
+
+    async def body():
+        complete = False
+        failure = None
+        written = 0
+        digest = hashlib.sha256()
+        start = time.perf_counter()
+        out_file = open(part_path, "wb")
+        if transfer is not None:
+            transfer.start(part_path, expected)
+        try:
+            async for chunk in response.aiter_bytes(chunk_size=65536):
+                await anyio.to_thread.run_sync(_write_flushed, out_file, chunk)
+                digest.update(chunk)
+                written += len(chunk)
+                if transfer is not None:
+                    transfer.advance(len(chunk))
+                yield chunk
+            if expected is not None and written != expected:
+                raise httpx.ReadError(f"Incomplete transfer: {written}/{expected} bytes")
+            out_file.close()
+            await _publish(part_path, file_path, written, digest.hexdigest())
+            complete = True
+            download_metrics.record_fetch(platform, media_type.split("/")[0], written, time.perf_counter() - start)
+            log_metric(
+                f"{platform}_download",
+                output=file_path,
+                mode="stream",
+                elapsed_ms=int((time.perf_counter() - start) * 1000),
+                size_bytes=written,
+            )
+        except Exception as e:
+            failure = e
+            raise
+        finally:
+            # 客户端断开时此处处于取消状态，先同步清理再屏蔽取消关闭连接/Clean up synchronously first, then close under a shield
+            out_file.close()
+            if not complete:
+                _safe_unlink(part_path, [root_path])
+            if transfer is not None:
+                transfer.finish(None if complete else _aborted(failure))
+            with anyio.CancelScope(shield=True):
+                await release()
+
+    response_headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
+    if expected is not None:
+        response_headers["Content-Length"] = str(expected)
+    return ClosingStreamingResponse(body(), on_close=release, media_type=media_type, headers=response_headers)
+
+
+class _ZipChunkSink:
+    """
+    zipfile 的不可寻址输出端，收集写入的字节供流式响应取走
+    (Unseekable output for zipfile that collects written bytes for the streaming response)
+    """
+
+    def __init__(self):
+        self._chunks: list[bytes] = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+async def stream_image_zip(
+    urls: list[str],
+    platform: str,
+    entry_name,
+    zip_file_path: str | None,
+    zip_file_name: str,
+    transfer: InFlightTransfer | None = None,
+) -> StreamingResponse:
+    """
+    并发获取图集图片，按完成顺序写入流式 ZIP（存储模式，不压缩）并发送给客户端，可选同时写入缓存文件
+    (Fetch album images concurrently, write them into a streamed stored ZIP as they complete and send it to the client,
+    optionally teeing it into a cache file)
+
+    内存占用由并发数决定：最多 Image_Concurrency 个下载中的图片加同样数量的待写入图片，与图集大小无关。
+    (Memory is bounded by the concurrency, not by the album size.)
+
+    Args:
+        urls (list[str]): 图片URL列表 (Image URLs)
+        platform (str): 平台名称 (Platform name)
+        entry_name (Callable[[int, str], str]): 根据序号与扩展名生成条目名 (Builds the entry name from index and extension)
+        zip_file_path (str | None): 缓存文件路径，None 表示不缓存 (Cache file path, None disables caching)
+        zip_file_name (str): 下载文件名 (Download file name)
+        transfer (InFlightTransfer | None): 领头传输登记，需同时提供缓存路径 (Leader registration, requires a cache path)
+
+    Returns:
+        StreamingResponse: ZIP 流式响应 (Streaming ZIP response)
+    """
+    if not urls:
+        error = HTTPException(status_code=400, detail="No images to download")
+        if transfer is not None:
+            transfer.finish(error)
+        raise error
+    concurrency = max(1, int(config.get("API", {}).get("Download_Image_Concurrency", 4)))
+    semaphore = asyncio.Semaphore(concurrency)
+    queue: asyncio.Queue = asyncio.Queue(maxsize=concurrency)
+    allowed_ext = {"jpg", "jpeg", "png", "gif", "webp", "bmp"}
+
+    async def fetch_one(index: int, url: str):
+        try:
+            async with semaphore:
+                start = time.perf_counter()
+                response = await fetch_data(url, platform, media_type="image")
+                download_metrics.record_fetch(platform, "image", len(response.content), time.perf_counter() - start)
+            content_type = (response.headers.get("content-type") or "").lower()
+            subtype = content_type.split("/", 1)[1] if "/" in content_type else ""
+            subtype = subtype.split(";")[0].strip()
+            if subtype not in allowed_ext:
+                raise HTTPException(status_code=400, detail="Unsupported content type for image download")
+            name = entry_name(index, subtype)
+            if not _valid_filename(name):
+                raise HTTPException(status_code=400, detail="Invalid filename")
+            await queue.put((name, response.content, None))
+        except Exception as e:
+            await queue.put((None, None, e))
+
+    tasks = [asyncio.create_task(fetch_one(i, u)) for i, u in enumerate(urls)]
+
+    # 等待首张图片完成后再返回响应，使常见的上游错误仍以普通错误响应返回
+    # (Wait for the first image before responding so common upstream errors are reported normally)
+    try:
+        first = await queue.get()
+        if first[2] is not None:
+            raise first[2]
+    except BaseException as e:
+        for task in tasks:
+            task.cancel()
+        if transfer is not None:
+            transfer.finish(e)
+        raise
+
+    root_path = _norm_path(config.get("API").get("Download_Path"))
+    part_path = atomic.temp_path(zip_file_path) if zip_file_path else None
+
+    async def release():
+        # 响应体从未开始迭代（客户端提前断开）时同样取消图片下载并结束传输/Also runs when the body never started
+        if transfer is not None:
+            transfer.finish(_aborted(None))
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def body():
+        complete = False
+        failure = None
+        digest = hashlib.sha256()
+        sink = _ZipChunkSink()
+        out_file = await anyio.to_thread.run_sync(open, part_path, "wb") if part_path else None
+        if transfer is not None:
+            transfer.start(part_path)
+        start = time.perf_counter()
+        size = 0
+        try:
+            with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_STORED) as zf:
+                item = first
+                for received in range(len(urls)):
+                    if received:
+                        item = await queue.get()
+                    name, content, error = item
+                    if error is not None:
+                        raise error
+                    info = zipfile.ZipInfo(name, date_time=time.localtime()[:6])
+                    info.compress_type = zipfile.ZIP_STORED
+                    zf.writestr(info, content)
+                    chunk = sink.drain()
+                    if out_file is not None:
+                        await anyio.to_thread.run_sync(_write_flushed, out_file, chunk)
+                        digest.update(chunk)
+                        if transfer is not None:
+                            transfer.advance(len(chunk))
+                    size += len(chunk)
+                    yield chunk
+            # 写出中央目录/Write the central directory
+            chunk = sink.drain()
+            size += len(chunk)
+            if out_file is not None:
+                await anyio.to_thread.run_sync(_write_flushed, out_file, chunk)
+                out_file.close()
+                digest.update(chunk)
+                if transfer is not None:
+                    transfer.advance(len(chunk))
+                await _publish(part_path, zip_file_path, size, digest.hexdigest())
+            complete = True
+            yield chunk
+            log_metric(
+                f"{platform}_image_zip",
+                images=len(urls),
+                elapsed_ms=int((time.perf_counter() - start) * 1000),
+                size_bytes=size,
+            )
+        except Exception as e:
+            failure = e
+            raise
+        finally:
+            if out_file is not None:
+                out_file.close()
+                if not complete:
+                    _safe_unlink(part_path, [root_path])
+            if transfer is not None:
+                transfer.finish(None if complete else _aborted(failure))
+            with anyio.CancelScope(shield=True):
+                await release()
+
+    return ClosingStreamingResponse(
+        body(),
+        on_close=release,
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="{zip_file_name}"'},
+    )
 
 
 async def merge_bilibili_video_audio(
-    video_url: str, audio_url: str, request: Request, output_path: str, headers: dict
+    video_url: str, audio_url: str, request: Request | None, output_path: str, headers: dict, progress=None
 ) -> bool:
     """
     下载并合并 Bilibili 的视频流和音频流
+
+    request 为 None 时不检测客户端断开（后台任务）；progress 用于汇报下载字节数与合并阶段。
+    (request is None for background jobs; progress receives byte counts and the merging stage.)
+
+    音视频流与 ffmpeg 输出都写在目标文件同目录的临时文件中，合并成功后原子发布。
+    (Streams and the ffmpeg output live in temp files next to the target and the result is published atomically.)
     """
+    # 临时文件与目标文件同目录，保证 rename 在同一文件系统内/Temp files share the target's directory and filesystem
+    # 音视频流路径固定，中断后再次请求可断点续传/Fixed stream paths so an interrupted merge can resume its downloads
+    video_temp_path = f"{output_path}.video.m4v"
+    audio_temp_path = f"{output_path}.audio.m4a"
+    merged_temp_path = atomic.temp_path(output_path, "part")
     try:
-        # 创建临时文件
-        with tempfile.NamedTemporaryFile(suffix=".m4v", delete=False) as video_temp:
-            video_temp_path = video_temp.name
-        with tempfile.NamedTemporaryFile(suffix=".m4a", delete=False) as audio_temp:
-            audio_temp_path = audio_temp.name
-
-        # 下载视频流
-        video_success = await fetch_data_stream(video_url, "bilibili", request, headers={"headers": headers}, file_path=video_temp_path)
-        # 下载音频流
-        audio_success = await fetch_data_stream(audio_url, "bilibili", request, headers={"headers": headers}, file_path=audio_temp_path)
+        # 并发下载视频流与音频流
+        video_task = asyncio.ensure_future(
+            fetch_data_stream(
+                video_url, "bilibili", request, headers={"headers": headers}, file_path=video_temp_path, progress=progress
+            )
+        )
+        audio_task = asyncio.ensure_future(
+            fetch_data_stream(
+                audio_url, "bilibili", request, headers={"headers": headers}, file_path=audio_temp_path, progress=progress
+            )
+        )
+        try:
+            video_success, audio_success = await asyncio.gather(video_task, audio_task)
+        except BaseException:
+            video_task.cancel()
+            audio_task.cancel()
+            raise
 
         if not video_success or not audio_success:
             print("Failed to download video or audio stream")
             return False
+        if progress is not None:
+            progress.set_stage("merging")
 
         # 使用 FFmpeg 合并视频和音频（异步子进程，避免阻塞）
         ffmpeg_cmd = [
-            "ffmpeg",
+            ffmpeg_pool.binary,
             "-y",
             "-i",
             video_temp_path,
@@ -343,39 +963,576 @@ async def merge_bilibili_video_audio(
             "copy",
             "-f",
             "mp4",
-            output_path,
+            merged_temp_path,
         ]
         logger.info("FFmpeg merge start output=%s", output_path)
-        async with _ffmpeg_sem:
+        merge_start = time.perf_counter()
+        returncode, stderr = await ffmpeg_pool.run(ffmpeg_cmd)
+        download_metrics.merge.observe(time.perf_counter() - merge_start, platform="bilibili", mode="file")
+        logger.info("FFmpeg finished code=%s", returncode)
+        if returncode != 0:
+            if stderr:
+                logger.warning("FFmpeg stderr tail: %s", stderr.decode("utf-8", "replace")[-2000:])
+            return False
+
+        await _publish(merged_temp_path, output_path, os.path.getsize(merged_temp_path))
+        return True
+
+    except FFmpegQueueFullError:
+        raise
+    except Exception as e:
+        logger.error("FFmpeg merge error: %s", e)
+        return False
+    finally:
+        # 清理临时文件（下载的音视频流带有完整性标记，一并删除）/Remove temp files, including the streams' sidecars
+        for temp_path in (video_temp_path, audio_temp_path, merged_temp_path):
+            try:
+                atomic.remove(temp_path)
+            except OSError:
+                pass
+            download_cache.forget(temp_path)
+
+
+def _write_all(fd: int, data: bytes):
+    """阻塞写满管道数据（在工作线程中调用）/Blocking write of the whole buffer to a pipe (runs in a worker thread)"""
+    view = memoryview(data)
+    while view:
+        view = view[os.write(fd, view):]
+
+
+async def stream_bilibili_fmp4(
+    video_url: str,
+    audio_url: str,
+    file_path: str,
+    file_name: str,
+    headers: dict = None,
+    transfer: InFlightTransfer | None = None,
+) -> StreamingResponse:
+    """
+    边下载边合并 Bilibili 音视频：两路下载分别写入管道交给 ffmpeg，ffmpeg 输出分片 MP4 到 stdout 并流式返回
+    (Progressive Bilibili merge: both downloads feed ffmpeg through pipes and its fragmented MP4 stdout is streamed back)
+
+    ffmpeg 使用 -movflags frag_keyframe+empty_moov 输出，无需回写 moov，客户端在下载完成前即可开始播放；
+    输出同时写入同目录临时文件，仅在 ffmpeg 与两路下载都成功后替换为缓存文件。
+    (The output is teed into a temp file that becomes the cache file only after ffmpeg and both downloads succeed.)
+
+    Args:
+        video_url (str): 视频流URL (Video stream URL)
+        audio_url (str): 音频流URL (Audio stream URL)
+        file_path (str): 缓存文件路径 (Cache file path)
+        file_name (str): 下载文件名 (Download file name)
+        headers (dict): 请求头 (Request headers)
+        transfer (InFlightTransfer | None): 领头传输登记，供并发请求跟随读取 (Leader registration followers tail)
+
+    Returns:
+        StreamingResponse: 分片 MP4 流式响应 (Fragmented MP4 streaming response)
+    """
+    root_path = _norm_path(config.get("API").get("Download_Path"))
+    file_path = _norm_path(file_path)
+    if not _is_under(root_path, file_path):
+        raise HTTPException(status_code=400, detail="Invalid file path")
+    part_path = atomic.temp_path(file_path)
+
+    sec = bool(config.get("API", {}).get("Security", {}).get("StrictValidation", True))
+    stack = AsyncExitStack()
+    try:
+        client = _download_client(
+            sec,
+            timeout=httpx.Timeout(60),
+            limits=httpx.Limits(max_connections=10, max_keepalive_connections=5),
+        )
+        stack.push_async_callback(client.aclose)
+        responses = []
+        for stream_url in (video_url, audio_url):
+            response = await _send_validated(client, stream_url, "bilibili", sec, headers=headers)
+            stack.push_async_callback(response.aclose)
+            response.raise_for_status()
+            responses.append(response)
+        # 占用 FFmpeg 工作槽位后再启动进程/Start ffmpeg only after a worker slot is granted
+        job = await stack.enter_async_context(ffmpeg_pool.slot())
+        video_r, video_w = os.pipe()
+        audio_r, audio_w = os.pipe()
+        try:
             process = await asyncio.create_subprocess_exec(
-                *ffmpeg_cmd, stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.PIPE
+                ffmpeg_pool.binary,
+                "-hide_banner",
+                "-loglevel",
+                "error",
+                "-i",
+                f"pipe:{video_r}",
+                "-i",
+                f"pipe:{audio_r}",
+                "-map",
+                "0:v:0",
+                "-map",
+                "1:a:0",
+                "-c",
+                "copy",
+                "-movflags",
+                "frag_keyframe+empty_moov+default_base_moof",
+                "-f",
+                "mp4",
+                "pipe:1",
+                stdin=asyncio.subprocess.DEVNULL,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                pass_fds=(video_r, audio_r),
             )
-            stderr = b""
-            if process.stderr is not None:
-                stderr = await process.stderr.read()
-            returncode = await process.wait()
-        logger.info("FFmpeg finished code=%s", returncode)
-        if stderr:
-            logger.warning("FFmpeg stderr size=%d", len(stderr))
+        except BaseException:
+            os.close(video_w)
+            os.close(audio_w)
+            raise
+        finally:
+            os.close(video_r)
+            os.close(audio_r)
+    except BaseException as e:
+        await stack.aclose()
+        if transfer is not None:
+            transfer.finish(e)
+        raise
 
-        # 清理临时文件
+    # 尚未关闭的管道写端与响应体中启动的任务，由 release 兜底清理
+    # (Pipe write ends still open and tasks started by the body, cleaned up by release)
+    write_fds = {video_w, audio_w}
+    tasks: list[asyncio.Task] = []
+
+    async def feed(response: httpx.Response, fd: int) -> int:
+        fed = 0
         try:
-            os.unlink(video_temp_path)
-            os.unlink(audio_temp_path)
-        except Exception:
-            pass
+            async for chunk in response.aiter_bytes(chunk_size=65536):
+                await anyio.to_thread.run_sync(_write_all, fd, chunk)
+                fed += len(chunk)
+            return fed
+        finally:
+            # 关闭写端，ffmpeg 读到 EOF/Close the write end so ffmpeg sees EOF
+            write_fds.discard(fd)
+            os.close(fd)
 
-        return returncode == 0
+    async def release():
+        # 响应体从未开始迭代（客户端提前断开）时同样释放进程、管道、上游连接与工作槽位
+        # (Also runs when the body never started: frees the process, pipes, upstream connections and worker slot)
+        if transfer is not None:
+            transfer.finish(_aborted(None))
+        if process.returncode is None:
+            process.kill()
+            await process.wait()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        while write_fds:
+            os.close(write_fds.pop())
+        await stack.aclose()
 
-    except Exception as e:
-        # 清理临时文件
+    async def body():
+        complete = False
+        failure = None
+        size = 0
+        digest = hashlib.sha256()
+        start = time.perf_counter()
+        out_file = await anyio.to_thread.run_sync(open, part_path, "wb")
+        if transfer is not None:
+            transfer.start(part_path)
+        stderr_task = asyncio.create_task(ffmpeg_pool.read_tail(process.stderr))
+        feeders = [
+            asyncio.create_task(feed(responses[0], video_w)),
+            asyncio.create_task(feed(responses[1], audio_w)),
+        ]
+        tasks.extend((*feeders, stderr_task))
         try:
-            os.unlink(video_temp_path)
-            os.unlink(audio_temp_path)
-        except Exception:
-            pass
-        logger.error("FFmpeg merge error: %s", e)
+            while True:
+                chunk = await process.stdout.read(65536)
+                if not chunk:
+                    break
+                await anyio.to_thread.run_sync(_write_flushed, out_file, chunk)
+                digest.update(chunk)
+                size += len(chunk)
+                if transfer is not None:
+                    transfer.advance(len(chunk))
+                yield chunk
+            # 任一路下载失败都视为不完整/A failed input stream means an incomplete output
+            fetched = await asyncio.gather(*feeders)
+            job.returncode = await process.wait()
+            job.stderr = await stderr_task
+            if job.returncode != 0:
+                logger.warning("FFmpeg stderr tail: %s", job.stderr.decode("utf-8", "replace")[-2000:])
+                raise RuntimeError(f"ffmpeg exited with code {job.returncode}")
+            out_file.close()
+            await _publish(part_path, file_path, size, digest.hexdigest())
+            complete = True
+            elapsed = time.perf_counter() - start
+            download_metrics.record_fetch("bilibili", "video", sum(fetched), elapsed)
+            download_metrics.merge.observe(elapsed, platform="bilibili", mode="progressive")
+            log_metric(
+                "bilibili_merge",
+                output=file_path,
+                mode="progressive",
+                elapsed_ms=int((time.perf_counter() - start) * 1000),
+                size_bytes=size,
+            )
+        except Exception as e:
+            failure = e
+            raise
+        finally:
+            out_file.close()
+            if not complete:
+                _safe_unlink(part_path, [root_path])
+            if transfer is not None:
+                transfer.finish(None if complete else _aborted(failure))
+            with anyio.CancelScope(shield=True):
+                await release()
+
+    return ClosingStreamingResponse(
+        body(),
+        on_close=release,
+        media_type="video/mp4",
+        headers={"Content-Disposition": f'attachment; filename="{file_name}"'},
+    )
+
+
+def _file_stem(data: dict, prefix: bool) -> str:
+    """下载文件名主干：前缀 + 平台 + 作品ID (File name stem: prefix + platform + post id)"""
+    safe_id = re.sub(r"[^A-Za-z0-9_\-]", "_", str(data.get("video_id")))
+    file_prefix = (
+        re.sub(r"[^A-Za-z0-9_\-]", "_", str(config.get("API").get("Download_File_Prefix"))) if prefix else ""
+    )
+    return f"{file_prefix}{data.get('platform')}_{safe_id}"
+
+
+def _target_path(data: dict, prefix: bool, with_watermark: bool) -> tuple[str, str]:
+    """
+    根据解析结果计算缓存文件路径与下载文件名，并确保目录存在
+    (Compute the cache file path and download name from parsed data and make sure the directory exists)
+
+    视频为 .mp4，图集为 _images.zip；路径必须位于下载根目录内。
+    (Videos map to .mp4 and albums to _images.zip; the path must stay under the download root.)
+
+    Returns:
+        tuple[str, str]: (文件路径, 文件名) ((file path, file name))
+    """
+    data_type = data.get("type")
+    platform = data.get("platform")
+    if data_type not in {"video", "image"}:
+        raise HTTPException(status_code=400, detail="Invalid data type")
+    if platform not in {"douyin", "tiktok", "bilibili"}:
+        raise HTTPException(status_code=400, detail="Invalid platform specified")
+    root_path = _norm_path(config.get("API").get("Download_Path"))
+
+    raw_name = _file_stem(data, prefix) + ("_images" if data_type == "image" else "")
+    raw_name += "_watermark" if with_watermark else ""
+    raw_name += ".mp4" if data_type == "video" else ".zip"
+    file_name = secure_filename(raw_name)
+    if not _valid_filename(file_name):
+        raise HTTPException(status_code=400, detail="Invalid filename")
+
+    # 存储后端决定写入位置（平铺目录或内容寻址暂存区）/The storage backend decides where the download is written
+    safe_id = re.sub(r"[^A-Za-z0-9_\-]", "_", str(data.get("video_id")))
+    variant = ("video" if data_type == "video" else "images") + ("_watermark" if with_watermark else "")
+    file_path = _norm_path(_storage().target(platform, safe_id, variant, file_name))
+    download_path = os.path.dirname(file_path)
+    if not _is_under(root_path, download_path) or download_path == root_path:
+        raise HTTPException(status_code=400, detail="Invalid download path")
+
+    # 确保目录存在/Ensure the directory exists
+    os.makedirs(download_path, exist_ok=True)
+    return file_path, file_name
+
+
+def _image_entry_namer(data: dict, prefix: bool, with_watermark: bool):
+    """图集 ZIP 条目命名函数 (Entry naming function for album ZIPs)"""
+    stem = _file_stem(data, prefix)
+    suffix = "_watermark" if with_watermark else ""
+
+    def entry_name(index: int, file_format: str) -> str:
+        return secure_filename(f"{stem}_{index + 1}{suffix}.{file_format}")
+
+    return entry_name
+
+
+async def _platform_headers(platform: str, media_type: str) -> dict:
+    """获取对应平台的下载请求头 (Get the download headers for a platform)"""
+    start = time.perf_counter()
+    try:
+        if platform == "tiktok":
+            return await HybridCrawler.TikTokWebCrawler.get_tiktok_headers()
+        if platform == "bilibili":
+            return await HybridCrawler.BilibiliWebCrawler.get_bilibili_headers()
+        return await HybridCrawler.DouyinWebCrawler.get_douyin_headers()
+    finally:
+        download_metrics.headers.observe(time.perf_counter() - start, platform=platform, media_type=media_type)
+
+
+def _bilibili_stream_urls(data: dict, with_watermark: bool) -> tuple[str, str]:
+    """Bilibili 视频流与音频流URL (Bilibili video and audio stream URLs)"""
+    video_data = data.get("video_data", {})
+    video_url = video_data.get("nwm_video_url_HQ") if not with_watermark else video_data.get("wm_video_url_HQ")
+    audio_url = video_data.get("audio_url")
+    if not video_url or not audio_url:
+        raise HTTPException(status_code=500, detail="Failed to get video or audio URL from Bilibili")
+    return video_url, audio_url
+
+
+def _redirect_requested(data: dict, redirect: bool | None) -> bool:
+    """
+    是否对该下载尝试重定向到源站：请求参数优先，否则按平台配置；仅适用于单一URL的视频（不含 Bilibili 音视频分离流）
+    (Whether to try redirect-to-origin: the request flag wins over the per-platform config; only single-URL videos
+    qualify, so Bilibili's split A/V streams and albums are always proxied)
+    """
+    if data.get("type") != "video" or data.get("platform") == "bilibili":
         return False
+    if redirect is not None:
+        return redirect
+    platforms = (config.get("API", {}).get("Download_Redirect", {}) or {}).get("Platforms") or []
+    return data.get("platform") in platforms
+
+
+async def _redirect_to_origin(data: dict, with_watermark: bool) -> RedirectResponse | None:
+    """
+    解析并校验最终 CDN 地址，以不带本服务请求头与 Cookie 的 HEAD 请求探测可直接访问时返回 302；
+    探测失败（源站需要本服务的请求头、不支持 HEAD 或网络错误）时返回 None，由调用方代理下载
+    (Resolve and validate the final CDN URL and return a 302 when a HEAD probe without our headers or cookies
+    succeeds; return None so the caller proxies the download when the origin needs our headers, rejects HEAD
+    or the probe fails)
+
+    响应头携带签名URL的过期时间：X-Media-Expires（Unix 秒）、Expires 与对应的 Cache-Control max-age。
+    (Response headers carry the signed URL's expiry: X-Media-Expires (unix seconds), Expires and a matching
+    Cache-Control max-age.)
+    """
+    platform = data.get("platform")
+    video_data = data.get("video_data") or {}
+    url = video_data.get("wm_video_url_HQ" if with_watermark else "nwm_video_url_HQ")
+    if not url:
+        return None
+    redirect_cfg = config.get("API", {}).get("Download_Redirect", {}) or {}
+    sec = bool(config.get("API", {}).get("Security", {}).get("StrictValidation", True))
+    probe_headers = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0 Safari/537.36"}
+    start = time.perf_counter()
+    try:
+        async with _download_client(sec, timeout=httpx.Timeout(float(redirect_cfg.get("Probe_Timeout", 5)))) as client:
+            response = await _send_validated(client, url, platform, sec, headers=probe_headers, method="HEAD")
+            await response.aclose()
+    except HTTPException:
+        raise
+    except httpx.HTTPError as e:
+        logger.info("Redirect probe failed for %s: %s", platform, e)
+        response = None
+    if response is None or not response.is_success:
+        log_metric(
+            "download_redirect",
+            platform=platform,
+            outcome="proxy",
+            status=response.status_code if response is not None else 0,
+            elapsed_ms=int((time.perf_counter() - start) * 1000),
+        )
+        return None
+
+    final_url = str(response.url)
+    expiries = [e for e in (parse_url_expiry(final_url), parse_url_expiry(url)) if e is not None]
+    headers = {"Cache-Control": "private, no-store"}
+    if expiries:
+        expiry = min(expiries)
+        headers = {
+            "X-Media-Expires": str(int(expiry)),
+            "Expires": formatdate(expiry, usegmt=True),
+            "Cache-Control": f"private, max-age={max(0, int(expiry - time.time()) - 30)}",
+        }
+    log_metric(
+        "download_redirect",
+        platform=platform,
+        outcome="redirect",
+        status=response.status_code,
+        elapsed_ms=int((time.perf_counter() - start) * 1000),
+    )
+    return RedirectResponse(final_url, status_code=302, headers=headers)
+
+
+def _serve_cached(
+    request: Request, served: str, file_name: str, media_type: str, transfer: InFlightTransfer | None = None
+):
+    """
+    返回已完整发布的文件（支持 Range 与条件请求），并结束本请求领头的传输
+    (Serve a published file with range and conditional support, finishing the transfer this request leads)
+
+    启用 API.Download_Offload 时只返回 X-Accel-Redirect / X-Sendfile 头，由前置代理发送文件。
+    区间响应同样是流式响应，因此在返回前结束传输，而不是依赖调用方按响应类型判断。
+    (With API.Download_Offload enabled only an X-Accel-Redirect / X-Sendfile header is returned and the front
+    proxy sends the file. Range responses are streaming responses too, so the transfer is finished here.)
+
+    发送期间文件登记为使用中，缓存淘汰不会删除正在发送的 blob。
+    (The file stays registered as in use while it is sent, so eviction never removes a blob being served.)
+    """
+    if transfer is not None:
+        transfer.finish()
+    root_path = _norm_path(config.get("API").get("Download_Path"))
+    offloaded = offload_response(config.get("API", {}).get("Download_Offload"), root_path, served, file_name, media_type)
+    if offloaded is not None:
+        return offloaded
+    return download_cache.hold(served, cached_file_response(request, served, file_name, media_type))
+
+
+async def _follow_transfer(
+    request: Request, transfer: InFlightTransfer, file_path: str, file_name: str, media_type: str
+):
+    """
+    跟随同一目标文件的进行中传输：可读取临时文件时边写边传，否则等待完成后返回文件
+    (Follow an in-flight transfer of the same file: tail its temp file when possible, otherwise wait and serve the file)
+
+    Raises:
+        TransferStalledError: 领头下载超过 Download_Stall_Timeout 秒无进展，传输已被放弃
+            (The leader made no progress for Download_Stall_Timeout seconds and the transfer was abandoned)
+    """
+    timeout = _stall_timeout()
+    await transfer.wait_started(timeout)
+    if transfer.part_path is None or transfer.done:
+        await transfer.wait(timeout)
+        return _serve_cached(request, _storage().lookup(file_path) or file_path, file_name, media_type)
+    headers = {"Content-Disposition": f'attachment; filename="{file_name}"'}
+    if transfer.size is not None:
+        headers["Content-Length"] = str(transfer.size)
+    return StreamingResponse(
+        transfer.follow(lambda: _storage().lookup(file_path) or file_path, timeout=timeout),
+        media_type=media_type,
+        headers=headers,
+    )
+
+
+def _media_kind(data: dict) -> str:
+    """指标中的媒体类型标签 (Media type label used by the metrics)"""
+    return "video" if data.get("type") == "video" else "image"
+
+
+def _count_cache(data: dict, result: str):
+    """按平台与媒体类型记录缓存命中/未命中 (Count a cache hit or miss by platform and media type)"""
+    download_metrics.cache.inc(platform=data.get("platform"), media_type=_media_kind(data), result=result)
+
+
+def _count_served(platform: str, media_type: str) -> Callable[[int], None]:
+    """返回记录已发送字节数的回调 (Return a callback recording the bytes served)"""
+    return lambda n: download_metrics.served.inc(n, platform=platform, media_type=media_type)
+
+
+async def _lead_download(
+    request: Request,
+    data: dict,
+    file_path: str,
+    file_name: str,
+    prefix: bool,
+    with_watermark: bool,
+    transfer: InFlightTransfer | None,
+):
+    """
+    作为领头请求下载目标文件并返回响应 (Download the target file as the leader and return the response)
+    """
+    platform = data.get("platform")
+    # 下载视频文件/Download video file
+    if data.get("type") == "video":
+        served = _storage().lookup(file_path)
+        if served:
+            download_cache.hit(served)
+            _count_cache(data, "hit")
+            return _serve_cached(request, served, file_name, "video/mp4", transfer)
+        download_cache.miss()
+        _count_cache(data, "miss")
+
+        # 获取对应平台的headers
+        __headers = await _platform_headers(platform, _media_kind(data))
+
+        # Bilibili 特殊处理：音视频分离
+        if platform == "bilibili":
+            video_url, audio_url = _bilibili_stream_urls(data, with_watermark)
+
+            # 边下载边合并，输出分片 MP4/Progressive merge producing fragmented MP4
+            if config.get("API", {}).get("Bilibili_Progressive_Merge", True):
+                try:
+                    return await stream_bilibili_fmp4(
+                        video_url,
+                        audio_url,
+                        file_path,
+                        file_name,
+                        headers=__headers.get("headers"),
+                        transfer=transfer,
+                    )
+                except FFmpegQueueFullError:
+                    raise HTTPException(status_code=503, detail="FFmpeg merge queue is full, please retry later")
+
+            start = time.perf_counter()
+            try:
+                success = await merge_bilibili_video_audio(
+                    video_url, audio_url, request, file_path, __headers.get("headers")
+                )
+            except FFmpegQueueFullError:
+                raise HTTPException(status_code=503, detail="FFmpeg merge queue is full, please retry later")
+            if not success:
+                raise HTTPException(status_code=500, detail="Failed to merge Bilibili video and audio streams")
+            try:
+                size = os.path.getsize(_storage().lookup(file_path))
+            except Exception:
+                size = 0
+
+            log_metric(
+                "bilibili_merge",
+                output=file_path,
+                elapsed_ms=int((time.perf_counter() - start) * 1000),
+                size_bytes=size,
+            )
+        else:
+            # 其他平台的常规处理
+            url = (
+                data.get("video_data").get("nwm_video_url_HQ")
+                if not with_watermark
+                else data.get("video_data").get("wm_video_url_HQ")
+            )
+            # 边下边传：首字节无需等待完整下载/Stream-through: the first byte does not wait for the full download
+            if config.get("API", {}).get("Download_Stream_Through", True):
+                return await stream_data_tee(
+                    url, platform, file_path, file_name, "video/mp4", headers=__headers, transfer=transfer
+                )
+            start = time.perf_counter()
+            success = await fetch_data_stream(url, platform, request, headers=__headers, file_path=file_path)
+            if not success:
+                raise HTTPException(status_code=500, detail="An error occurred while fetching data")
+            try:
+                size = os.path.getsize(_storage().lookup(file_path))
+            except Exception:
+                size = 0
+
+            log_metric(
+                f"{platform}_download",
+                output=file_path,
+                elapsed_ms=int((time.perf_counter() - start) * 1000),
+                size_bytes=size,
+            )
+
+        # 返回文件内容
+        return _serve_cached(request, _storage().lookup(file_path) or file_path, file_name, "video/mp4", transfer)
+
+    # 下载图片文件/Download image file
+    else:
+        # 判断文件是否存在，存在就直接返回
+        served = _storage().lookup(file_path)
+        if served:
+            download_cache.hit(served)
+            _count_cache(data, "hit")
+            return _serve_cached(request, served, file_name, "application/zip", transfer)
+        download_cache.miss()
+        _count_cache(data, "miss")
+
+        # 获取图片文件/Get image file
+        urls = (
+            data.get("image_data").get("no_watermark_image_list")
+            if not with_watermark
+            else data.get("image_data").get("watermark_image_list")
+        )
+        cache_path = file_path if config.get("API", {}).get("Download_Cache_Images", True) else None
+
+        # 并发下载并流式返回压缩文件/Download concurrently and stream the archive back
+        return await stream_image_zip(
+            urls,
+            platform,
+            _image_entry_namer(data, prefix, with_watermark),
+            cache_path,
+            file_name,
+            transfer=transfer,
+        )
 
 
 @router.get(
@@ -389,6 +1546,10 @@ async def download_file_hybrid(
     ),
     prefix: bool = True,
     with_watermark: bool = False,
+    redirect: bool | None = Query(
+        default=None,
+        description="是否302重定向到源站CDN地址，默认按 API.Download_Redirect.Platforms 配置/Redirect to the origin CDN URL, defaults to the per-platform config",
+    ),
 ):
     """
     # [中文]
@@ -398,10 +1559,12 @@ async def download_file_hybrid(
     - 如果你在尝试直接访问TikTok单一视频接口的JSON数据中的视频播放地址时遇到HTTP403错误，那么你可以使用此接口来下载视频。
     - Bilibili视频会自动合并视频流和音频流，确保下载的视频有声音。
     - 这个接口会占用一定的服务器资源，所以在Demo站点是默认关闭的，你可以在本地部署后调用此接口。
+    - 已缓存的文件支持 Range/If-Range 断点与拖动（206），以及 If-None-Match/If-Modified-Since 条件请求（304）。
     ### 参数:
     - url: 视频或图片的URL地址，支持抖音|TikTok|Bilibili的分享链接，例如：https://v.douyin.com/e4J8Q7A/ 或 https://www.bilibili.com/video/BV1xxxxxxxxx
     - prefix: 下载文件的前缀，默认为True，可以在配置文件中修改。
     - with_watermark: 是否下载带水印的视频或图片，默认为False。(注意：Bilibili没有水印概念)
+    - redirect: 是否302重定向到校验过的源站CDN地址而不经本服务传输，默认按平台配置；源站需要本服务请求头时自动回退为代理下载，Bilibili与图集始终代理。
     ### 返回:
     - 返回下载的视频或图片文件响应。
 
@@ -412,10 +1575,12 @@ async def download_file_hybrid(
     - If you encounter an HTTP403 error when trying to access the video playback address in the JSON data of the TikTok single video interface directly, you can use this interface to download the video.
     - Bilibili videos will automatically merge video and audio streams to ensure downloaded videos have sound.
     - This interface will occupy a certain amount of server resources, so it is disabled by default on the Demo site, you can call this interface after deploying it locally.
+    - Cached files support Range/If-Range for seeking (206) and If-None-Match/If-Modified-Since conditional requests (304).
     ### Parameters:
     - url: The URL address of the video or image, supports Douyin|TikTok|Bilibili sharing links, for example: https://v.douyin.com/e4J8Q7A/ or https://www.bilibili.com/video/BV1xxxxxxxxx
     - prefix: The prefix of the downloaded file, the default is True, and can be modified in the configuration file.
     - with_watermark: Whether to download videos or images with watermarks, the default is False. (Note: Bilibili has no watermark concept)
+    - redirect: Return a 302 to the validated origin CDN URL instead of proxying the bytes, defaults to the per-platform config; falls back to proxying when the origin needs our headers. Bilibili and albums are always proxied.
     ### Returns:
     - Return the response of the downloaded video or image file.
 
@@ -431,220 +1596,358 @@ async def download_file_hybrid(
         )
 
     # 开始解析数据/Start parsing data
+    start = time.perf_counter()
     try:
         sanitized = extract_valid_urls(url)
         if not sanitized:
             code = 400
             return ErrorResponseModel(code=code, message="Invalid URL", router=request.url.path, params=dict(request.query_params))
-        data = await HybridCrawler.hybrid_parsing_single_video(sanitized, minimal=True)
+        # 按主机名识别平台，不支持的链接直接拒绝，无需任何网络请求
+        if route_url(sanitized) is None:
+            code = 400
+            return ErrorResponseModel(code=code, message="Unsupported platform URL", router=request.url.path, params=dict(request.query_params))
+        data = await _resolve(sanitized)
     except Exception as e:
         code = 400
         return ErrorResponseModel(code=code, message=str(e), router=request.url.path, params=dict(request.query_params))
 
     # 开始下载文件/Start downloading files
     try:
-        data_type = data.get("type")
-        platform = data.get("platform")
-        if data_type not in {"video", "image"}:
-            raise HTTPException(status_code=400, detail="Invalid data type")
-        allowed_platforms = {"douyin", "tiktok", "bilibili"}
-        if platform not in allowed_platforms:
-            raise HTTPException(status_code=400, detail="Invalid platform specified")
-        # allowed_types not used
-        allowed_subdirs = {
-            ("douyin", "video"): "douyin_video",
-            ("douyin", "image"): "douyin_image",
-            ("tiktok", "video"): "tiktok_video",
-            ("tiktok", "image"): "tiktok_image",
-            ("bilibili", "video"): "bilibili_video",
-            ("bilibili", "image"): "bilibili_image",
-        }
-        video_id = data.get("video_id")
-        safe_id = re.sub(r"[^A-Za-z0-9_\-]", "_", str(video_id))
-        file_prefix = (
-            re.sub(r"[^A-Za-z0-9_\-]", "_", str(config.get("API").get("Download_File_Prefix"))) if prefix else ""
-        )
-        root_path = _norm_path(config.get("API").get("Download_Path"))
-        try:
-            download_subdir = allowed_subdirs[(platform, data_type)]
-        except KeyError:
-            raise HTTPException(status_code=400, detail="Invalid directory combination")
-        download_path = _norm_path(os.path.join(root_path, download_subdir))
-        if not _is_under(root_path, download_path):
-            raise HTTPException(status_code=400, detail="Invalid download path")
-        base = _norm_path(root_path)
-        full = _norm_path(download_path)
-        import os as _os
-        if _os.path.commonpath([full, base]) != base or full == base:
-            raise HTTPException(status_code=400, detail="Invalid download path")
-
-        # 确保目录存在/Ensure the directory exists
-        os.makedirs(download_path, exist_ok=True)
-
-        # 下载视频文件/Download video file
-        if data_type == "video":
-            raw_name = (
-                f"{file_prefix}{platform}_{safe_id}.mp4"
-                if not with_watermark
-                else f"{file_prefix}{platform}_{safe_id}_watermark.mp4"
-            )
-            file_name = secure_filename(raw_name)
-            if not _valid_filename(file_name):
-                raise HTTPException(status_code=400, detail="Invalid filename")
-            file_path = _norm_path(os.path.join(download_path, file_name))
-            if not _is_under(root_path, file_path) or file_path == root_path:
-                raise HTTPException(status_code=400, detail="Invalid file path")
-
-            base = _norm_path(root_path)
-            full = _norm_path(file_path)
-            import os as _os
-            if _os.path.commonpath([full, base]) == base and full != base and os.path.exists(file_path):
-                return FileResponse(path=file_path, media_type="video/mp4", filename=file_name)
-
-            # 获取对应平台的headers
-            if platform == "tiktok":
-                __headers = await HybridCrawler.TikTokWebCrawler.get_tiktok_headers()
-            elif platform == "bilibili":
-                __headers = await HybridCrawler.BilibiliWebCrawler.get_bilibili_headers()
-            else:  # douyin
-                __headers = await HybridCrawler.DouyinWebCrawler.get_douyin_headers()
-
-            # Bilibili 特殊处理：音视频分离
-            if platform == "bilibili":
-                video_data = data.get("video_data", {})
-                video_url = (
-                    video_data.get("nwm_video_url_HQ") if not with_watermark else video_data.get("wm_video_url_HQ")
-                )
-                audio_url = video_data.get("audio_url")
-                if not video_url or not audio_url:
-                    raise HTTPException(status_code=500, detail="Failed to get video or audio URL from Bilibili")
-
-                start = time.perf_counter()
-                success = await merge_bilibili_video_audio(
-                    video_url, audio_url, request, file_path, __headers.get("headers")
-                )
-                if not success:
-                    raise HTTPException(status_code=500, detail="Failed to merge Bilibili video and audio streams")
-                try:
-                    size = os.path.getsize(file_path)
-                except Exception:
-                    size = 0
-                from crawlers.utils.logger import log_metric
-
-                log_metric(
-                    "bilibili_merge",
-                    output=file_path,
-                    elapsed_ms=int((time.perf_counter() - start) * 1000),
-                    size_bytes=size,
-                )
-            else:
-                # 其他平台的常规处理
-                url = (
-                    data.get("video_data").get("nwm_video_url_HQ")
-                    if not with_watermark
-                    else data.get("video_data").get("wm_video_url_HQ")
+        # 源站可直接访问时重定向，不经本服务传输/Redirect to the origin when it is directly accessible
+        platform, kind = data.get("platform"), _media_kind(data)
+        if _redirect_requested(data, redirect):
+            response = await _redirect_to_origin(data, with_watermark)
+            if response is not None:
+                download_metrics.request.observe(
+                    time.perf_counter() - start, platform=platform, media_type=kind, source="redirect"
                 )
-                start = time.perf_counter()
-                success = await fetch_data_stream(url, platform, request, headers=__headers, file_path=file_path)
-                if not success:
-                    raise HTTPException(status_code=500, detail="An error occurred while fetching data")
-                try:
-                    size = os.path.getsize(file_path)
-                except Exception:
-                    size = 0
-                from crawlers.utils.logger import log_metric
-
-                log_metric(
-                    f"{platform}_download",
-                    output=file_path,
-                    elapsed_ms=int((time.perf_counter() - start) * 1000),
-                    size_bytes=size,
-                )
-
-            # # 保存文件
-            # async with aiofiles.open(file_path, 'wb') as out_file:
-            #     await out_file.write(response.content)
+                return response
 
-            # 返回文件内容
-            return FileResponse(path=file_path, filename=file_name, media_type="video/mp4")
+        file_path, file_name = _target_path(data, prefix, with_watermark)
+        media_type = "video/mp4" if data.get("type") == "video" else "application/zip"
 
-        # 下载图片文件/Download image file
-        elif data_type == "image":
-            # 压缩文件属性/Compress file properties
-            raw_zip = (
-                f"{file_prefix}{platform}_{safe_id}_images.zip"
-                if not with_watermark
-                else f"{file_prefix}{platform}_{safe_id}_images_watermark.zip"
-            )
-            zip_file_name = secure_filename(raw_zip)
-            if not _valid_filename(zip_file_name):
-                raise HTTPException(status_code=400, detail="Invalid filename")
-            if not zip_file_name.lower().endswith(".zip"):
-                raise HTTPException(status_code=400, detail="Invalid filename extension")
-            zip_file_path = _norm_path(os.path.join(download_path, zip_file_name))
-            if not _is_under(root_path, zip_file_path) or zip_file_path == root_path:
-                raise HTTPException(status_code=400, detail="Invalid file path")
-
-            # 判断文件是否存在，存在就直接返回、
-            base = _norm_path(root_path)
-            full = _norm_path(zip_file_path)
-            if os.path.commonpath([full, base]) == base and full != base and os.path.exists(zip_file_path):
-                return FileResponse(path=zip_file_path, filename=zip_file_name, media_type="application/zip")
-
-            # 获取图片文件/Get image file
-            urls = (
-                data.get("image_data").get("no_watermark_image_list")
-                if not with_watermark
-                else data.get("image_data").get("watermark_image_list")
-            )
-            image_file_list = []
-            for url in urls:
-                # 请求图片文件/Request image file
-                response = await fetch_data(url, platform)
-                index = int(urls.index(url))
-                content_type = (response.headers.get("content-type") or "").lower()
-                subtype = ""
-                if "/" in content_type:
-                    _, subtype = content_type.split("/", 1)
-                subtype = subtype.split(";")[0].strip()
-                allowed_ext = {"jpg", "jpeg", "png", "gif", "webp", "bmp"}
-                if subtype not in allowed_ext:
-                    raise HTTPException(status_code=400, detail="Unsupported content type for image download")
-                file_format = subtype
-                raw_img = (
-                    f"{file_prefix}{platform}_{safe_id}_{index + 1}.{file_format}"
-                    if not with_watermark
-                    else f"{file_prefix}{platform}_{safe_id}_{index + 1}_watermark.{file_format}"
+        # 同一目标文件已有进行中的下载时跟随它，不再访问上游/Follow an in-flight download of the same file instead of refetching
+        transfer = None
+        if data.get("type") == "video" or config.get("API", {}).get("Download_Cache_Images", True):
+            while True:
+                transfer, leader = single_flight.join(file_path)
+                if leader:
+                    break
+                try:
+                    response = await _follow_transfer(request, transfer, file_path, file_name, media_type)
+                except TransferStalledError as e:
+                    # 停滞的传输已被放弃，重新加入并通常接替下载/The stalled transfer was abandoned; rejoin and usually lead
+                    logger.warning("%s, taking over", e)
+                    continue
+                # 跟随请求不访问上游，计为命中/Followers do not touch upstream and count as hits
+                download_cache.hit(file_path)
+                _count_cache(data, "hit")
+                download_metrics.request.observe(
+                    time.perf_counter() - start, platform=platform, media_type=kind, source="follow"
                 )
-                file_name = secure_filename(raw_img)
-                if not _valid_filename(file_name):
-                    raise HTTPException(status_code=400, detail="Invalid filename")
-                file_path = _norm_path(os.path.join(download_path, file_name))
-                # 额外的标准化路径前缀校验以满足静态扫描
-                base = _norm_path(root_path)
-                full = _norm_path(file_path)
-                import os as _os
-                if _os.path.commonpath([full, base]) != base or full == base:
-                    raise HTTPException(status_code=400, detail="Invalid file path")
-                image_file_list.append(file_path)
-
-                # 保存文件/Save file
-                async with aiofiles.open(file_path, "wb") as out_file:
-                    await out_file.write(response.content)
-
-            # 压缩文件/Compress file
-            with zipfile.ZipFile(zip_file_path, "w") as zip_file:
-                for image_file in image_file_list:
-                    zip_file.write(image_file, os.path.basename(image_file))
-
-            # 返回压缩文件/Return compressed file
-            return FileResponse(path=zip_file_path, filename=zip_file_name, media_type="application/zip")
+                return bandwidth.shape(response, request, _count_served(platform, kind))
+        try:
+            response = await _lead_download(request, data, file_path, file_name, prefix, with_watermark, transfer)
+        except BaseException as e:
+            if transfer is not None:
+                transfer.finish(e)
+            raise
+        # 流式响应在发送结束时（包括响应体从未开始）经 on_close 结束传输，其余情况此时文件已完整
+        # (Streaming responses finish the transfer from on_close, even if the body never starts; otherwise the file
+        # is complete by now)
+        if transfer is not None and not isinstance(response, ClosingStreamingResponse):
+            transfer.finish()
+        download_metrics.request.observe(time.perf_counter() - start, platform=platform, media_type=kind, source="proxy")
+        return bandwidth.shape(response, request, _count_served(platform, kind))
 
     # 异常处理/Exception handling
     except Exception as e:
         print(e)
         code = 400
         return ErrorResponseModel(code=code, message=str(e), router=request.url.path, params=dict(request.query_params))
+
+
+async def _resolve(url: str) -> dict:
+    """解析分享链接并记录解析耗时 (Resolve a share URL and record the resolve time)"""
+    start = time.perf_counter()
+    data = await HybridCrawler.hybrid_parsing_single_video(url, minimal=True)
+    # 媒体类型在解析完成后才知道，此时按结果补上标签/The media type is only known once resolved
+    download_metrics.resolve.observe(
+        time.perf_counter() - start, platform=data.get("platform"), media_type=_media_kind(data)
+    )
+    return data
+
+
+async def _run_download_job(job: DownloadJob):
+    """
+    执行一个后台下载任务：解析、下载（Bilibili 合并）并写入缓存文件，不依赖任何 HTTP 请求
+    (Run one background download job: resolve, download (merge for Bilibili) and write the cache file,
+    independent of any HTTP request)
+    """
+    job.set_stage("resolving")
+    sanitized = extract_valid_urls(job.url)
+    if not sanitized or route_url(sanitized) is None:
+        raise ValueError("Unsupported platform URL")
+    data = await _resolve(sanitized)
+    file_path, file_name = _target_path(data, job.prefix, job.with_watermark)
+    job.file_path, job.file_name = file_path, file_name
+    job.media_type = "video/mp4" if data.get("type") == "video" else "application/zip"
+
+    # 与同一文件的进行中下载合并，领头下载停滞时接替它/Coalesce with an in-flight download, taking over a stalled one
+    while True:
+        transfer, leader = single_flight.join(file_path)
+        if leader:
+            break
+        job.set_stage("waiting")
+        try:
+            await transfer.wait(_stall_timeout())
+        except TransferStalledError as e:
+            logger.warning("%s, taking over", e)
+            continue
+        download_cache.hit(file_path)
+        _count_cache(data, "hit")
+        return
+    try:
+        await _run_job_download(job, data, file_path, file_name)
+    except BaseException as e:
+        transfer.finish(e)
+        raise
+    transfer.finish()
+
+
+async def _run_job_download(job: DownloadJob, data: dict, file_path: str, file_name: str):
+    """后台任务的下载阶段 (Download stage of a background job)"""
+    platform = data.get("platform")
+    served = _storage().lookup(file_path)
+    if served:
+        download_cache.hit(served)
+        _count_cache(data, "hit")
+        return
+    download_cache.miss()
+    _count_cache(data, "miss")
+    job.set_stage("downloading")
+    if data.get("type") == "video":
+        __headers = await _platform_headers(platform, _media_kind(data))
+        if platform == "bilibili":
+            video_url, audio_url = _bilibili_stream_urls(data, job.with_watermark)
+            success = await merge_bilibili_video_audio(
+                video_url, audio_url, None, file_path, __headers.get("headers"), progress=job
+            )
+        else:
+            url = data.get("video_data").get("nwm_video_url_HQ" if not job.with_watermark else "wm_video_url_HQ")
+            success = await fetch_data_stream(url, platform, None, headers=__headers, file_path=file_path, progress=job)
+        if not success:
+            raise RuntimeError("Failed to download video")
+    else:
+        image_data = data.get("image_data")
+        urls = image_data.get("no_watermark_image_list" if not job.with_watermark else "watermark_image_list")
+        response = await stream_image_zip(
+            urls, platform, _image_entry_namer(data, job.prefix, job.with_watermark), file_path, file_name
+        )
+        try:
+            async for chunk in response.body_iterator:
+                job.add_progress(len(chunk))
+        finally:
+            await response.aclose()
+
+
+# 后台下载任务管理器（任务状态默认保存在下载目录的 .jobs 子目录）/Background download jobs, state kept under <Download_Path>/.jobs
+job_manager = DownloadJobManager.from_config(
+    config.get("API", {}).get("Download_Jobs"),
+    _run_download_job,
+    default_state_dir=os.path.join(config.get("API", {}).get("Download_Path", "./download"), ".jobs"),
+)
+
+
+def _start_job_manager():
+    """应用启动时恢复并继续后台下载任务 (Restore and resume background download jobs at app startup)"""
+    job_manager.start()
+
+
+router.add_event_handler("startup", _start_job_manager)
+
+
+async def _flush_job_manager():
+    """应用关闭前等待任务状态落盘 (Wait for pending job state writes before the app shuts down)"""
+    await job_manager.flush()
+
+
+router.add_event_handler("shutdown", _flush_job_manager)
+
+
+async def _load_download_cache():
+    """应用启动时在工作线程中重建下载缓存索引 (Rebuild the download cache index off the event loop at app startup)"""
+    await download_cache.load()
+
+
+router.add_event_handler("startup", _load_download_cache)
+
+
+def _job_view(job: DownloadJob) -> dict:
+    """对外展示的任务信息，不包含服务器文件路径 (Public job view without the server file path)"""
+    data = job.to_dict()
+    data.pop("file_path", None)
+    return data
+
+
+def _get_job(job_id: str) -> DownloadJob:
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Download job not found")
+    return job
+
+
+@router.post("/download/jobs", summary="提交后台下载任务/Submit a background download job")
+async def submit_download_job(
+    request: Request,
+    url: str = Query(
+        example="https://www.bilibili.com/video/BV1U5efz2Egn",
+        description="视频或图片的URL地址，与 /download 相同 (Video or image URL, same as /download)",
+    ),
+    prefix: bool = True,
+    with_watermark: bool = False,
+):
+    """
+    # [中文]
+    ### 用途:
+    - 提交一个后台下载任务并立即返回任务ID，适合耗时较长的下载（如 Bilibili 音视频合并），避免客户端或代理超时
+    - 任务在有界的后台工作池中执行，提交请求断开不会影响下载
+    ### 参数:
+    - url: 与 /download 相同
+    - prefix: 与 /download 相同
+    - with_watermark: 与 /download 相同
+    ### 返回:
+    - 任务信息，包含 id、status、stage
+
+    # [English]
+    ### Purpose:
+    - Submit a background download job and return its id immediately, for long downloads such as Bilibili merges
+    - Jobs run in a bounded background worker pool and are not affected by the submitting request going away
+    ### Parameters:
+    - url: Same as /download
+    - prefix: Same as /download
+    - with_watermark: Same as /download
+    ### Returns:
+    - Job information including id, status and stage
+    """
+    if not config["API"]["Download_Switch"]:
+        code = 400
+        message = "Download endpoint is disabled in the configuration file. | 配置文件中已禁用下载端点。"
+        return ErrorResponseModel(
+            code=code, message=message, router=request.url.path, params=dict(request.query_params)
+        )
+    sanitized = extract_valid_urls(url)
+    if not sanitized or route_url(sanitized) is None:
+        code = 400
+        return ErrorResponseModel(
+            code=code, message="Unsupported platform URL", router=request.url.path, params=dict(request.query_params)
+        )
+    try:
+        job = job_manager.submit(sanitized, prefix=prefix, with_watermark=with_watermark)
+    except JobQueueFullError:
+        raise HTTPException(status_code=503, detail="Download job queue is full, please retry later")
+    return ResponseModel(code=200, router=request.url.path, data=_job_view(job))
+
+
+@router.get("/download/jobs/{job_id}", summary="查询后台下载任务进度/Get background download job progress")
+async def get_download_job(
+    request: Request,
+    job_id: str,
+    wait: float = Query(default=0, ge=0, le=60, description="长轮询等待秒数 (Long-poll seconds)"),
+    version: int | None = Query(default=None, description="已知的任务版本号 (Last seen job version)"),
+):
+    """
+    # [中文]
+    ### 用途:
+    - 查询任务状态、阶段、已下载字节数与预计剩余时间
+    - 传入 wait 时进行长轮询：任务版本号与 version 不同（未传 version 时为有新的变化）或任务结束时立即返回，否则最多等待 wait 秒
+    ### 返回:
+    - 任务信息：status、stage、bytes_done、bytes_total、eta_seconds、version
+
+    # [English]
+    ### Purpose:
+    - Get the job status, stage, downloaded bytes and ETA
+    - With wait, long-poll: return as soon as the job version differs from version (or changes, when version
+      is omitted) or the job finishes, otherwise after at most wait seconds
+    ### Returns:
+    - Job information: status, stage, bytes_done, bytes_total, eta_seconds, version
+    """
+    job = _get_job(job_id)
+    if wait:
+        await job.wait_for_change(job.version if version is None else version, wait)
+    return ResponseModel(code=200, router=request.url.path, data=_job_view(job))
+
+
+@router.get("/download/jobs/{job_id}/file", summary="获取后台下载任务的文件/Get the file of a finished download job")
+async def get_download_job_file(request: Request, job_id: str):
+    """
+    # [中文]
+    ### 用途:
+    - 任务完成后返回下载的文件（支持 Range 与条件请求）；未完成返回 409，文件已被清理返回 404
+
+    # [English]
+    ### Purpose:
+    - Return the downloaded file once the job is done (with Range and conditional GET); 409 while unfinished, 404 if the file was removed
+    """
+    job = _get_job(job_id)
+    if job.status != STATUS_DONE:
+        raise HTTPException(status_code=409, detail=f"Download job is {job.status}")
+    root_path = _norm_path(config.get("API").get("Download_Path"))
+    served = _storage().lookup(job.file_path) if job.file_path and _is_under(root_path, job.file_path) else None
+    if not served:
+        raise HTTPException(status_code=404, detail="Downloaded file is no longer available")
+    routed = route_url(job.url)
+    on_done = _count_served(routed.platform if routed else "unknown", "video" if job.media_type == "video/mp4" else "image")
+    return bandwidth.shape(_serve_cached(request, served, job.file_name, job.media_type), request, on_done)
+
+
+@router.get("/download/stats", summary="下载组件运行统计/Download component statistics")
+async def download_stats(request: Request):
+    """
+    # [中文]
+    ### 用途:
+    - 查看 FFmpeg 合并工作池的并发、排队与耗时统计，后台下载任务数量，下载缓存的占用、命中率与淘汰次数，
+      以及各客户端的下载吞吐量与限速时长
+    ### 返回:
+    - 工作池、任务、缓存与带宽统计信息
+
+    # [English]
+    ### Purpose:
+    - Inspect FFmpeg pool concurrency, queueing and timing, background job counts, download cache
+      occupancy, hit rate and evictions, and per-client download throughput and throttling
+    ### Returns:
+    - Pool, job, cache and bandwidth statistics
+    """
+    data = {
+        "ffmpeg": ffmpeg_pool.stats(),
+        "jobs": job_manager.stats(),
+        "cache": download_cache.stats(),
+        "bandwidth": bandwidth.stats(),
+    }
+    return ResponseModel(code=200, router=request.url.path, data=data)
+
+
+@router.get("/download/metrics", summary="下载流程指标/Download pipeline metrics")
+async def download_metrics_endpoint():
+    """
+    # [中文]
+    ### 用途:
+    - 以 Prometheus 文本格式导出下载流程指标：解析、请求头、上游首字节、吞吐量、Bilibili 合并与整体请求耗时的直方图，
+      缓存命中/未命中以及上游获取与发送给客户端的字节数，均按平台与媒体类型分组
+    ### 返回:
+    - Prometheus 文本格式的指标
+
+    # [English]
+    ### Purpose:
+    - Export download pipeline metrics in the Prometheus text format: histograms of resolve, header, upstream
+      TTFB, throughput, Bilibili merge and request times, cache hits/misses, and bytes fetched vs served,
+      broken down by platform and media type
+    ### Returns:
+    - Metrics in the Prometheus text format
+    """
+    return PlainTextResponse(download_metrics.render(), media_type="text/plain; version=0.0.4")
+
+
 def _strict_msg(platform: str, issue: str, host: str = "", ips: list[str] | None = None) -> str:
     allowed = (
         config.get("API", {})
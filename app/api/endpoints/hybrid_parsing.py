@@ -1,9 +1,10 @@
-from fastapi import APIRouter, Body, HTTPException, Query, Request  # 导入FastAPI组件
+from fastapi import APIRouter, Body, HTTPException, Query, Request, Response  # 导入FastAPI组件
 
 from app.api.models.APIResponseModel import ErrorResponseModel, ResponseModel  # 导入响应模型
 
 # 爬虫/Crawler
 from crawlers.hybrid.hybrid_crawler import HybridCrawler  # 导入混合爬虫
+from crawlers.utils.cache import cache_headers  # 导入缓存响应头
 
 HybridCrawler = HybridCrawler()  # 实例化混合爬虫
 
@@ -17,7 +18,10 @@ router = APIRouter()
     summary="混合解析单一视频接口/Hybrid parsing single video endpoint",
 )
 async def hybrid_parsing_single_video(
-    request: Request, url: str = Query(example="https://v.douyin.com/L4FJNR3/"), minimal: bool = Query(default=False)
+    request: Request,
+    response: Response,
+    url: str = Query(example="https://v.douyin.com/L4FJNR3/"),
+    minimal: bool = Query(default=False),
 ):
     """
     # [中文]
@@ -42,6 +46,8 @@ async def hybrid_parsing_single_video(
     try:
         # 解析视频/Parse video
         data = await HybridCrawler.hybrid_parsing_single_video(url=url, minimal=minimal)
+        # 标记缓存状态，过期数据附带 Warning 头/Mark cache status, stale data carries a Warning header
+        response.headers.update(cache_headers())
         # 返回数据/Return data
         return ResponseModel(code=200, router=request.url.path, data=data)
     except Exception:
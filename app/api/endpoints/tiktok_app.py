@@ -1,7 +1,8 @@
-from fastapi import APIRouter, HTTPException, Query, Request  # 导入FastAPI组件
+from fastapi import APIRouter, HTTPException, Query, Request, Response  # 导入FastAPI组件
 
 from app.api.models.APIResponseModel import ErrorResponseModel, ResponseModel  # 导入响应模型
 from crawlers.tiktok.app.app_crawler import TikTokAPPCrawler  # 导入APP爬虫
+from crawlers.utils.cache import cache_headers, metadata_cache  # 导入元数据缓存
 
 router = APIRouter()
 TikTokAPPCrawler = TikTokAPPCrawler()
@@ -10,7 +11,9 @@ TikTokAPPCrawler = TikTokAPPCrawler()
 # 获取单个作品数据
 @router.get("/fetch_one_video", response_model=ResponseModel, summary="获取单个作品数据/Get single video data")
 async def fetch_one_video(
-    request: Request, aweme_id: str = Query(example="7350810998023949599", description="作品id/Video id")
+    request: Request,
+    response: Response,
+    aweme_id: str = Query(example="7350810998023949599", description="作品id/Video id"),
 ):
     """
     # [中文]
@@ -33,7 +36,10 @@ async def fetch_one_video(
     aweme_id = "7350810998023949599"
     """
     try:
-        data = await TikTokAPPCrawler.fetch_one_video(aweme_id)
+        data = await metadata_cache.get_or_load(
+            ("tiktok_app", aweme_id), lambda: TikTokAPPCrawler.fetch_one_video(aweme_id)
+        )
+        response.headers.update(cache_headers())
         return ResponseModel(code=200, router=request.url.path, data=data)
     except Exception:
         status_code = 400
@@ -1,18 +1,27 @@
 from typing import List
 
-from fastapi import APIRouter, Body, HTTPException, Query, Request  # 导入FastAPI组件
+from fastapi import APIRouter, Body, HTTPException, Query, Request, Response  # 导入FastAPI组件
 
 from app.api.models.APIResponseModel import ErrorResponseModel, ResponseModel  # 导入响应模型
 from crawlers.tiktok.web.web_crawler import TikTokWebCrawler  # 导入TikTokWebCrawler类
+from crawlers.utils.availability import check_tiktok_web_detail  # 导入作品可用性校验
+from crawlers.utils.cache import cache_headers, metadata_cache  # 导入元数据缓存
 
 router = APIRouter()
 TikTokWebCrawler = TikTokWebCrawler()
 
 
+async def _fetch_one_video(itemId: str) -> dict:
+    # 作品确定不可用时抛出异常，由缓存写入负缓存/Raise for unavailable posts so the cache stores a negative entry
+    return check_tiktok_web_detail(await TikTokWebCrawler.fetch_one_video(itemId), itemId)
+
+
 # 获取单个作品数据
 @router.get("/fetch_one_video", response_model=ResponseModel, summary="获取单个作品数据/Get single video data")
 async def fetch_one_video(
-    request: Request, itemId: str = Query(example="7339393672959757570", description="作品id/Video id")
+    request: Request,
+    response: Response,
+    itemId: str = Query(example="7339393672959757570", description="作品id/Video id"),
 ):
     """
     # [中文]
@@ -35,7 +44,10 @@ async def fetch_one_video(
     itemId = "7339393672959757570"
     """
     try:
-        data = await TikTokWebCrawler.fetch_one_video(itemId)
+        data = await metadata_cache.get_or_load(
+            ("tiktok_web", itemId), lambda: _fetch_one_video(itemId)
+        )
+        response.headers.update(cache_headers())
         return ResponseModel(code=200, router=request.url.path, data=data)
     except Exception:
         status_code = 400
@@ -741,7 +753,7 @@ async def get_all_sec_user_id(
     ### 参数:
     - url: 用户主页链接
     ### 返回:
-    - 用户id
+    - 用户id（按输入顺序逐项返回 input/success/data/error，单个链接失败不影响其余链接）
 
     # [English]
     ### Purpose:
@@ -749,7 +761,7 @@ async def get_all_sec_user_id(
     ### Parameters:
     - url: User homepage link
     ### Return:
-    - User id
+    - User id (per-item input/success/data/error entries in input order; one failed link does not fail the batch)
 
     # [示例/Example]
     url = ["https://www.tiktok.com/@tiktok"]
@@ -823,7 +835,7 @@ async def get_all_aweme_id(
     ### 参数:
     - url: 作品链接
     ### 返回:
-    - 作品id
+    - 作品id（按输入顺序逐项返回 input/success/data/error，单个链接失败不影响其余链接）
 
     # [English]
     ### Purpose:
@@ -831,7 +843,7 @@ async def get_all_aweme_id(
     ### Parameters:
     - url: Video link
     ### Return:
-    - Video id
+    - Video id (per-item input/success/data/error entries in input order; one failed link does not fail the batch)
 
     # [示例/Example]
     url = ["https://www.tiktok.com/@owlcitymusic/video/7218694761253735723"]
@@ -901,7 +913,7 @@ async def get_all_unique_id(
     ### 参数:
     - url: 用户主页链接
     ### 返回:
-    - unique_id
+    - unique_id（按输入顺序逐项返回 input/success/data/error，单个链接失败不影响其余链接）
 
     # [English]
     ### Purpose:
@@ -909,7 +921,7 @@ async def get_all_unique_id(
     ### Parameters:
     - url: User homepage link
     ### Return:
-    - unique_id
+    - unique_id (per-item input/success/data/error entries in input order; one failed link does not fail the batch)
 
     # [示例/Example]
     url = ["https://www.tiktok.com/@tiktok"]
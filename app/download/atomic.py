@@ -0,0 +1,132 @@
+import hashlib
+import json
+import os
+import time
+import uuid
+from typing import Optional
+
+# 完整性标记文件后缀：<file>.meta 记录大小与 SHA-256 (Completeness sidecar suffix recording size and SHA-256)
+SIDECAR_SUFFIX = ".meta"
+
+
+def sidecar_path(file_path: str) -> str:
+    """完整性标记文件路径 (Path of the completeness sidecar)"""
+    return file_path + SIDECAR_SUFFIX
+
+
+def temp_path(file_path: str, suffix: str = "part") -> str:
+    """
+    与目标文件同目录的唯一临时文件路径，保证 os.replace 在同一文件系统内原子完成
+    (Unique temp path in the target's directory so os.replace stays atomic on one filesystem)
+    """
+    return f"{file_path}.{uuid.uuid4().hex}.{suffix}"
+
+
+def file_sha256(path: str, chunk_size: int = 1024 * 1024) -> str:
+    """计算文件 SHA-256（阻塞，在工作线程中调用）(SHA-256 of a file; blocking, run in a worker thread)"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _fsync_path(path: str, directory: bool = False):
+    flags = os.O_RDONLY if directory else os.O_RDWR
+    if directory:
+        flags |= getattr(os, "O_DIRECTORY", 0)
+    try:
+        fd = os.open(path, flags)
+    except OSError:
+        # 部分平台不支持打开目录 (Some platforms cannot open directories)
+        if directory:
+            return
+        raise
+    try:
+        os.fsync(fd)
+    except OSError:
+        if not directory:
+            raise
+    finally:
+        os.close(fd)
+
+
+def write_json_atomic(path: str, data: dict):
+    """原子写入 JSON 文件（阻塞）(Write a JSON file atomically; blocking)"""
+    temp = temp_path(path, "tmp")
+    try:
+        with open(temp, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp, path)
+    except BaseException:
+        try:
+            os.unlink(temp)
+        except OSError:
+            pass
+        raise
+
+
+def publish(part_path: str, file_path: str, size: int, sha256: Optional[str] = None):
+    """
+    将已完整写入的临时文件发布为目标文件（阻塞，在工作线程中调用）
+    (Publish a fully written temp file as the target; blocking, run in a worker thread)
+
+    顺序：fsync 临时文件 -> 移除旧标记 -> 原子 rename -> fsync 目录 -> 原子写入标记。
+    任一步骤之前崩溃都只会留下无标记的文件，缓存快速路径不会信任它。
+    (Order: fsync temp file, drop the old sidecar, atomic rename, fsync the directory, write the sidecar atomically.
+    A crash at any point leaves at most an unmarked file, which the cache fast path never trusts.)
+
+    Args:
+        part_path (str): 同目录临时文件 (Temp file in the same directory)
+        file_path (str): 目标文件 (Target file)
+        size (int): 已写入的字节数 (Bytes written)
+        sha256 (str | None): 内容摘要，None 时从文件计算 (Content digest, computed from the file when None)
+    """
+    _fsync_path(part_path)
+    actual = os.path.getsize(part_path)
+    if actual != size:
+        raise OSError(f"Temp file size {actual} does not match the {size} bytes written")
+    if sha256 is None:
+        sha256 = file_sha256(part_path)
+    try:
+        os.unlink(sidecar_path(file_path))
+    except FileNotFoundError:
+        pass
+    os.replace(part_path, file_path)
+    _fsync_path(os.path.dirname(file_path) or ".", directory=True)
+    write_json_atomic(sidecar_path(file_path), {"size": size, "sha256": sha256, "published_at": int(time.time())})
+
+
+def read_sidecar(file_path: str) -> Optional[dict]:
+    """读取完整性标记，不存在或损坏时返回 None (Read the sidecar; None when missing or corrupt)"""
+    try:
+        with open(sidecar_path(file_path), "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return data if isinstance(data, dict) and isinstance(data.get("size"), int) else None
+
+
+def is_complete(file_path: str) -> bool:
+    """
+    目标文件是否为已发布的完整文件：标记存在且大小一致，不读取文件内容
+    (Whether the target is a published, complete file: the sidecar exists and the size matches; content is not read)
+    """
+    meta = read_sidecar(file_path)
+    if meta is None:
+        return False
+    try:
+        return os.path.getsize(file_path) == meta["size"]
+    except OSError:
+        return False
+
+
+def remove(file_path: str):
+    """删除目标文件及其标记，先删标记使文件立即失去信任 (Remove a target and its sidecar, sidecar first)"""
+    for path in (sidecar_path(file_path), file_path):
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,295 @@
+import asyncio
+import time
+from collections import deque
+from typing import Callable, Optional
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+from crawlers.utils.logger import log_metric
+
+# 吞吐量统计窗口秒数 (Throughput window in seconds)
+_METER_WINDOW = 5
+
+# 受自身读取速度限制的客户端按实测吞吐量乘以该余量计需求，使其能逐步提速
+# (Clients limited by their own reads demand their measured throughput times this headroom, so they can speed up)
+_DEMAND_HEADROOM = 1.25
+
+# 受自身读取速度限制的客户端至少保留的等分份额比例 (Minimum fraction of the equal split kept by self-limited clients)
+_MIN_SHARE = 0.1
+
+
+class _Meter:
+    """按秒分桶的字节计数，用于估算最近的吞吐量 (Per-second byte buckets for recent throughput)"""
+
+    def __init__(self):
+        self._buckets: deque = deque(maxlen=_METER_WINDOW + 1)
+
+    def add(self, n: int, now: float):
+        second = int(now)
+        if self._buckets and self._buckets[-1][0] == second:
+            self._buckets[-1][1] += n
+        else:
+            self._buckets.append([second, n])
+
+    def rate(self, now: float) -> float:
+        """最近窗口内的平均字节/秒 (Average bytes per second over the recent window)"""
+        since = int(now) - _METER_WINDOW
+        return sum(n for second, n in self._buckets if second >= since) / _METER_WINDOW
+
+
+class _Client:
+    def __init__(self):
+        self.transfers: set = set()
+        self.bytes_sent = 0
+        self.throttled = 0.0
+        self.completed = 0
+        self.last_active = time.monotonic()
+        self.active_since = self.last_active
+        self.last_throttled = 0.0
+        self.meter = _Meter()
+
+
+class ShapedTransfer:
+    """
+    一次受限速的传输：自带令牌桶，速率随并发传输数动态调整 (One shaped transfer with its own token bucket,
+    whose rate follows the number of concurrent transfers)
+    """
+
+    def __init__(self, shaper: "BandwidthShaper", client: str):
+        self.shaper = shaper
+        self.client = client
+        self.bytes_sent = 0
+        self.throttled = 0.0
+        self.started = time.monotonic()
+        self._tokens = float(shaper.burst)
+        self._last = self.started
+
+    async def pace(self, n: int):
+        """发送 n 字节前调用，超出当前公平份额时等待 (Call before sending n bytes; waits when over the fair share)"""
+        shaper = self.shaper
+        now = time.monotonic()
+        state = shaper._clients.get(self.client)
+        if state is not None:
+            state.bytes_sent += n
+            state.last_active = now
+            state.meter.add(n, now)
+        self.bytes_sent += n
+        rate = shaper.rate_for(self.client)
+        if not rate:
+            return
+        self._tokens = min(float(shaper.burst), self._tokens + (now - self._last) * rate)
+        self._last = now
+        self._tokens -= n
+        if self._tokens < 0:
+            delay = -self._tokens / rate
+            self.throttled += delay
+            if state is not None:
+                state.throttled += delay
+                state.last_throttled = now
+            await asyncio.sleep(delay)
+
+    def close(self):
+        self.shaper._close(self)
+
+
+class BandwidthShaper:
+    """
+    下载带宽调度器：全局与单客户端速率上限（字节令牌桶），并发传输间公平分配 (Download bandwidth scheduler with
+    global and per-client byte-rate caps, shared fairly across concurrent transfers)
+
+    - 全局速率按注水法在活跃客户端间做最大最小公平分配：需求低于等分份额的客户端（受单客户端上限约束，或持续一个统计
+      窗口未被限速、受自身读取速度限制）只得到其需求，剩余带宽在其余客户端间继续平分；客户端的份额再在其并发传输间平分
+    - 每个传输起始有 burst 字节的令牌，小文件（如图片、短视频）不被限速
+    - 统计每个客户端的已发送字节、近期吞吐量与被限速时长
+
+    Args:
+        global_rate (int): 全局字节/秒上限，0 表示不限制 (Global bytes/s cap, 0 means unlimited)
+        client_rate (int): 单客户端字节/秒上限，0 表示不限制 (Per-client bytes/s cap, 0 means unlimited)
+        burst (int): 每个传输不受限速的起始字节数 (Bytes each transfer may send before pacing starts)
+        client_header (str): 用于识别客户端的请求头（如 X-Real-IP），为空时使用连接地址
+            (Header identifying the client behind a proxy, e.g. X-Real-IP; the peer address when empty)
+        enabled (bool): 是否启用 (Whether shaping and metering are enabled)
+    """
+
+    def __init__(
+        self,
+        global_rate: int = 0,
+        client_rate: int = 0,
+        burst: int = 4 * 1024 * 1024,
+        client_header: str = "",
+        enabled: bool = True,
+    ):
+        self.global_rate = max(0, int(global_rate or 0))
+        self.client_rate = max(0, int(client_rate or 0))
+        self.burst = max(0, int(burst or 0))
+        self.client_header = client_header or ""
+        self.enabled = bool(enabled)
+        self._clients: dict[str, _Client] = {}
+
+    @classmethod
+    def from_config(cls, cfg: Optional[dict]) -> "BandwidthShaper":
+        """从配置字典创建调度器 (Create the scheduler from a config dict)"""
+        cfg = cfg or {}
+        return cls(
+            global_rate=cfg.get("Global_Rate", 0),
+            client_rate=cfg.get("Client_Rate", 0),
+            burst=cfg.get("Burst", 4 * 1024 * 1024),
+            client_header=cfg.get("Client_Header", ""),
+            enabled=cfg.get("Enabled", True),
+        )
+
+    def client_id(self, request: Request) -> str:
+        """识别请求的客户端 (Identify the client of a request)"""
+        if self.client_header:
+            value = request.headers.get(self.client_header, "").split(",")[0].strip()
+            if value:
+                return value
+        return request.client.host if request.client else "unknown"
+
+    def rate_for(self, client: str) -> float:
+        """
+        客户端单个传输当前的公平速率，0 表示不限制 (Current fair rate of one transfer of a client, 0 means unlimited)
+        """
+        state = self._clients.get(client)
+        transfers = max(1, len(state.transfers) if state else 1)
+        if self.global_rate:
+            return self._allocations().get(client, self.global_rate) / transfers
+        return self.client_rate / transfers
+
+    def _allocations(self) -> dict[str, float]:
+        """
+        注水法分配全局速率：按需求从小到大，需求不超过剩余等分份额的客户端得到其需求，其余客户端平分剩余带宽
+        (Water-fill the global rate: in ascending demand order, clients whose demand fits the remaining equal share
+        get exactly their demand and the rest split what is left)
+        """
+        now = time.monotonic()
+        active = {client: state for client, state in self._clients.items() if state.transfers}
+        floor = self.global_rate / max(1, len(active)) * _MIN_SHARE
+        demands = {}
+        for client, state in active.items():
+            demand = float(self.client_rate or self.global_rate)
+            # 稳定传输一个窗口且未被限速：受自身读取速度限制/Unthrottled for a full window: limited by its own reads
+            if now - state.active_since >= _METER_WINDOW and now - state.last_throttled >= _METER_WINDOW:
+                demand = min(demand, max(floor, state.meter.rate(now) * _DEMAND_HEADROOM))
+            demands[client] = demand
+        allocations = {}
+        remaining = float(self.global_rate)
+        pending = sorted(demands, key=demands.get)
+        while pending:
+            share = remaining / len(pending)
+            if demands[pending[0]] > share:
+                allocations.update((client, share) for client in pending)
+                break
+            client = pending.pop(0)
+            allocations[client] = demands[client]
+            remaining -= demands[client]
+        return allocations
+
+    def open(self, client: str) -> ShapedTransfer:
+        """登记一个新的传输 (Register a new transfer)"""
+        self._prune()
+        transfer = ShapedTransfer(self, client)
+        state = self._clients.setdefault(client, _Client())
+        if not state.transfers:
+            state.active_since = time.monotonic()
+        state.transfers.add(transfer)
+        return transfer
+
+    def _close(self, transfer: ShapedTransfer):
+        state = self._clients.get(transfer.client)
+        if state is None or transfer not in state.transfers:
+            return
+        state.transfers.discard(transfer)
+        state.completed += 1
+        state.last_active = time.monotonic()
+        log_metric(
+            "download_bandwidth",
+            client=transfer.client,
+            size_bytes=transfer.bytes_sent,
+            elapsed_ms=int((time.monotonic() - transfer.started) * 1000),
+            throttled_ms=int(transfer.throttled * 1000),
+        )
+
+    def _prune(self, idle: float = 300):
+        now = time.monotonic()
+        for client in [c for c, s in self._clients.items() if not s.transfers and now - s.last_active > idle]:
+            del self._clients[client]
+
+    def shape(self, response: Response, request: Request, on_done: Optional[Callable[[int], None]] = None) -> Response:
+        """
+        为响应体发送限速 (Shape the body of a response)
+
+        Args:
+            response (Response): 原始响应 (The response to shape)
+            request (Request): 当前请求，用于识别客户端 (The current request, used to identify the client)
+            on_done (Callable[[int], None] | None): 发送结束后以已发送字节数回调，未启用限速时同样调用
+                (Called with the bytes sent once the body is done, also when shaping is disabled)
+        """
+        if not self.enabled:
+            return response if on_done is None else ShapedResponse(response, None, "", on_done)
+        return ShapedResponse(response, self, self.client_id(request), on_done)
+
+    def stats(self) -> dict:
+        """带宽统计 (Bandwidth statistics)"""
+        now = time.monotonic()
+        clients = {
+            client: {
+                "active": len(state.transfers),
+                "completed": state.completed,
+                "bytes_sent": state.bytes_sent,
+                "throughput_bps": round(state.meter.rate(now), 1),
+                "throttled_ms": int(state.throttled * 1000),
+            }
+            for client, state in self._clients.items()
+        }
+        return {
+            "enabled": self.enabled,
+            "global_rate": self.global_rate,
+            "client_rate": self.client_rate,
+            "burst": self.burst,
+            "throughput_bps": round(sum(c["throughput_bps"] for c in clients.values()), 1),
+            "clients": clients,
+        }
+
+
+class ShapedResponse(Response):
+    """
+    包装任意响应，在发送每个响应体分块前按调度器限速 (Wrap any response and pace every body chunk through the shaper)
+    """
+
+    def __init__(
+        self,
+        inner: Response,
+        shaper: Optional[BandwidthShaper],
+        client: str,
+        on_done: Optional[Callable[[int], None]] = None,
+    ):
+        self.inner = inner
+        self.shaper = shaper
+        self.client = client
+        self.on_done = on_done
+        self.status_code = inner.status_code
+        self.background = inner.background
+        self.raw_headers = inner.raw_headers
+
+    async def __call__(self, scope, receive, send):
+        transfer = self.shaper.open(self.client) if self.shaper is not None else None
+        sent = 0
+
+        async def shaped_send(message):
+            nonlocal sent
+            if message["type"] == "http.response.body" and message.get("body"):
+                if transfer is not None:
+                    await transfer.pace(len(message["body"]))
+                sent += len(message["body"])
+            await send(message)
+
+        self.inner.background = self.background
+        try:
+            await self.inner(scope, receive, shaped_send)
+        finally:
+            if transfer is not None:
+                transfer.close()
+            if self.on_done is not None:
+                self.on_done(sent)
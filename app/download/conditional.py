@@ -0,0 +1,137 @@
+import os
+import re
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Optional
+
+import aiofiles
+from starlette.requests import Request
+from starlette.responses import FileResponse, Response, StreamingResponse
+
+from app.download import atomic
+
+_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def file_validators(path: str, st: os.stat_result) -> tuple[str, str]:
+    """
+    文件的强 ETag 与 Last-Modified (Strong ETag and Last-Modified of a file)
+
+    ETag 取完整性标记中的 SHA-256，内容不变则 ETag 不变；没有标记时退化为大小与纳秒修改时间。
+    (The ETag is the SHA-256 from the sidecar, stable for identical content; without a sidecar it falls back
+    to size and nanosecond mtime.)
+    """
+    meta = atomic.read_sidecar(path)
+    if meta and meta.get("sha256") and meta.get("size") == st.st_size:
+        etag = f'"{meta["sha256"]}"'
+    else:
+        etag = f'"{st.st_size:x}-{st.st_mtime_ns:x}"'
+    return etag, formatdate(int(st.st_mtime), usegmt=True)
+
+
+def _parse_date(value: str) -> Optional[float]:
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError, IndexError, OverflowError):
+        return None
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    """If-None-Match 弱比较 (Weak comparison for If-None-Match)"""
+    if header.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in header.split(","))
+
+
+def not_modified(request: Request, etag: str, mtime: float) -> bool:
+    """
+    条件请求是否可返回 304：If-None-Match 优先，否则比较 If-Modified-Since
+    (Whether a conditional GET may get 304: If-None-Match wins, otherwise If-Modified-Since is compared)
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return _etag_matches(if_none_match, etag)
+    since = _parse_date(request.headers.get("if-modified-since", ""))
+    return since is not None and int(mtime) <= since
+
+
+def byte_range(request: Request, size: int, etag: str, last_modified: str) -> Optional[tuple[int, int]]:
+    """
+    解析单个字节区间 (Parse a single byte range)
+
+    If-Range 与当前 ETag（强比较）或 Last-Modified 不一致、多区间或语法无法识别时返回 None，按完整文件响应；
+    区间无法满足时抛出 ValueError。
+    (Returns None, meaning a full response, when If-Range does not match the current ETag (strong comparison)
+    or Last-Modified, or for multiple or unrecognised ranges; raises ValueError when the range is unsatisfiable.)
+
+    Returns:
+        tuple[int, int] | None: 闭区间 (start, end) (Inclusive (start, end))
+    """
+    header = request.headers.get("range")
+    if not header:
+        return None
+    if_range = request.headers.get("if-range")
+    if if_range is not None and if_range.strip() not in (etag, last_modified):
+        return None
+    match = _RANGE.match(header.strip().replace(" ", ""))
+    if not match or match.group(1) == match.group(2) == "":
+        return None
+    first, last = match.groups()
+    if first == "":
+        # 后缀区间：最后 N 字节/Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            raise ValueError("Unsatisfiable range")
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        raise ValueError("Unsatisfiable range")
+    return start, end
+
+
+async def _read_range(path: str, start: int, end: int, chunk_size: int = 65536):
+    async with aiofiles.open(path, "rb") as f:
+        await f.seek(start)
+        remaining = end - start + 1
+        while remaining:
+            chunk = await f.read(min(chunk_size, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def cached_file_response(request: Request, path: str, filename: str, media_type: str) -> Response:
+    """
+    返回已缓存的下载文件，支持条件请求与字节区间 (Serve a cached download with conditional GET and byte ranges)
+
+    - If-None-Match / If-Modified-Since 命中时返回 304，不发送文件内容
+    - Range（可带 If-Range）返回 206 与对应区间；无法满足时返回 416
+    - 其余情况返回完整文件，并带上 ETag、Last-Modified 与 Accept-Ranges
+
+    Args:
+        request (Request): 当前请求 (Current request)
+        path (str): 文件路径 (File path)
+        filename (str): 下载文件名 (Download file name)
+        media_type (str): 媒体类型 (Media type)
+    """
+    st = os.stat(path)
+    etag, last_modified = file_validators(path, st)
+    headers = {"ETag": etag, "Last-Modified": last_modified, "Accept-Ranges": "bytes"}
+    if not_modified(request, etag, st.st_mtime):
+        return Response(status_code=304, headers=headers)
+    try:
+        selected = byte_range(request, st.st_size, etag, last_modified)
+    except ValueError:
+        return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{st.st_size}"})
+    if selected is None:
+        return FileResponse(path=path, filename=filename, media_type=media_type, headers=headers, stat_result=st)
+    start, end = selected
+    headers.update(
+        {
+            "Content-Range": f"bytes {start}-{end}/{st.st_size}",
+            "Content-Length": str(end - start + 1),
+            "Content-Disposition": f'attachment; filename="{filename}"',
+        }
+    )
+    return StreamingResponse(_read_range(path, start, end), status_code=206, media_type=media_type, headers=headers)
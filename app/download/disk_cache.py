@@ -0,0 +1,316 @@
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from typing import Callable, Optional
+
+import anyio
+from starlette.responses import Response
+
+from app.download import atomic, resume
+from crawlers.utils.logger import log_metric, logger
+
+
+class DownloadCache:
+    """
+    下载目录的有界 LRU 缓存 (Bounded LRU cache over the download directory)
+
+    - 内存索引记录每个已发布文件的大小与最近访问顺序，应用启动时由 load() 在工作线程中从磁盘重建（只收录带完整性标记的文件）
+    - 总占用超过 max_bytes 时在后台按最久未访问顺序删除文件，直到降到 max_bytes * low_watermark
+    - 正在传输中的文件（is_busy 返回 True）与正在发送给客户端的文件（hold 包装的响应）不会被淘汰
+    - 断点续传的部分文件（<file>.partial）同样计入预算并参与淘汰；超过 partial_max_age 的部分文件与进度日志
+      在启动扫描与每次淘汰时删除
+    - 统计占用、命中率与淘汰次数
+
+    Args:
+        root (str): 下载根目录 (Download root directory)
+        max_bytes (int): 字节预算，<= 0 表示不限制 (Byte budget, <= 0 means unlimited)
+        low_watermark (float): 淘汰后的目标占用比例 (Target fill ratio after eviction)
+        enabled (bool): 是否启用 (Whether the cache manager is enabled)
+        is_busy (Callable[[str], bool] | None): 判断文件是否正在传输 (Tells whether a file is being transferred)
+        remove (Callable[[str], None] | None): 删除文件的方法，默认 atomic.remove (Removes a file, atomic.remove by default)
+        partial_max_age (float): 部分文件可续传的秒数，<= 0 表示不过期 (Seconds a partial stays resumable, <= 0 never expires)
+    """
+
+    def __init__(
+        self,
+        root: str,
+        max_bytes: int = 0,
+        low_watermark: float = 0.9,
+        enabled: bool = True,
+        is_busy: Optional[Callable[[str], bool]] = None,
+        remove: Optional[Callable[[str], None]] = None,
+        partial_max_age: float = 0,
+    ):
+        # 与发布路径一致使用规范化的绝对路径作为索引键/Index keys are canonical absolute paths, like published paths
+        self.root = os.path.realpath(root)
+        self.max_bytes = max(0, int(max_bytes or 0))
+        self.low_watermark = min(1.0, max(0.0, float(low_watermark)))
+        self.enabled = bool(enabled)
+        self.is_busy = is_busy or (lambda path: False)
+        self.remove = remove or atomic.remove
+        self.partial_max_age = max(0.0, float(partial_max_age or 0))
+        self._index: "OrderedDict[str, int]" = OrderedDict()
+        self.used_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.evicted_bytes = 0
+        self._evicting: Optional[asyncio.Task] = None
+        self._in_use: dict[str, int] = {}
+        # 已索引的部分文件及其最后更新时间/Indexed partial files and when they were last updated
+        self._partials: dict[str, float] = {}
+
+    @classmethod
+    def from_config(
+        cls, cfg: Optional[dict], root: str, is_busy=None, remove=None, partial_max_age: float = 0
+    ) -> "DownloadCache":
+        """从配置字典创建缓存管理器 (Create the cache manager from a config dict)"""
+        cfg = cfg or {}
+        return cls(
+            root,
+            max_bytes=cfg.get("Max_Bytes", 0),
+            low_watermark=cfg.get("Low_Watermark", 0.9),
+            enabled=cfg.get("Enabled", True),
+            is_busy=is_busy,
+            remove=remove,
+            partial_max_age=partial_max_age,
+        )
+
+    def hit(self, path: str):
+        """缓存命中：更新最近访问顺序 (Cache hit: refresh the LRU position)"""
+        self.hits += 1
+        if not self.enabled:
+            return
+        if path in self._index:
+            self._index.move_to_end(path)
+        else:
+            self._track(path)
+        self._schedule_eviction()
+
+    def miss(self):
+        """缓存未命中，需要访问上游 (Cache miss, upstream will be fetched)"""
+        self.misses += 1
+
+    def add(self, path: str, size: int):
+        """
+        登记新发布的文件或保留下来的部分文件，超出预算时在后台淘汰
+        (Register a newly published file or a kept partial file and evict in the background if over budget)
+        """
+        if not self.enabled:
+            return
+        self._drop(path)
+        self._index[path] = size
+        self.used_bytes += size
+        if path.endswith(resume.PARTIAL_SUFFIX):
+            self._partials[path] = time.time()
+        self._schedule_eviction()
+
+    def forget(self, path: str):
+        """从索引中移除（文件已被调用方删除）(Remove from the index; the caller deleted the file)"""
+        if self.enabled:
+            self._drop(path)
+
+    def hold(self, path: str, response: Response) -> Response:
+        """
+        发送响应期间将文件登记为使用中，淘汰时跳过它 (Mark the file in use while the response is sent so eviction skips it)
+
+        内容寻址存储中发送的是 blob 路径，不是传输登记使用的暂存路径，因此需要单独登记。
+        (With content-addressed storage the served path is a blob, not the staging path transfers are keyed by.)
+
+        Args:
+            path (str): 发送的文件路径 (Path of the file being sent)
+            response (Response): 发送该文件的响应 (The response sending it)
+        """
+        return _HeldResponse(response, self, path)
+
+    def stats(self) -> dict:
+        """缓存统计 (Cache statistics)"""
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "max_bytes": self.max_bytes,
+            "used_bytes": self.used_bytes,
+            "files": len(self._index),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "evicted_bytes": self.evicted_bytes,
+        }
+
+    def _track(self, path: str):
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            return
+        self._index[path] = size
+        self.used_bytes += size
+
+    def _drop(self, path: str):
+        self._partials.pop(path, None)
+        size = self._index.pop(path, None)
+        if size is not None:
+            self.used_bytes -= size
+
+    async def load(self):
+        """
+        扫描下载目录重建索引，按最近访问/修改时间排序；扫描在工作线程中进行，应用启动时调用
+        (Rebuild the index from disk ordered by last access; the scan runs in a worker thread, call at app startup)
+        """
+        if not self.enabled:
+            return
+        found = await anyio.to_thread.run_sync(self._scan)
+        for updated, path, _ in found:
+            if path.endswith(resume.PARTIAL_SUFFIX) and path not in self._index:
+                self._partials[path] = updated
+        # 逆序插入到队首，使重建条目整体按时间升序排在扫描期间已登记的条目之前
+        # (Insert newest-first at the front so rebuilt entries stay ascending and older than ones registered meanwhile)
+        found.sort(reverse=True)
+        for _, path, size in found:
+            if path not in self._index:
+                self._index[path] = size
+                self.used_bytes += size
+                self._index.move_to_end(path, last=False)
+        logger.info("Download cache index rebuilt: %s files, %s bytes", len(self._index), self.used_bytes)
+        self._schedule_eviction()
+
+    def _scan(self) -> list[tuple[float, str, int]]:
+        """
+        列出带完整性标记的已发布文件与仍可续传的部分文件，并删除过期的部分文件与进度日志（阻塞）
+        (List published files with a completeness sidecar and still resumable partials, deleting expired partials
+        and journals; blocking)
+        """
+        found = []
+        now = time.time()
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            # 跳过任务状态等隐藏目录/Skip hidden directories such as job state
+            dirnames[:] = [d for d in dirnames if not d.startswith(".")]
+            names = set(filenames)
+            for name in filenames:
+                if name.endswith(resume.JOURNAL_SUFFIX) or name.endswith(resume.PARTIAL_SUFFIX):
+                    partial = self._scan_partial(os.path.join(dirpath, name), now)
+                    if partial is not None:
+                        found.append(partial)
+                    continue
+                if name.endswith(atomic.SIDECAR_SUFFIX) or name + atomic.SIDECAR_SUFFIX not in names:
+                    continue
+                path = os.path.join(dirpath, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                found.append((max(st.st_atime, st.st_mtime), path, st.st_size))
+        return found
+
+    def _scan_partial(self, path: str, now: float) -> Optional[tuple[float, str, int]]:
+        """
+        检查部分文件或进度日志：仍可续传时返回部分文件条目，过期或缺少另一半时删除（阻塞）
+        (Check a partial file or journal: return the partial's entry while resumable, delete it when expired or
+        missing its counterpart; blocking)
+        """
+        if path.endswith(resume.JOURNAL_SUFFIX):
+            target = path[: -len(resume.JOURNAL_SUFFIX)]
+            if not os.path.exists(resume.partial_path(target)):
+                resume.discard(target)
+            # 有部分文件时由部分文件的条目处理/Handled through the partial file's own entry otherwise
+            return None
+        target = path[: -len(resume.PARTIAL_SUFFIX)]
+        try:
+            st = os.stat(path)
+            updated = os.stat(resume.journal_path(target)).st_mtime
+        except OSError:
+            updated = None
+        if updated is None or (self.partial_max_age and now - updated > self.partial_max_age):
+            if not self.is_busy(target):
+                resume.discard(target)
+            return None
+        return updated, path, st.st_size
+
+    def _schedule_eviction(self):
+        if not self.max_bytes or self.used_bytes <= self.max_bytes:
+            return
+        if self._evicting is not None and not self._evicting.done():
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._evicting = loop.create_task(self.evict())
+
+    async def evict(self) -> int:
+        """
+        按 LRU 顺序淘汰文件直到降到低水位 (Evict files in LRU order down to the low watermark)
+
+        Returns:
+            int: 淘汰的文件数 (Number of evicted files)
+        """
+        if not self.max_bytes or self.used_bytes <= self.max_bytes:
+            return 0
+        victims = []
+        # 先清理过期的部分文件，再按 LRU 淘汰/Drop expired partials first, then evict in LRU order
+        now = time.time()
+        for path, updated in list(self._partials.items()):
+            if self.partial_max_age and now - updated > self.partial_max_age and not self._busy(path):
+                victims.append((path, self._index[path]))
+                self._drop(path)
+        target = int(self.max_bytes * self.low_watermark)
+        for path in list(self._index):
+            if self.used_bytes <= target:
+                break
+            if self._busy(path):
+                continue
+            victims.append((path, self._index[path]))
+            self._drop(path)
+        start = time.perf_counter()
+        await anyio.to_thread.run_sync(self._remove_files, [path for path, _ in victims])
+        self.evictions += len(victims)
+        freed = sum(size for _, size in victims)
+        self.evicted_bytes += freed
+        log_metric(
+            "download_cache_evict",
+            files=len(victims),
+            freed_bytes=freed,
+            used_bytes=self.used_bytes,
+            elapsed_ms=int((time.perf_counter() - start) * 1000),
+        )
+        return len(victims)
+
+    def _busy(self, path: str) -> bool:
+        if path.endswith(resume.PARTIAL_SUFFIX):
+            # 部分文件按其目标文件判断是否正在传输/A partial is busy while its target is being transferred
+            return self.is_busy(path[: -len(resume.PARTIAL_SUFFIX)])
+        return path in self._in_use or self.is_busy(path)
+
+    def _remove_files(self, paths: list[str]):
+        for path in paths:
+            try:
+                if path.endswith(resume.PARTIAL_SUFFIX):
+                    resume.discard(path[: -len(resume.PARTIAL_SUFFIX)])
+                else:
+                    self.remove(path)
+            except OSError as e:
+                logger.warning("Failed to evict %s: %s", path, e)
+
+
+class _HeldResponse(Response):
+    """发送期间保持文件登记为使用中的响应包装 (Response wrapper keeping its file registered as in use while sending)"""
+
+    def __init__(self, inner: Response, cache: DownloadCache, path: str):
+        self.inner = inner
+        self.cache = cache
+        self.path = path
+        self.status_code = inner.status_code
+        self.background = inner.background
+        self.raw_headers = inner.raw_headers
+
+    async def __call__(self, scope, receive, send):
+        in_use = self.cache._in_use
+        in_use[self.path] = in_use.get(self.path, 0) + 1
+        self.inner.background = self.background
+        try:
+            await self.inner(scope, receive, send)
+        finally:
+            in_use[self.path] -= 1
+            if not in_use[self.path]:
+                del in_use[self.path]
@@ -0,0 +1,176 @@
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Optional
+
+from crawlers.utils.logger import log_metric
+
+
+class FFmpegQueueFullError(Exception):
+    """FFmpeg 任务队列已满时抛出 (Raised when the FFmpeg job queue is full)"""
+
+
+class FFmpegJob:
+    """工作池中的一个任务，调用方在结束前写入 returncode 与 stderr (A pool job; the caller fills returncode/stderr)"""
+
+    __slots__ = ("returncode", "stderr")
+
+    def __init__(self):
+        self.returncode = -1
+        self.stderr = b""
+
+
+class FFmpegPool:
+    """
+    FFmpeg 子进程工作池 (FFmpeg subprocess worker pool)
+
+    - 同时运行的 ffmpeg 进程数不超过 workers，等待中的任务数不超过 max_queue，超出时立即拒绝
+    - 记录每个任务的排队等待时长与运行时长
+    - stderr 只保留最后 stderr_limit 字节，避免长时间运行的 ffmpeg 无限占用内存
+
+    Args:
+        workers (int): 最大并发进程数，<= 0 时使用 CPU 核数 (Max concurrent processes, CPU count when <= 0)
+        max_queue (int): 最大排队任务数 (Max queued jobs)
+        stderr_limit (int): 保留的 stderr 尾部字节数 (Bytes of stderr tail kept)
+        binary (str): ffmpeg 可执行文件 (ffmpeg executable)
+    """
+
+    def __init__(self, workers: int = 0, max_queue: int = 32, stderr_limit: int = 64 * 1024, binary: str = "ffmpeg"):
+        self.binary = binary or "ffmpeg"
+        self.workers = int(workers) if workers and int(workers) > 0 else (os.cpu_count() or 1)
+        self.max_queue = max(0, int(max_queue))
+        self.stderr_limit = max(0, int(stderr_limit))
+        self.waiting = 0
+        self.running = 0
+        self._counters = {"submitted": 0, "completed": 0, "failed": 0, "rejected": 0}
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._run_total = 0.0
+        self._run_max = 0.0
+        self._sem: Optional[asyncio.Semaphore] = None
+        self._sem_loop = None
+
+    @classmethod
+    def from_config(cls, cfg: Optional[dict]) -> "FFmpegPool":
+        """从配置字典创建工作池 (Create the pool from a config dict)"""
+        cfg = cfg or {}
+        return cls(
+            workers=cfg.get("Workers", 0),
+            max_queue=cfg.get("Max_Queue", 32),
+            stderr_limit=cfg.get("Stderr_Limit", 64 * 1024),
+            binary=cfg.get("Binary", "ffmpeg"),
+        )
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        # 信号量绑定到当前事件循环 (Bind the semaphore to the running loop)
+        loop = asyncio.get_running_loop()
+        if self._sem is None or self._sem_loop is not loop:
+            self._sem = asyncio.Semaphore(self.workers)
+            self._sem_loop = loop
+        return self._sem
+
+    async def read_tail(self, stream: Optional[asyncio.StreamReader]) -> bytes:
+        """持续读取 stderr，只保留最后 stderr_limit 字节 (Drain stderr keeping only the last stderr_limit bytes)"""
+        tail = bytearray()
+        if stream is None:
+            return b""
+        while True:
+            chunk = await stream.read(4096)
+            if not chunk:
+                return bytes(tail)
+            tail += chunk
+            if len(tail) > self.stderr_limit:
+                del tail[: len(tail) - self.stderr_limit]
+
+    @asynccontextmanager
+    async def slot(self):
+        """
+        占用一个工作槽位，在其中自行启动 ffmpeg；退出时记录排队/运行耗时
+        (Hold one worker slot to start ffmpeg yourself; queue wait and run time are recorded on exit)
+
+        Yields:
+            FFmpegJob: 由调用方写入 returncode 与 stderr (Filled in by the caller)
+
+        Raises:
+            FFmpegQueueFullError: 排队任务数已达上限 (The queue is full)
+        """
+        semaphore = self._semaphore()
+        if self.running >= self.workers and self.waiting >= self.max_queue:
+            self._counters["rejected"] += 1
+            log_metric("ffmpeg_pool", status="rejected", waiting=self.waiting, running=self.running)
+            raise FFmpegQueueFullError(f"FFmpeg queue is full ({self.waiting} waiting)")
+
+        self._counters["submitted"] += 1
+        self.waiting += 1
+        queued_at = time.perf_counter()
+        try:
+            await semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        wait = time.perf_counter() - queued_at
+        self.running += 1
+        started_at = time.perf_counter()
+        job = FFmpegJob()
+        try:
+            yield job
+        finally:
+            elapsed = time.perf_counter() - started_at
+            self.running -= 1
+            semaphore.release()
+            self._counters["completed" if job.returncode == 0 else "failed"] += 1
+            self._wait_total += wait
+            self._wait_max = max(self._wait_max, wait)
+            self._run_total += elapsed
+            self._run_max = max(self._run_max, elapsed)
+            log_metric(
+                "ffmpeg_pool",
+                status="ok" if job.returncode == 0 else "error",
+                returncode=job.returncode,
+                queue_wait_ms=int(wait * 1000),
+                run_ms=int(elapsed * 1000),
+                stderr_bytes=len(job.stderr),
+            )
+
+    async def run(self, cmd: list[str], **kwargs) -> tuple[int, bytes]:
+        """
+        排队并运行一个 ffmpeg 命令 (Queue and run one ffmpeg command)
+
+        Args:
+            cmd (list[str]): 命令及参数 (Command and arguments)
+            **kwargs: 透传给 create_subprocess_exec 的参数 (Passed to create_subprocess_exec)
+
+        Returns:
+            tuple[int, bytes]: 返回码与 stderr 尾部 (Return code and stderr tail)
+
+        Raises:
+            FFmpegQueueFullError: 排队任务数已达上限 (The queue is full)
+        """
+        async with self.slot() as job:
+            kwargs.setdefault("stdout", asyncio.subprocess.DEVNULL)
+            process = await asyncio.create_subprocess_exec(*cmd, stderr=asyncio.subprocess.PIPE, **kwargs)
+            try:
+                job.stderr = await self.read_tail(process.stderr)
+                job.returncode = await process.wait()
+            except BaseException:
+                # 请求取消时结束子进程 (Kill the subprocess when the caller is cancelled)
+                if process.returncode is None:
+                    process.kill()
+                    await asyncio.shield(process.wait())
+                raise
+            return job.returncode, job.stderr
+
+    def stats(self) -> dict:
+        """工作池统计信息 (Pool statistics)"""
+        finished = self._counters["completed"] + self._counters["failed"]
+        return {
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "running": self.running,
+            "waiting": self.waiting,
+            **self._counters,
+            "queue_wait_ms_avg": int(self._wait_total / finished * 1000) if finished else 0,
+            "queue_wait_ms_max": int(self._wait_max * 1000),
+            "run_ms_avg": int(self._run_total / finished * 1000) if finished else 0,
+            "run_ms_max": int(self._run_max * 1000),
+        }
@@ -0,0 +1,380 @@
+import asyncio
+import json
+import os
+import re
+import time
+import uuid
+from typing import Awaitable, Callable, Optional
+
+import anyio
+
+from app.download import atomic
+from crawlers.utils.logger import log_metric, logger
+
+# 任务状态 (Job states)
+STATUS_QUEUED = "queued"
+STATUS_RUNNING = "running"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+FINISHED_STATUSES = frozenset({STATUS_DONE, STATUS_FAILED})
+
+_JOB_ID_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+
+
+class JobQueueFullError(Exception):
+    """下载任务队列已满时抛出 (Raised when the download job queue is full)"""
+
+
+class DownloadJob:
+    """
+    后台下载任务及其进度 (A background download job and its progress)
+
+    下载流程通过 set_stage / add_progress 汇报进度，每次变化都会递增 version 并唤醒长轮询等待者。
+    (The download core reports through set_stage / add_progress; every change bumps version and wakes long-pollers.)
+
+    Attributes:
+        id (str): 任务ID (Job id)
+        url (str): 提交的URL (Submitted URL)
+        status (str): queued/running/done/failed
+        stage (str): 当前阶段，如 resolving/downloading/merging (Current stage)
+        bytes_done (int): 已下载字节数 (Downloaded bytes)
+        bytes_total (int | None): 已知的总字节数 (Known total bytes)
+        version (int): 状态版本号 (State version)
+    """
+
+    _FIELDS = (
+        "id",
+        "url",
+        "prefix",
+        "with_watermark",
+        "status",
+        "stage",
+        "bytes_done",
+        "bytes_total",
+        "file_path",
+        "file_name",
+        "media_type",
+        "error",
+        "created_at",
+        "started_at",
+        "finished_at",
+        "version",
+    )
+
+    def __init__(self, url: str, prefix: bool = True, with_watermark: bool = False, id: Optional[str] = None):
+        self.id = id or uuid.uuid4().hex
+        self.url = url
+        self.prefix = bool(prefix)
+        self.with_watermark = bool(with_watermark)
+        self.status = STATUS_QUEUED
+        self.stage = STATUS_QUEUED
+        self.bytes_done = 0
+        self.bytes_total: Optional[int] = None
+        self.file_path: Optional[str] = None
+        self.file_name: Optional[str] = None
+        self.media_type: Optional[str] = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.version = 0
+        self._on_change: Optional[Callable[["DownloadJob", bool], None]] = None
+        self._event: Optional[asyncio.Event] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_STATUSES
+
+    def set_stage(self, stage: str):
+        """切换阶段 (Switch to a new stage)"""
+        self.stage = stage
+        self._changed(force=True)
+
+    def add_progress(self, done: int = 0, total: int = 0):
+        """
+        累加进度 (Accumulate progress)
+
+        Args:
+            done (int): 新增已下载字节数 (Newly downloaded bytes)
+            total (int): 新增已知总字节数，如每路上游的 Content-Length (Newly known total, e.g. an upstream Content-Length)
+        """
+        self.bytes_done += done
+        if total:
+            self.bytes_total = (self.bytes_total or 0) + total
+        self._changed(force=False)
+
+    def eta_seconds(self) -> Optional[float]:
+        """按平均速率估算剩余秒数，无法估算时返回 None (Remaining seconds at the average rate, None if unknown)"""
+        if self.status != STATUS_RUNNING or not self.bytes_total or not self.started_at or not self.bytes_done:
+            return None
+        elapsed = time.time() - self.started_at
+        if elapsed <= 0:
+            return None
+        rate = self.bytes_done / elapsed
+        return round(max(0, self.bytes_total - self.bytes_done) / rate, 1)
+
+    async def wait_for_change(self, version: int, timeout: float):
+        """等待版本号变化或超时 (Wait until the version differs from the given one or the timeout expires)"""
+        if self.version != version or self.finished or timeout <= 0:
+            return
+        if self._event is None:
+            self._event = asyncio.Event()
+        try:
+            await asyncio.wait_for(self._event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    def _changed(self, force: bool):
+        self.version += 1
+        if self._event is not None:
+            self._event.set()
+            self._event = None
+        if self._on_change is not None:
+            self._on_change(self, force)
+
+    def to_dict(self) -> dict:
+        data = {name: getattr(self, name) for name in self._FIELDS}
+        data["eta_seconds"] = self.eta_seconds()
+        return data
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "DownloadJob":
+        job = cls(data.get("url", ""), id=data.get("id"))
+        for name in cls._FIELDS:
+            if name in data:
+                setattr(job, name, data[name])
+        return job
+
+
+class DownloadJobManager:
+    """
+    有界后台下载任务管理器 (Bounded background download job manager)
+
+    - 任务在 workers 个后台协程中执行，与提交请求的处理函数无关，客户端断开或请求取消不会中断下载
+    - 排队任务数超过 max_queue 时立即拒绝
+    - 每个任务的状态以 JSON 文件保存在 state_dir；应用启动时调用 start()，重启前未完成的任务重新排队，已完成的任务仍可查询
+    - 已结束的任务在 retention 秒后清理，每次提交与任务结束时检查（仅清理状态文件，下载的文件由缓存管理）
+
+    Args:
+        runner (Callable[[DownloadJob], Awaitable[None]]): 执行单个任务的协程函数，失败时抛出异常 (Runs one job, raises on failure)
+        state_dir (str): 任务状态目录 (Job state directory)
+        workers (int): 后台并发任务数 (Concurrent background jobs)
+        max_queue (int): 最大排队任务数 (Max queued jobs)
+        retention (int): 已结束任务的保留秒数 (Seconds finished jobs are kept)
+        save_interval (float): 进度落盘的最小间隔秒数 (Minimum seconds between progress writes)
+    """
+
+    def __init__(
+        self,
+        runner: Callable[[DownloadJob], Awaitable[None]],
+        state_dir: str,
+        workers: int = 2,
+        max_queue: int = 100,
+        retention: int = 24 * 3600,
+        save_interval: float = 1.0,
+    ):
+        self.runner = runner
+        self.state_dir = state_dir
+        self.workers = max(1, int(workers))
+        self.max_queue = max(0, int(max_queue))
+        self.retention = max(0, int(retention))
+        self.save_interval = max(0.0, float(save_interval))
+        self.jobs: dict[str, DownloadJob] = {}
+        self._saved_at: dict[str, float] = {}
+        # 每个任务待写入的最新状态（None 表示删除）及其写入协程/Latest pending state per job (None = delete) and its writer
+        self._pending: dict[str, Optional[dict]] = {}
+        self._writers: dict[str, asyncio.Task] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._loop = None
+        self._tasks: list[asyncio.Task] = []
+        self._loaded = False
+
+    @classmethod
+    def from_config(cls, cfg: Optional[dict], runner, default_state_dir: str) -> "DownloadJobManager":
+        """从配置字典创建任务管理器 (Create the manager from a config dict)"""
+        cfg = cfg or {}
+        return cls(
+            runner,
+            state_dir=cfg.get("State_Path") or default_state_dir,
+            workers=cfg.get("Workers", 2),
+            max_queue=cfg.get("Max_Queue", 100),
+            retention=cfg.get("Retention", 24 * 3600),
+        )
+
+    @staticmethod
+    def valid_id(job_id: str) -> bool:
+        return bool(_JOB_ID_PATTERN.match(job_id or ""))
+
+    def start(self):
+        """
+        恢复状态目录中的任务并启动工作协程，需在事件循环中调用（应用启动时）
+        (Restore jobs from the state directory and start the workers; call on the running loop at app startup)
+        """
+        self._load()
+        self._ensure_workers()
+
+    def get(self, job_id: str) -> Optional[DownloadJob]:
+        """查询任务 (Look up a job)"""
+        if not self.valid_id(job_id):
+            return None
+        # 未经应用启动（如直接使用管理器）时在首次查询启动/Start on first use when not started with the app
+        self.start()
+        return self.jobs.get(job_id)
+
+    def submit(self, url: str, prefix: bool = True, with_watermark: bool = False) -> DownloadJob:
+        """
+        提交下载任务 (Submit a download job)
+
+        Raises:
+            JobQueueFullError: 排队任务数已达上限 (The queue is full)
+        """
+        self.start()
+        self._prune()
+        if self._queue.qsize() >= self.max_queue:
+            log_metric("download_job", status="rejected", queued=self._queue.qsize())
+            raise JobQueueFullError(f"Download job queue is full ({self._queue.qsize()} queued)")
+        job = DownloadJob(url, prefix=prefix, with_watermark=with_watermark)
+        self._track(job)
+        self._save(job, force=True)
+        self._queue.put_nowait(job)
+        return job
+
+    def stats(self) -> dict:
+        """任务统计 (Job statistics)"""
+        counts = {STATUS_QUEUED: 0, STATUS_RUNNING: 0, STATUS_DONE: 0, STATUS_FAILED: 0}
+        for job in self.jobs.values():
+            counts[job.status] = counts.get(job.status, 0) + 1
+        return {"workers": self.workers, "max_queue": self.max_queue, **counts}
+
+    def _track(self, job: DownloadJob):
+        job._on_change = self._save
+        self.jobs[job.id] = job
+
+    def _ensure_workers(self):
+        """在当前事件循环中启动后台工作协程 (Start the background workers on the running loop)"""
+        loop = asyncio.get_running_loop()
+        if self._loop is loop and self._tasks:
+            return
+        self._loop = loop
+        self._queue = asyncio.Queue()
+        self._tasks = [loop.create_task(self._worker()) for _ in range(self.workers)]
+        # 重启前未完成的任务重新排队/Requeue jobs left unfinished by a previous run
+        for job in sorted(self.jobs.values(), key=lambda j: j.created_at):
+            if not job.finished:
+                job.status = job.stage = STATUS_QUEUED
+                job.bytes_done, job.bytes_total = 0, None
+                self._queue.put_nowait(job)
+
+    async def _worker(self):
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._run(job)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job: DownloadJob):
+        job.status = STATUS_RUNNING
+        job.started_at = time.time()
+        job.set_stage("starting")
+        try:
+            await self.runner(job)
+        except asyncio.CancelledError:
+            job.status, job.error = STATUS_FAILED, "cancelled"
+            raise
+        except Exception as e:
+            logger.warning("Download job %s failed: %s", job.id, e)
+            job.status, job.error = STATUS_FAILED, str(getattr(e, "detail", None) or e) or type(e).__name__
+        else:
+            job.status = STATUS_DONE
+        finally:
+            job.finished_at = time.time()
+            job.set_stage(job.status)
+            log_metric(
+                "download_job",
+                status=job.status,
+                elapsed_ms=int((job.finished_at - job.started_at) * 1000),
+                size_bytes=job.bytes_done,
+            )
+            self._prune()
+
+    def _path(self, job_id: str) -> str:
+        return os.path.join(self.state_dir, f"{job_id}.json")
+
+    def _save(self, job: DownloadJob, force: bool = True):
+        """
+        记录任务状态快照并交由后台写入，进度更新按 save_interval 节流
+        (Snapshot job state for a background write; progress writes are throttled)
+        """
+        now = time.monotonic()
+        if not force and now - self._saved_at.get(job.id, 0.0) < self.save_interval:
+            return
+        self._saved_at[job.id] = now
+        self._schedule_write(job.id, job.to_dict())
+
+    def _schedule_write(self, job_id: str, data: Optional[dict]):
+        """
+        同一任务的写入按顺序在工作线程中执行，排队期间只保留最新快照
+        (Writes for a job run in order in a worker thread; only the latest snapshot is kept while queued)
+        """
+        self._pending[job_id] = data
+        if job_id not in self._writers:
+            self._writers[job_id] = asyncio.get_running_loop().create_task(self._write(job_id))
+
+    async def _write(self, job_id: str):
+        try:
+            while job_id in self._pending:
+                data = self._pending.pop(job_id)
+                try:
+                    await anyio.to_thread.run_sync(self._write_state, job_id, data)
+                except OSError as e:
+                    logger.warning("Failed to persist download job %s: %s", job_id, e)
+        finally:
+            self._writers.pop(job_id, None)
+
+    def _write_state(self, job_id: str, data: Optional[dict]):
+        """写入或删除任务状态文件（阻塞，在工作线程中调用）(Write or delete a job state file; blocking, run in a worker thread)"""
+        if data is None:
+            try:
+                os.unlink(self._path(job_id))
+            except FileNotFoundError:
+                pass
+            return
+        os.makedirs(self.state_dir, exist_ok=True)
+        atomic.write_json_atomic(self._path(job_id), data)
+
+    async def flush(self):
+        """等待所有待写入的任务状态落盘 (Wait until all pending job state writes have landed)"""
+        while self._writers:
+            await asyncio.gather(*self._writers.values(), return_exceptions=True)
+
+    def _prune(self):
+        """清理超过保留期的已结束任务及其状态文件 (Drop finished jobs past retention together with their state files)"""
+        cutoff = time.time() - self.retention
+        for job in [j for j in self.jobs.values() if j.finished and (j.finished_at or 0) < cutoff]:
+            del self.jobs[job.id]
+            self._saved_at.pop(job.id, None)
+            # 删除排在该任务未完成的写入之后，避免文件被重新写回/Queued after pending writes so the file is not written back
+            self._schedule_write(job.id, None)
+
+    def _load(self):
+        """首次使用时从状态目录恢复任务并清理过期任务 (Restore jobs from the state directory and prune expired ones)"""
+        if self._loaded:
+            return
+        self._loaded = True
+        if not os.path.isdir(self.state_dir):
+            return
+        for name in os.listdir(self.state_dir):
+            job_id, ext = os.path.splitext(name)
+            if ext != ".json" or not self.valid_id(job_id):
+                continue
+            path = os.path.join(self.state_dir, name)
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    job = DownloadJob.from_dict(json.load(f))
+            except (OSError, ValueError) as e:
+                logger.warning("Skipping unreadable download job state %s: %s", name, e)
+                continue
+            self._track(job)
+        self._prune()
@@ -0,0 +1,148 @@
+import bisect
+import threading
+from typing import Optional
+
+# 耗时直方图默认桶（秒）(Default latency buckets in seconds)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+# 吞吐量直方图默认桶（字节/秒）(Default throughput buckets in bytes per second)
+THROUGHPUT_BUCKETS = tuple(2**n * 1024 for n in range(6, 19, 2))  # 64 KiB/s .. 256 MiB/s
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(pairs: tuple, extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in pairs]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Counter:
+    """按标签累加的计数器 (Counter keyed by labels)"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str):
+        self.name = name
+        self.documentation = documentation
+        self._values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(tuple(sorted(labels.items())), 0)
+
+    def render(self) -> list[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_label_text(key)} {_number(value)}" for key, value in items]
+
+
+class Histogram:
+    """按标签分组的累积桶直方图 (Cumulative-bucket histogram keyed by labels)"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, buckets: tuple = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(sorted(buckets))
+        # 每组标签：[各桶计数..., +Inf 计数, 总和] (Per label set: bucket counts, +Inf count, sum)
+        self._series: dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(sorted(labels.items()))
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def count(self, **labels) -> int:
+        series = self._series.get(tuple(sorted(labels.items())))
+        return sum(series[:-1]) if series else 0
+
+    def render(self) -> list[str]:
+        with self._lock:
+            items = sorted((key, list(series)) for key, series in self._series.items())
+        lines = []
+        for key, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series[:-1]):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else _number(bound)
+                labels = _label_text(key, 'le="' + le + '"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_label_text(key)} {_number(series[-1])}")
+            lines.append(f"{self.name}_count{_label_text(key)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    指标注册表，以 Prometheus 文本格式导出 (Metric registry exported in the Prometheus text format)
+    """
+
+    def __init__(self):
+        self._metrics: dict[str, object] = {}
+
+    def counter(self, name: str, documentation: str) -> Counter:
+        """注册或获取计数器 (Register or get a counter)"""
+        return self._metrics.setdefault(name, Counter(name, documentation))
+
+    def histogram(self, name: str, documentation: str, buckets: Optional[tuple] = None) -> Histogram:
+        """注册或获取直方图 (Register or get a histogram)"""
+        return self._metrics.setdefault(name, Histogram(name, documentation, buckets or LATENCY_BUCKETS))
+
+    def render(self) -> str:
+        """Prometheus 文本格式 (Prometheus text exposition format)"""
+        lines = []
+        for name, metric in self._metrics.items():
+            lines.append(f"# HELP {name} {metric.documentation}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+class DownloadMetrics:
+    """
+    下载流程的结构化指标，按平台与媒体类型（video / image）分组
+    (Structured download pipeline metrics broken down by platform and media type (video / image))
+    """
+
+    def __init__(self, registry: Optional[MetricsRegistry] = None):
+        self.registry = registry or MetricsRegistry()
+        r = self.registry
+        self.resolve = r.histogram("download_resolve_seconds", "Time to resolve the share URL into media data")
+        self.headers = r.histogram("download_headers_seconds", "Time to obtain the platform request headers")
+        self.ttfb = r.histogram("download_upstream_ttfb_seconds", "Time until the upstream media response headers arrive")
+        self.throughput = r.histogram(
+            "download_upstream_throughput_bytes_per_second", "Upstream transfer throughput", THROUGHPUT_BUCKETS
+        )
+        self.merge = r.histogram("download_merge_seconds", "Bilibili audio/video merge time")
+        self.request = r.histogram("download_request_seconds", "Time until /api/download starts responding")
+        self.cache = r.counter("download_cache_requests_total", "Download cache lookups by result")
+        self.fetched = r.counter("download_bytes_fetched_total", "Bytes received from upstream")
+        self.served = r.counter("download_bytes_served_total", "Bytes sent to download clients")
+
+    def record_fetch(self, platform: str, media_type: str, size: int, elapsed: float):
+        """记录一次上游传输的字节数与吞吐量 (Record the bytes and throughput of one upstream transfer)"""
+        self.fetched.inc(size, platform=platform, media_type=media_type)
+        if size and elapsed > 0:
+            self.throughput.observe(size / elapsed, platform=platform, media_type=media_type)
+
+    def render(self) -> str:
+        return self.registry.render()
@@ -0,0 +1,50 @@
+import os
+from typing import Optional
+from urllib.parse import quote
+
+from starlette.responses import Response
+
+# 支持的卸载模式 (Supported offload modes)
+MODE_NONE = "none"
+MODE_X_ACCEL = "x-accel"  # nginx internal location
+MODE_X_SENDFILE = "x-sendfile"  # Apache mod_xsendfile / lighttpd
+
+
+def offload_response(
+    cfg: Optional[dict], root: str, path: str, filename: str, media_type: str
+) -> Optional[Response]:
+    """
+    生成交给前置代理发送文件的空响应；未启用或文件不在下载根目录内时返回 None
+    (Build an empty response that hands the file to the front proxy; None when disabled or outside the download root)
+
+    - x-accel：返回 X-Accel-Redirect: <Internal_Prefix><相对下载根目录的路径>，需在 nginx 中配置
+      `location <Internal_Prefix> { internal; alias <Download_Path>/; }`
+    - x-sendfile：返回 X-Sendfile: <绝对路径>
+    区间请求、条件请求与零拷贝发送均由代理完成，Python 进程不再参与文件传输。
+    (Range, conditional requests and zero-copy sendfile are handled by the proxy; the Python process no longer
+    takes part in the transfer.)
+
+    Args:
+        cfg (dict | None): API.Download_Offload 配置 (API.Download_Offload config)
+        root (str): 下载根目录（已规范化）(Normalised download root)
+        path (str): 已发布的文件路径 (Published file path)
+        filename (str): 下载文件名 (Download file name)
+        media_type (str): 媒体类型 (Media type)
+    """
+    cfg = cfg or {}
+    mode = str(cfg.get("Mode", MODE_NONE)).lower()
+    if mode == MODE_NONE:
+        return None
+    if mode not in (MODE_X_ACCEL, MODE_X_SENDFILE):
+        raise ValueError(f"Unknown download offload mode: {mode}")
+    full = os.path.realpath(path)
+    if os.path.commonpath([full, root]) != root or full == root:
+        return None
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
+    if mode == MODE_X_ACCEL:
+        prefix = "/" + str(cfg.get("Internal_Prefix", "/_downloads/")).strip("/") + "/"
+        relative = os.path.relpath(full, root).replace(os.sep, "/")
+        headers["X-Accel-Redirect"] = prefix + quote(relative)
+    else:
+        headers["X-Sendfile"] = full
+    return Response(status_code=200, media_type=media_type, headers=headers)
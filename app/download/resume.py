@@ -0,0 +1,140 @@
+import hashlib
+import json
+import os
+import re
+import time
+from typing import Optional
+
+import httpx
+
+from app.download import atomic
+
+# 断点续传的部分文件与进度日志后缀 (Suffixes of the resumable partial file and its progress journal)
+PARTIAL_SUFFIX = ".partial"
+JOURNAL_SUFFIX = ".partial.json"
+
+_CONTENT_RANGE = re.compile(r"^bytes (\d+)-(\d+)/(\d+)$")
+
+
+def partial_path(file_path: str) -> str:
+    """目标文件对应的固定部分文件路径 (Fixed partial file path for a target)"""
+    return file_path + PARTIAL_SUFFIX
+
+
+def journal_path(file_path: str) -> str:
+    """目标文件对应的进度日志路径 (Progress journal path for a target)"""
+    return file_path + JOURNAL_SUFFIX
+
+
+def validator(response: httpx.Response) -> Optional[dict]:
+    """
+    从完整响应中提取续传校验值，无法安全续传时返回 None
+    (Extract the resume validator from a full response; None when the body cannot be resumed safely)
+
+    需要明确的 Content-Length、没有内容编码，并且有强 ETag 或 Last-Modified 可用于 If-Range。
+    (Requires an explicit Content-Length, no content encoding and a strong ETag or Last-Modified usable in If-Range.)
+    """
+    if "content-encoding" in response.headers:
+        return None
+    length = response.headers.get("content-length", "")
+    if not length.isdigit():
+        return None
+    etag = response.headers.get("etag")
+    if etag and etag.startswith("W/"):
+        etag = None
+    last_modified = response.headers.get("last-modified")
+    if not etag and not last_modified:
+        return None
+    return {"length": int(length), "etag": etag, "last_modified": last_modified}
+
+
+def save(file_path: str, offset: int, checks: dict):
+    """
+    记录已持久化的字节数（阻塞）；调用前部分文件须已写入至少 offset 字节
+    (Record the persisted byte count; blocking. The partial file must already hold at least offset bytes.)
+    """
+    atomic.write_json_atomic(journal_path(file_path), {**checks, "offset": offset, "updated_at": int(time.time())})
+
+
+def discard(file_path: str):
+    """删除部分文件与进度日志，先删日志 (Remove the journal, then the partial file)"""
+    for path in (journal_path(file_path), partial_path(file_path)):
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+
+
+def load(file_path: str, max_age: float = 0) -> Optional[dict]:
+    """
+    读取可续传的进度，并将部分文件截断到日志记录的偏移；无效或过期时清理并返回 None
+    (Load a resumable journal and truncate the partial file to its recorded offset; clean up and return None
+    when it is invalid or older than max_age seconds)
+    """
+    try:
+        with open(journal_path(file_path), "r", encoding="utf-8") as f:
+            journal = json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError):
+        discard(file_path)
+        return None
+    try:
+        offset, length = journal["offset"], journal["length"]
+        valid = isinstance(offset, int) and isinstance(length, int) and 0 < offset < length
+        if valid and max_age and time.time() - journal.get("updated_at", 0) > max_age:
+            valid = False
+        if valid and os.path.getsize(partial_path(file_path)) < offset:
+            valid = False
+    except (KeyError, TypeError, OSError):
+        valid = False
+    if not valid:
+        discard(file_path)
+        return None
+    # 崩溃时日志之后写入的数据不可信/Bytes written after the last journal entry are not trusted after a crash
+    os.truncate(partial_path(file_path), offset)
+    return journal
+
+
+def range_headers(journal: dict) -> dict:
+    """续传请求头：Range 与 If-Range (Resume request headers: Range and If-Range)"""
+    headers = {"Range": f"bytes={journal['offset']}-"}
+    if journal.get("etag") or journal.get("last_modified"):
+        headers["If-Range"] = journal.get("etag") or journal.get("last_modified")
+    return headers
+
+
+def resume_offset(journal: dict, response: httpx.Response) -> Optional[int]:
+    """
+    判断续传响应能否接在部分文件之后 (Decide whether a resume response continues the partial file)
+
+    Returns:
+        int | None: 206 且区间与校验值一致时返回续传偏移；200 表示源站返回了完整内容，返回 0；
+        其余情况（416、区间或校验值不一致）返回 None，调用方应丢弃部分文件并重新完整下载
+        (The resume offset for a matching 206; 0 for a 200 full body; None otherwise, in which case the caller
+        discards the partial file and downloads from scratch)
+    """
+    if response.status_code == 200:
+        return 0
+    if response.status_code != 206:
+        return None
+    match = _CONTENT_RANGE.match(response.headers.get("content-range", ""))
+    if not match or int(match.group(1)) != journal["offset"] or int(match.group(3)) != journal["length"]:
+        return None
+    if int(match.group(2)) != journal["length"] - 1 or "content-encoding" in response.headers:
+        return None
+    for header, key in (("etag", "etag"), ("last-modified", "last_modified")):
+        if journal.get(key) and response.headers.get(header) and response.headers[header] != journal[key]:
+            return None
+    return journal["offset"]
+
+
+def hash_prefix(path: str, size: int, chunk_size: int = 1024 * 1024):
+    """计算文件前 size 字节的 SHA-256 状态（阻塞）(SHA-256 state over the first size bytes of a file; blocking)"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        remaining = size
+        while remaining and (chunk := f.read(min(chunk_size, remaining))):
+            digest.update(chunk)
+            remaining -= len(chunk)
+    return digest
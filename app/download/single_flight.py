@@ -0,0 +1,190 @@
+import asyncio
+from typing import AsyncIterator, Callable, Optional, Union
+
+import anyio
+
+
+class TransferStalledError(TimeoutError):
+    """领头传输在超时时间内没有任何进展 (The leading transfer made no progress within the timeout)"""
+
+
+class InFlightTransfer:
+    """
+    某个目标文件的一次进行中传输 (One in-flight transfer of a target file)
+
+    领头请求负责下载，通过 start / advance / finish 汇报；跟随请求可等待完成（wait），
+    或在领头请求写入临时文件的同时读取已写入部分（follow）。
+    (The leader downloads and reports through start / advance / finish; followers either wait for completion
+    or tail the leader's temp file while it is being written.)
+
+    跟随请求的等待以“无进展超时”为界：超过 timeout 秒没有任何 start / advance / finish 时，传输以
+    TransferStalledError 结束并移出登记表，下一个加入的请求成为新的领头请求。这覆盖了领头请求的响应从未被发送
+    （无法执行任何清理）的情况。
+    (Follower waits are bounded by an idle timeout: after timeout seconds without any start / advance / finish the
+    transfer ends with TransferStalledError and is unregistered, so the next request to join leads a fresh one.
+    This covers a leader whose response was never sent and so never ran any cleanup.)
+
+    Attributes:
+        key (str): 目标文件路径 (Target file path)
+        part_path (str | None): 领头请求正在写入的临时文件，None 表示不可跟随读取 (Temp file being written, None if not followable)
+        size (int | None): 已知的总字节数 (Known total size)
+        written (int): 已写入临时文件并刷新的字节数 (Bytes written and flushed to the temp file)
+        error (BaseException | None): 失败原因 (Failure reason)
+    """
+
+    def __init__(self, key: str, registry: "SingleFlight"):
+        self.key = key
+        self.part_path: Optional[str] = None
+        self.size: Optional[int] = None
+        self.written = 0
+        self.started = False
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self._registry = registry
+        self._version = 0
+        self._event: Optional[asyncio.Event] = None
+
+    def start(self, part_path: Optional[str] = None, size: Optional[int] = None):
+        """上游已打开，跟随请求可以开始读取 part_path (Upstream is open; followers may start reading part_path)"""
+        self.part_path, self.size, self.started = part_path, size, True
+        self._notify()
+
+    def advance(self, n: int):
+        """已有 n 个新字节写入并刷新到临时文件 (n more bytes were written and flushed to the temp file)"""
+        self.written += n
+        self._notify()
+
+    def finish(self, error: Optional[BaseException] = None):
+        """
+        结束传输并从登记表移除；重复调用无效 (Finish the transfer and unregister it; later calls are no-ops)
+
+        Args:
+            error (BaseException | None): 失败原因，None 表示目标文件已完整写入 (Failure reason, None when the target is complete)
+        """
+        if self.done:
+            return
+        self.done, self.error = True, error
+        self._registry._release(self)
+        self._notify()
+
+    async def wait_started(self, timeout: Optional[float] = None):
+        """
+        等待领头请求打开上游或结束 (Wait until the leader opened upstream or finished)
+
+        Raises:
+            TransferStalledError: timeout 秒内没有进展 (No progress within timeout seconds)
+        """
+        while not (self.started or self.done):
+            await self._wait_for_change(self._version, timeout)
+
+    async def wait(self, timeout: Optional[float] = None):
+        """
+        等待传输结束，失败时抛出领头请求的异常 (Wait for the transfer to finish; re-raises the leader's error)
+
+        Raises:
+            TransferStalledError: timeout 秒内没有进展 (No progress within timeout seconds)
+        """
+        while not self.done:
+            await self._wait_for_change(self._version, timeout)
+        if self.error is not None:
+            raise self.error
+
+    async def follow(
+        self, final_path: Union[str, Callable[[], str]], chunk_size: int = 65536, timeout: Optional[float] = None
+    ) -> AsyncIterator[bytes]:
+        """
+        读取领头请求已写入的数据直到传输结束 (Stream the bytes the leader has written until the transfer ends)
+
+        临时文件在完成时被原子替换为目标文件，已打开的文件描述符仍然有效；若打开前已完成则直接读取目标文件。
+        (The temp file is atomically renamed on completion and an open descriptor stays valid; if the transfer
+        already finished before opening, the final file is read instead.)
+
+        Args:
+            final_path (str | Callable[[], str]): 目标文件路径，或完成后解析路径的函数 (Target file path, or a callable
+                resolving it after completion)
+            chunk_size (int): 单次读取的最大字节数 (Max bytes per read)
+            timeout (float | None): 无进展超时秒数，None 表示不限 (Idle timeout in seconds, None waits forever)
+        """
+        try:
+            f = open(self.part_path, "rb") if self.part_path else None
+        except FileNotFoundError:
+            f = None
+        if f is None:
+            await self.wait(timeout)
+            with open(final_path() if callable(final_path) else final_path, "rb") as f:
+                while chunk := await anyio.to_thread.run_sync(f.read, chunk_size):
+                    yield chunk
+            return
+        with f:
+            offset = 0
+            while True:
+                version, available = self._version, self.written
+                if offset < available:
+                    chunk = await anyio.to_thread.run_sync(f.read, min(chunk_size, available - offset))
+                    if not chunk:
+                        raise OSError(f"Transfer file for {self.key} is shorter than reported")
+                    offset += len(chunk)
+                    yield chunk
+                elif self.done:
+                    if self.error is not None:
+                        raise self.error
+                    return
+                else:
+                    await self._wait_for_change(version, timeout)
+
+    async def _wait_for_change(self, version: int, timeout: Optional[float] = None):
+        if self._version != version:
+            return
+        if self._event is None:
+            self._event = asyncio.Event()
+        try:
+            await asyncio.wait_for(self._event.wait(), timeout)
+        except asyncio.TimeoutError:
+            if self._version != version:
+                return
+            # 放弃停滞的传输，唤醒其他跟随请求/Abandon the stalled transfer and wake the other followers
+            self.finish(TransferStalledError(f"Transfer of {self.key} made no progress for {timeout}s"))
+            raise self.error from None
+
+    def _notify(self):
+        self._version += 1
+        if self._event is not None:
+            self._event.set()
+            self._event = None
+
+
+class SingleFlight:
+    """
+    按目标文件合并并发传输 (Coalesce concurrent transfers per target file)
+
+    同一目标文件同时只有一个领头请求访问上游，其余请求跟随它，最终得到同一个完整文件。
+    (Only one leader per target file talks to upstream; everyone else follows it and gets the same complete file.)
+    """
+
+    def __init__(self):
+        self._transfers: dict[str, InFlightTransfer] = {}
+
+    def join(self, key: str) -> tuple[InFlightTransfer, bool]:
+        """
+        加入目标文件的传输 (Join the transfer for a target file)
+
+        Returns:
+            tuple[InFlightTransfer, bool]: 传输对象与是否为领头请求；领头请求必须最终调用 finish
+            (The transfer and whether the caller leads it; the leader must eventually call finish)
+        """
+        transfer = self._transfers.get(key)
+        if transfer is not None:
+            return transfer, False
+        transfer = InFlightTransfer(key, self)
+        self._transfers[key] = transfer
+        return transfer, True
+
+    def get(self, key: str) -> Optional[InFlightTransfer]:
+        return self._transfers.get(key)
+
+    def __len__(self) -> int:
+        return len(self._transfers)
+
+    def _release(self, transfer: InFlightTransfer):
+        if self._transfers.get(transfer.key) is transfer:
+            del self._transfers[transfer.key]
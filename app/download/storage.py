@@ -0,0 +1,178 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+from app.download import atomic
+
+# 存储变体与扩展名 (Storage variants and their extensions)
+VARIANT_EXTENSIONS = {
+    "video": "mp4",
+    "video_watermark": "mp4",
+    "images": "zip",
+    "images_watermark": "zip",
+}
+
+# 内容寻址模式下的暂存文件名：<platform>.<id>.<variant>.<ext>；ID 已过滤为 [A-Za-z0-9_-]
+# (Staging name in content-addressed mode; ids are already restricted to [A-Za-z0-9_-])
+_STAGING_NAME = re.compile(r"^(douyin|tiktok|bilibili)\.([A-Za-z0-9_\-]+)\.(video|video_watermark|images|images_watermark)\.(mp4|zip)$")
+
+
+class FlatStorage:
+    """
+    平铺存储（默认）：<root>/<platform>_<video|image>/<文件名> (Flat layout: one directory per platform and type)
+
+    完整性由 <file>.meta 标记保证，查找需要读取标记与文件大小。
+    (Completeness is guaranteed by the <file>.meta sidecar; lookups read the sidecar and stat the file.)
+    """
+
+    name = "flat"
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def target(self, platform: str, media_id: str, variant: str, file_name: str) -> str:
+        """下载应写入的目标路径 (Path the download should be published to)"""
+        kind = "video" if variant.startswith("video") else "image"
+        return os.path.join(self.root, f"{platform}_{kind}", file_name)
+
+    def lookup(self, path: str) -> Optional[str]:
+        """已完整发布时返回可直接返回给客户端的文件路径 (Servable path when the target is published)"""
+        return path if atomic.is_complete(path) else None
+
+    def commit(self, part_path: str, path: str, size: int, sha256: Optional[str] = None) -> str:
+        """发布临时文件并返回可服务路径（阻塞）(Publish the temp file and return the servable path; blocking)"""
+        atomic.publish(part_path, path, size, sha256)
+        return path
+
+    def remove(self, path: str):
+        """删除已发布文件 (Remove a published file)"""
+        atomic.remove(path)
+
+    def close(self):
+        pass
+
+
+class ContentAddressedStorage:
+    """
+    内容寻址存储：按 SHA-256 保存 blob，并按摘要前缀分片目录；SQLite 索引记录 (platform, id, variant) -> 摘要
+    (Content-addressed storage: blobs stored by SHA-256 in hash-prefix shard directories, with a SQLite index
+    mapping (platform, id, variant) to the digest)
+
+    - blob 路径：<root>/blobs/ab/cd/<sha256>，单个目录的条目数保持很小
+    - 相同内容只保存一份（不同ID、是否带前缀的下载共享同一个 blob）
+    - 查找只查询索引主键，不访问文件系统；blob 由缓存淘汰时同步删除引用它的索引行
+    - 下载先写入 <root>/.staging/<platform>.<id>.<variant>.<ext>（同一文件系统），提交时移动到 blob 位置
+
+    Args:
+        root (str): 下载根目录 (Download root directory)
+        index_path (str | None): SQLite 索引文件，默认 <root>/media_index.sqlite3 (SQLite index file)
+        shard_depth (int): 分片目录层数，每层两位十六进制 (Shard levels, two hex digits each)
+    """
+
+    name = "cas"
+
+    def __init__(self, root: str, index_path: Optional[str] = None, shard_depth: int = 2):
+        self.root = root
+        self.blob_root = os.path.join(root, "blobs")
+        self.staging_root = os.path.join(root, ".staging")
+        self.shard_depth = max(0, min(4, int(shard_depth)))
+        self.index_path = index_path or os.path.join(root, "media_index.sqlite3")
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(self.index_path)), exist_ok=True)
+        self._db = sqlite3.connect(self.index_path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS media ("
+            " platform TEXT NOT NULL, media_id TEXT NOT NULL, variant TEXT NOT NULL,"
+            " digest TEXT NOT NULL, size INTEGER NOT NULL, created_at INTEGER NOT NULL,"
+            " PRIMARY KEY (platform, media_id, variant))"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS media_digest ON media (digest)")
+
+    def blob_path(self, digest: str) -> str:
+        """摘要对应的分片 blob 路径 (Sharded blob path for a digest)"""
+        shards = [digest[i * 2 : i * 2 + 2] for i in range(self.shard_depth)]
+        return os.path.join(self.blob_root, *shards, digest)
+
+    def target(self, platform: str, media_id: str, variant: str, file_name: str) -> str:
+        """暂存路径，与文件名前缀无关 (Staging path, independent of the download name prefix)"""
+        return os.path.join(self.staging_root, f"{platform}.{media_id}.{variant}.{VARIANT_EXTENSIONS[variant]}")
+
+    def _key(self, path: str) -> Optional[tuple[str, str, str]]:
+        if os.path.dirname(path) != self.staging_root:
+            return None
+        match = _STAGING_NAME.match(os.path.basename(path))
+        return match.group(1, 2, 3) if match else None
+
+    def lookup(self, path: str) -> Optional[str]:
+        """
+        按索引主键查找 blob，不访问文件系统 (Look up the blob by index primary key without touching the filesystem)
+        """
+        key = self._key(path)
+        if key is None:
+            return path if atomic.is_complete(path) else None
+        with self._lock:
+            row = self._db.execute(
+                "SELECT digest FROM media WHERE platform = ? AND media_id = ? AND variant = ?", key
+            ).fetchone()
+        return self.blob_path(row[0]) if row else None
+
+    def commit(self, part_path: str, path: str, size: int, sha256: Optional[str] = None) -> str:
+        """
+        将暂存临时文件提交为 blob 并更新索引（阻塞）；已有相同内容时直接丢弃临时文件
+        (Commit a staged temp file as a blob and update the index; blocking. Identical content is deduplicated.)
+
+        非暂存目标（如合并用的中间文件）按普通原子发布处理。
+        (Non-staging targets such as merge intermediates are published normally.)
+        """
+        key = self._key(path)
+        if key is None:
+            atomic.publish(part_path, path, size, sha256)
+            return path
+        if sha256 is None:
+            sha256 = atomic.file_sha256(part_path)
+        blob = self.blob_path(sha256)
+        if atomic.is_complete(blob):
+            os.unlink(part_path)
+        else:
+            os.makedirs(os.path.dirname(blob), exist_ok=True)
+            atomic.publish(part_path, blob, size, sha256)
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO media (platform, media_id, variant, digest, size, created_at)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (*key, sha256, size, int(time.time())),
+            )
+        return blob
+
+    def remove(self, path: str):
+        """删除 blob 及引用它的索引行；先删索引，使查找立即失效 (Remove a blob and its index rows, index first)"""
+        if path.startswith(self.blob_root + os.sep):
+            with self._lock:
+                self._db.execute("DELETE FROM media WHERE digest = ?", (os.path.basename(path),))
+        atomic.remove(path)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+def create_storage(cfg: Optional[dict], root: str):
+    """
+    根据配置创建存储后端 (Create the storage backend from config)
+
+    Args:
+        cfg (dict | None): API.Download_Storage 配置 (API.Download_Storage config)
+        root (str): 下载根目录 (Download root directory)
+    """
+    cfg = cfg or {}
+    backend = str(cfg.get("Backend", "flat")).lower()
+    if backend == "cas":
+        return ContentAddressedStorage(root, index_path=cfg.get("Index_Path") or None, shard_depth=cfg.get("Shard_Depth", 2))
+    if backend != "flat":
+        raise ValueError(f"Unknown download storage backend: {backend}")
+    return FlatStorage(root)
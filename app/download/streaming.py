@@ -0,0 +1,49 @@
+from typing import Awaitable, Callable, Optional
+
+import anyio
+from starlette.responses import StreamingResponse
+
+
+class ClosingStreamingResponse(StreamingResponse):
+    """
+    发送结束后总会执行清理的流式响应 (Streaming response whose cleanup always runs once sending ends)
+
+    Starlette 在客户端断开时取消发送；若此时响应体生成器尚未开始迭代，其 finally 永远不会执行。
+    因此在返回响应前打开的资源（上游连接、子进程、工作槽位、传输登记）必须由 on_close 释放，
+    它在响应体生成器关闭后执行，无论生成器是否开始、是否完整迭代。
+    (Starlette cancels sending when the client disconnects; a body generator that never started never runs its
+    finally. Resources opened before the response is returned (upstream connections, subprocesses, worker slots,
+    transfer registrations) are therefore released by on_close, which runs after the body generator is closed,
+    whether or not it ever started.)
+
+    Args:
+        content (AsyncIterator[bytes]): 响应体 (Response body)
+        on_close (Callable[[], Awaitable[None]] | None): 清理协程函数，最多执行一次 (Cleanup coroutine, run at most once)
+        **kwargs: 传给 StreamingResponse 的其余参数 (Remaining StreamingResponse arguments)
+    """
+
+    def __init__(self, content, on_close: Optional[Callable[[], Awaitable[None]]] = None, **kwargs):
+        super().__init__(content, **kwargs)
+        self.on_close = on_close
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            await self.aclose()
+
+    async def aclose(self):
+        """
+        关闭响应体生成器并执行清理，可重复调用；直接迭代 body_iterator 的调用方结束后须调用
+        (Close the body generator and run the cleanup; idempotent. Callers iterating body_iterator directly
+        must call it when done.)
+        """
+        with anyio.CancelScope(shield=True):
+            close = getattr(self.body_iterator, "aclose", None)
+            try:
+                if close is not None:
+                    await close()
+            finally:
+                on_close, self.on_close = self.on_close, None
+                if on_close is not None:
+                    await on_close()
@@ -26,6 +26,7 @@ from pywebio_battery import put_video
 
 from app.web.views.ViewsUtils import ViewsUtils
 from crawlers.hybrid.hybrid_crawler import HybridCrawler
+from crawlers.utils.url_router import route_url
 
 HybridCrawler = HybridCrawler()
 
@@ -41,8 +42,8 @@ with open(config_path, "r", encoding="utf-8") as file:
 
 # 校验输入值/Validate input value
 def valid_check(input_data: str):
-    # 检索出所有链接并返回列表/Retrieve all links and return a list
-    url_list = ViewsUtils.find_url(input_data)
+    # 检索出所有受支持平台的链接并返回列表/Retrieve all links of supported platforms and return a list
+    url_list = [url for url in ViewsUtils.find_url(input_data) if route_url(url) is not None]
     # 总共找到的链接数量/Total number of links found
     total_urls = len(url_list)
     if total_urls == 0:
@@ -116,7 +117,8 @@ def parse_video():
         placeholder=placeholder,
         position=0,
     )
-    url_lists = ViewsUtils.find_url(input_data)
+    # 仅保留可识别平台的链接/Keep only links of recognized platforms
+    url_lists = [url for url in ViewsUtils.find_url(input_data) if route_url(url) is not None]
     # 解析开始时间
     start = time.time()
     # 成功/失败统计
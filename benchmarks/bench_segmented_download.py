@@ -0,0 +1,99 @@
+"""
+分段下载基准测试 (Segmented download benchmark)
+
+启动一个本地支持 Range 的 HTTP 服务器，并对每个连接限速，模拟 CDN 的单连接限速；
+分别以单连接与分段并发方式调用 fetch_data_stream 下载同一文件并对比耗时。
+(Start a local range-capable HTTP server that throttles each connection like a CDN, then download the same
+file through fetch_data_stream with a single connection and with concurrent segments.)
+
+用法 (Usage):
+    python benchmarks/bench_segmented_download.py [--size-mb 16] [--rate-mb 4] [--segments 4]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.api.endpoints import download
+
+
+class _DummyRequest:
+    async def is_disconnected(self):
+        return False
+
+
+async def _serve(reader, writer, blob: bytes, rate: int):
+    try:
+        head = await reader.readuntil(b"\r\n\r\n")
+        headers = {}
+        for line in head.decode("latin-1").split("\r\n")[1:]:
+            if ":" in line:
+                k, v = line.split(":", 1)
+                headers[k.strip().lower()] = v.strip()
+        start, end, status = 0, len(blob) - 1, "200 OK"
+        extra = ""
+        if headers.get("range", "").startswith("bytes="):
+            s, e = headers["range"][6:].split("-")
+            start, end, status = int(s), int(e or len(blob) - 1), "206 Partial Content"
+            extra = f"Content-Range: bytes {start}-{end}/{len(blob)}\r\n"
+        writer.write(
+            (
+                f"HTTP/1.1 {status}\r\nContent-Length: {end - start + 1}\r\nAccept-Ranges: bytes\r\n"
+                f'ETag: "bench"\r\n{extra}Connection: close\r\n\r\n'
+            ).encode()
+        )
+        # 单连接限速：每 1/20 秒发送 rate/20 字节 (Per-connection throttle)
+        step = max(1, rate // 20)
+        for offset in range(start, end + 1, step):
+            writer.write(blob[offset : min(offset + step, end + 1)])
+            await writer.drain()
+            await asyncio.sleep(0.05)
+    except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+        pass
+    finally:
+        writer.close()
+
+
+async def _run(size: int, rate: int, segments: int):
+    blob = os.urandom(size)
+    server = await asyncio.start_server(lambda r, w: _serve(r, w, blob, rate), "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    url = f"http://127.0.0.1:{port}/video.mp4"
+
+    api = download.config.setdefault("API", {})
+    api.setdefault("Security", {})["StrictValidation"] = False
+    out_dir = tempfile.mkdtemp()
+    results = []
+    for label, count in (("single", 1), (f"segments={segments}", segments)):
+        api["Download_Segments"] = {"Enabled": count > 1, "Count": count, "Min_Size": 1, "Min_Segment_Size": 1}
+        path = os.path.join(out_dir, f"{count}.mp4")
+        start = time.perf_counter()
+        ok = await download.fetch_data_stream(url, "douyin", _DummyRequest(), file_path=path)
+        elapsed = time.perf_counter() - start
+        with open(path, "rb") as f:
+            assert ok and f.read() == blob, f"{label}: corrupted download"
+        os.unlink(path)
+        results.append((label, elapsed))
+    server.close()
+    await server.wait_closed()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--size-mb", type=float, default=16)
+    parser.add_argument("--rate-mb", type=float, default=4, help="per-connection throughput limit (MB/s)")
+    parser.add_argument("--segments", type=int, default=4)
+    args = parser.parse_args()
+
+    size = int(args.size_mb * 1024 * 1024)
+    for label, elapsed in asyncio.run(_run(size, int(args.rate_mb * 1024 * 1024), args.segments)):
+        print(f"{label:<12} {size / 1024 / 1024:.1f} MB  {elapsed:.2f}s  {size / elapsed / 1024 / 1024:.2f} MB/s")
+
+
+if __name__ == "__main__":
+    main()
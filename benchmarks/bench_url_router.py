@@ -0,0 +1,87 @@
+"""
+URL 路由基准测试 (URL router benchmark)
+
+对比旧的“子串判断 + 逐个正则”平台识别方式与预编译主机名路由表的耗时。
+(Compare the legacy "substring check + regex chain" platform detection with the compiled hostname router.)
+
+用法 (Usage):
+    python benchmarks/bench_url_router.py [--rounds N]
+"""
+import argparse
+import os
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from crawlers.utils.url_router import route_url
+
+# 覆盖常见链接形态的语料 (Corpus covering the common link shapes)
+CORPUS = [
+    "https://www.douyin.com/video/7298145681699622182",
+    "https://www.douyin.com/note/7341234567890123456",
+    "https://www.douyin.com/discover?modal_id=7298145681699622182",
+    "https://www.iesdouyin.com/share/video/7298145681699622182/?region=CN&mid=1",
+    "https://www.douyin.com/user/MS4wLjABAAAAabc",
+    "https://live.douyin.com/766545142636",
+    "https://v.douyin.com/L4FJNR3/",
+    "https://www.tiktok.com/@flukegk83/video/7360734489271700753",
+    "https://www.tiktok.com/@minecraft/photo/7369296852669205791",
+    "https://vt.tiktok.com/ZSxxxx/",
+    "https://www.bilibili.com/video/BV1M1421t7hT/?spm_id_from=333",
+    "https://b23.tv/abcdef",
+    "7.43 复制打开抖音，看看【作品】 https://www.douyin.com/video/7298145681699622182 太好看了",
+    "https://example.com/unsupported/123",
+]
+
+# 旧实现：按子串判断平台，再依次尝试各个正则 (Legacy: substring platform check, then each regex in turn)
+_LEGACY_PATTERNS = {
+    "douyin": [
+        re.compile(r"video/([^/?]*)"),
+        re.compile(r"[?&]vid=(\d+)"),
+        re.compile(r"note/([^/?]*)"),
+        re.compile(r"modal_id=([0-9]+)"),
+    ],
+    "tiktok": [re.compile(r"video/(\d+)"), re.compile(r"photo/(\d+)")],
+    "bilibili": [re.compile(r"video/([^/?]*)"), re.compile(r"/(BV[A-Za-z0-9]+)")],
+}
+
+
+def legacy_route(url: str):
+    url = re.search(r"https?://[^\s`]+", url)
+    if url is None:
+        return None
+    url = url.group(0)
+    if "douyin" in url:
+        platform = "douyin"
+    elif "tiktok" in url:
+        platform = "tiktok"
+    elif "bilibili" in url or "b23.tv" in url:
+        platform = "bilibili"
+    else:
+        return None
+    for pattern in _LEGACY_PATTERNS[platform]:
+        match = pattern.search(url)
+        if match:
+            return platform, match.group(1)
+    return platform, None
+
+
+def _run(func, rounds: int) -> float:
+    return timeit.timeit(lambda: [func(u) for u in CORPUS], number=rounds)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=20000)
+    args = parser.parse_args()
+
+    total = args.rounds * len(CORPUS)
+    for name, func in (("legacy", legacy_route), ("router", route_url)):
+        elapsed = _run(func, args.rounds)
+        print(f"{name:<8} {total} urls  {elapsed:.3f}s  {elapsed / total * 1e6:.2f} us/url")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,3 @@
-import asyncio
 import json
 import os
 import random
@@ -22,7 +21,10 @@ from crawlers.utils.api_exceptions import (
     APIUnauthorizedError,
     APIUnavailableError,
 )
+from crawlers.utils.batch import batch_concurrency, borrow_client, bounded_map
 from crawlers.utils.logger import logger
+from crawlers.utils.redirects import resolve_redirects
+from crawlers.utils.url_router import KIND_LIVE, KIND_USER, route_url
 from crawlers.utils.utils import (
     extract_valid_urls,
     gen_random_str,
@@ -272,14 +274,16 @@ class BogusManager:
 
         return final_endpoint[0]
 
-    # 字典方法生成X-Bogus参数
+    # 字典方法生成X-Bogus参数，也接受预编译模板生成的参数字符串
     @classmethod
-    def xb_model_2_endpoint(cls, base_endpoint: str, params: dict, user_agent: str) -> str:
-        if not isinstance(params, dict):
+    def xb_model_2_endpoint(cls, base_endpoint: str, params: dict | str, user_agent: str) -> str:
+        if isinstance(params, str):
+            param_str = params
+        elif isinstance(params, dict):
+            param_str = "&".join([f"{k}={v}" for k, v in params.items()])
+        else:
             raise TypeError("参数必须是字典类型")
 
-        param_str = "&".join([f"{k}={v}" for k, v in params.items()])
-
         try:
             xb_value = XB(user_agent).getXBogus(param_str)
         except Exception as e:
@@ -318,9 +322,10 @@ class BogusManager:
     #         raise RuntimeError("生成A-Bogus失败: {0})".format(e))
 
     # 字典方法生成A-Bogus参数，感谢 @JoeanAmier 提供的纯Python版本算法。
+    # 也接受与 urlencode(params) 一致的预编译参数字符串
     @classmethod
-    def ab_model_2_endpoint(cls, params: dict, user_agent: str) -> str:
-        if not isinstance(params, dict):
+    def ab_model_2_endpoint(cls, params: dict | str, user_agent: str) -> str:
+        if not isinstance(params, (dict, str)):
             raise TypeError("参数必须是字典类型")
 
         try:
@@ -339,12 +344,20 @@ class SecUserIdFetcher:
     _REDIRECT_URL_PATTERN = re.compile(r"sec_uid=([^&]*)")
 
     @classmethod
-    async def get_sec_user_id(cls, url: str) -> str:
+    def _client(cls) -> httpx.AsyncClient:
+        """创建请求客户端，批量解析时整批共享 (Create the HTTP client, shared by a whole batch)"""
+        return httpx.AsyncClient(
+            transport=httpx.AsyncHTTPTransport(retries=5), proxies=TokenManager.proxies, timeout=10, trust_env=False
+        )
+
+    @classmethod
+    async def get_sec_user_id(cls, url: str, client: httpx.AsyncClient = None) -> str:
         """
         从单个url中获取sec_user_id (Get sec_user_id from a single url)
 
         Args:
             url (str): 输入的url (Input url)
+            client (httpx.AsyncClient): 批量解析共享的客户端，为空时临时创建 (Client shared by a batch, created when None)
 
         Returns:
             str: 匹配到的sec_user_id (Matched sec_user_id)。
@@ -358,6 +371,12 @@ class SecUserIdFetcher:
 
         if url is None:
             raise (APINotFoundError("输入的URL不合法。类名：{0}".format(cls.__name__)))
+
+        # 规范的用户主页链接直接本地提取，无需网络请求
+        routed = route_url(url)
+        if routed is not None and routed.platform == "douyin" and routed.kind == KIND_USER:
+            return routed.id
+
         if not is_allowed_douyin_web_url(url):
             if "douyin.com" not in url.lower():
                 raise APINotFoundError("输入的URL不合法（不是 Douyin 网页域名）。类名：{0}".format(cls.__name__))
@@ -366,8 +385,7 @@ class SecUserIdFetcher:
         pattern = cls._REDIRECT_URL_PATTERN if parsed_url.hostname == "v.douyin.com" else cls._DOUYIN_URL_PATTERN
 
         try:
-            transport = httpx.AsyncHTTPTransport(retries=5)
-            async with httpx.AsyncClient(transport=transport, proxies=TokenManager.proxies, timeout=10, trust_env=False) as client:
+            async with borrow_client(client, cls._client) as client:
                 from urllib.parse import urlparse as _up
                 _p = _up(url)
                 safe_url = f"https://{(_p.hostname or '').lower().rstrip('.')}{_p.path or '/'}" + (f"?{_p.query}" if _p.query else "")
@@ -414,7 +432,8 @@ class SecUserIdFetcher:
             urls: list: 用户url列表 (User url list)
 
         Return:
-            sec_user_ids: list: 用户sec_user_id列表 (User sec_user_id list)
+            sec_user_ids: list: 按输入顺序的逐项结果，成功项的 data 为 sec_user_id
+                (Per-item results in input order; data holds the sec_user_id of successful items)
         """
 
         if not isinstance(urls, list):
@@ -426,8 +445,10 @@ class SecUserIdFetcher:
         if urls == []:
             raise (APINotFoundError("输入的URL List不合法。类名：{0}".format(cls.__name__)))
 
-        sec_user_ids = [cls.get_sec_user_id(url) for url in urls]
-        return await asyncio.gather(*sec_user_ids)
+        async with cls._client() as client:
+            return await bounded_map(
+                lambda url: cls.get_sec_user_id(url, client=client), urls, batch_concurrency(global_config)
+            )
 
 
 class AwemeIdFetcher:
@@ -438,12 +459,18 @@ class AwemeIdFetcher:
     _DOUYIN_DISCOVER_URL_PATTERN = re.compile(r"modal_id=([0-9]+)")
 
     @classmethod
-    async def get_aweme_id(cls, url: str) -> str:
+    def _client(cls) -> httpx.AsyncClient:
+        """创建请求客户端，批量解析时整批共享 (Create the HTTP client, shared by a whole batch)"""
+        return httpx.AsyncClient(transport=httpx.AsyncHTTPTransport(retries=5), proxy=None, timeout=10, trust_env=False)
+
+    @classmethod
+    async def get_aweme_id(cls, url: str, client: httpx.AsyncClient = None) -> str:
         """
         从单个url中获取aweme_id (Get aweme_id from a single url)
 
         Args:
             url (str): 输入的url (Input url)
+            client (httpx.AsyncClient): 批量解析共享的客户端，为空时临时创建 (Client shared by a batch, created when None)
 
         Returns:
             str: 匹配到的aweme_id (Matched aweme_id)
@@ -452,19 +479,28 @@ class AwemeIdFetcher:
         if not isinstance(url, str):
             raise TypeError("参数必须是字符串类型")
 
+        # 规范的作品链接（video/note/modal_id/vid）直接本地提取，仅短链需要网络重定向
+        routed = route_url(url)
+        if routed is not None and routed.platform == "douyin" and routed.post_id:
+            return routed.post_id
+
         # 重定向到完整链接
-        transport = httpx.AsyncHTTPTransport(retries=5)
-        async with httpx.AsyncClient(transport=transport, proxy=None, timeout=10, trust_env=False) as client:
+        async with borrow_client(client, cls._client) as client:
             try:
                 if not is_allowed_douyin_web_url(url):
                     raise APINotFoundError("输入的URL不合法（不是 Douyin 网页域名）。类名：{0}".format(cls.__name__))
                 from urllib.parse import urlparse as _up
                 _p = _up(url)
                 safe_url = f"https://{(_p.hostname or '').lower().rstrip('.')}{_p.path or '/'}" + (f"?{_p.query}" if _p.query else "")
-                response = await client.get(safe_url, follow_redirects=True)
-                response.raise_for_status()
+                # 逐跳解析重定向，任一跳地址含作品ID即停止，不下载落地页 (Stop at the first hop carrying a post id)
+                response_url, aweme_id, status_code = await resolve_redirects(
+                    client, safe_url, is_allowed_douyin_web_url, cls._match_aweme_id
+                )
+                if aweme_id:
+                    return aweme_id
+                if status_code >= 400:
+                    raise APIResponseError(f"链接：{response_url}，状态码 {status_code}")
 
-                response_url = str(response.url)
                 # 重定向后的URL仍需校验域名
                 pf = urlparse(response_url)
                 if (pf.hostname or "").lower() not in {"v.douyin.com", "www.douyin.com"}:
@@ -488,8 +524,11 @@ class AwemeIdFetcher:
                     f"请求端点失败，请检查当前网络环境。链接：{url}，代理：{TokenManager.proxies}，异常类名：{cls.__name__}，异常详细信息：{exc}"
                 )
 
-            except httpx.HTTPStatusError as e:
-                raise APIResponseError(f"链接：{e.response.url}，状态码 {e.response.status_code}：{e.response.text}")
+    @staticmethod
+    def _match_aweme_id(url: str):
+        """从重定向目标中提取作品ID (Extract a post id from a redirect target)"""
+        routed = route_url(url)
+        return routed.post_id if routed is not None and routed.platform == "douyin" else None
 
     @classmethod
     async def get_all_aweme_id(cls, urls: list) -> list:
@@ -500,7 +539,8 @@ class AwemeIdFetcher:
             urls: list: 列表url (list url)
 
         Return:
-            aweme_ids: list: 视频的唯一标识，返回列表 (The unique identifier of the video, return list)
+            aweme_ids: list: 按输入顺序的逐项结果，成功项的 data 为 aweme_id
+                (Per-item results in input order; data holds the aweme_id of successful items)
         """
 
         if not isinstance(urls, list):
@@ -512,8 +552,10 @@ class AwemeIdFetcher:
         if urls == []:
             raise (APINotFoundError("输入的URL List不合法。类名：{0}".format(cls.__name__)))
 
-        aweme_ids = [cls.get_aweme_id(url) for url in urls]
-        return await asyncio.gather(*aweme_ids)
+        async with cls._client() as client:
+            return await bounded_map(
+                lambda url: cls.get_aweme_id(url, client=client), urls, batch_concurrency(global_config)
+            )
 
 
 class MixIdFetcher:
@@ -533,12 +575,20 @@ class WebCastIdFetcher:
     _DOUYIN_LIVE_URL_PATTERN3 = re.compile(r"reflow/([^/?]*)")
 
     @classmethod
-    async def get_webcast_id(cls, url: str) -> str:
+    def _client(cls) -> httpx.AsyncClient:
+        """创建请求客户端，批量解析时整批共享 (Create the HTTP client, shared by a whole batch)"""
+        return httpx.AsyncClient(
+            transport=httpx.AsyncHTTPTransport(retries=5), proxies=TokenManager.proxies, timeout=10
+        )
+
+    @classmethod
+    async def get_webcast_id(cls, url: str, client: httpx.AsyncClient = None) -> str:
         """
         从单个url中获取webcast_id (Get webcast_id from a single url)
 
         Args:
             url (str): 输入的url (Input url)
+            client (httpx.AsyncClient): 批量解析共享的客户端，为空时临时创建 (Client shared by a batch, created when None)
 
         Returns:
             str: 匹配到的webcast_id (Matched webcast_id)。
@@ -553,6 +603,11 @@ class WebCastIdFetcher:
         if url is None or not is_allowed_douyin_live_url(url):
             raise (APINotFoundError("输入的URL不合法（不是 Douyin 直播域名）。类名：{0}".format(cls.__name__)))
         # 仅从白名单域名中提取 room_id，并使用安全的 live.douyin.com 固定格式发起请求
+        # live.douyin.com/<web_rid> 本身即为 webcast_id，无需网络请求
+        routed = route_url(url)
+        if routed is not None and routed.kind == KIND_LIVE and (urlparse(routed.url).hostname or "") == "live.douyin.com":
+            return routed.id
+
         parsed = urlparse(url)
         safe_url = None
         room_id = None
@@ -577,27 +632,23 @@ class WebCastIdFetcher:
         safe_url = f"https://live.douyin.com/{room_id}"
         try:
             # 重定向到完整链接
-            transport = httpx.AsyncHTTPTransport(retries=5)
-            async with httpx.AsyncClient(transport=transport, proxies=TokenManager.proxies, timeout=10) as client:
-                response = await client.get(safe_url, follow_redirects=True)
-                response.raise_for_status()
-                final_url = str(response.url)
-
-                live_pattern = cls._DOUYIN_LIVE_URL_PATTERN
-                live_pattern2 = cls._DOUYIN_LIVE_URL_PATTERN2
-                live_pattern3 = cls._DOUYIN_LIVE_URL_PATTERN3
-
-                if live_pattern.search(final_url):
-                    match = live_pattern.search(final_url)
-                elif live_pattern2.search(final_url):
-                    match = live_pattern2.search(final_url)
-                elif live_pattern3.search(final_url):
-                    match = live_pattern3.search(final_url)
-                    logger.warning("该链接返回的是room_id，请使用`fetch_user_live_videos_by_room_id`接口")
-                else:
-                    raise APIResponseError("未在响应的地址中找到webcast_id，检查链接是否为直播页")
+            async with borrow_client(client, cls._client) as client:
+                # 逐跳解析重定向，任一跳地址含直播间号即停止，不下载直播页 (Stop at the first hop carrying the id)
+                final_url, webcast_id, status_code = await resolve_redirects(
+                    client,
+                    safe_url,
+                    lambda target: is_allowed_douyin_live_url(target) or is_allowed_douyin_web_url(target),
+                    cls._match_webcast_id,
+                )
+                if webcast_id:
+                    return webcast_id
+                if status_code >= 400:
+                    raise APIResponseError("链接：{0}，状态码 {1}".format(final_url, status_code))
 
-                return match.group(1)
+                webcast_id = cls._match_webcast_id(final_url)
+                if not webcast_id:
+                    raise APIResponseError("未在响应的地址中找到webcast_id，检查链接是否为直播页")
+                return webcast_id
 
         except httpx.RequestError as exc:
             # 捕获所有与 httpx 请求相关的异常情况 (Captures all httpx request-related exceptions)
@@ -607,10 +658,17 @@ class WebCastIdFetcher:
                 )
             )
 
-        except httpx.HTTPStatusError as e:
-            raise APIResponseError(
-                "链接：{0}，状态码 {1}：{2} ".format(e.response.url, e.response.status_code, e.response.text)
-            )
+    @classmethod
+    def _match_webcast_id(cls, url: str):
+        """按顺序尝试从地址中匹配直播间号 (Try the live id patterns on a URL in order)"""
+        match = cls._DOUYIN_LIVE_URL_PATTERN.search(url) or cls._DOUYIN_LIVE_URL_PATTERN2.search(url)
+        if match:
+            return match.group(1)
+        match = cls._DOUYIN_LIVE_URL_PATTERN3.search(url)
+        if match:
+            logger.warning("该链接返回的是room_id，请使用`fetch_user_live_videos_by_room_id`接口")
+            return match.group(1)
+        return None
 
     @classmethod
     async def get_all_webcast_id(cls, urls: list) -> list:
@@ -621,7 +679,8 @@ class WebCastIdFetcher:
             urls: list: 列表url (list url)
 
         Return:
-            webcast_ids: list: 直播的唯一标识，返回列表 (The unique identifier of the live, return list)
+            webcast_ids: list: 按输入顺序的逐项结果，成功项的 data 为 webcast_id
+                (Per-item results in input order; data holds the webcast_id of successful items)
         """
 
         if not isinstance(urls, list):
@@ -633,8 +692,10 @@ class WebCastIdFetcher:
         if urls == []:
             raise (APINotFoundError("输入的URL List不合法。类名：{0}".format(cls.__name__)))
 
-        webcast_ids = [cls.get_webcast_id(url) for url in urls]
-        return await asyncio.gather(*webcast_ids)
+        async with cls._client() as client:
+            return await bounded_map(
+                lambda url: cls.get_webcast_id(url, client=client), urls, batch_concurrency(global_config)
+            )
 
 
 def format_file_name(
@@ -36,6 +36,7 @@ from crawlers.douyin.web.utils import (  # Aweme ID获取
     WebCastIdFetcher,  # 直播ID获取
     extract_valid_urls,  # URL提取
 )
+from crawlers.utils.query_template import render_query  # 预编译请求参数模板
 
 # 配置文件路径（统一从项目根的 config 目录读取）
 _root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", ".."))
@@ -71,7 +72,7 @@ class DouyinWebCrawler:
         base_crawler = BaseCrawler(proxies=kwargs["proxies"], crawler_headers=kwargs["headers"])
         async with base_crawler as crawler:
             # 创建一个作品详情的BaseModel参数
-            params = PostDetail(aweme_id=aweme_id)
+            params = render_query(PostDetail, {"aweme_id": aweme_id}, overrides={"msToken": ""})
             # 生成一个作品详情的带有加密参数的Endpoint
             # 2024年6月12日22:41:44 由于XBogus加密已经失效，所以不再使用XBogus加密参数，转移至a_bogus加密参数。
             # endpoint = BogusManager.xb_model_2_endpoint(
@@ -79,10 +80,8 @@ class DouyinWebCrawler:
             # )
 
             # 生成一个作品详情的带有a_bogus加密参数的Endpoint
-            params_dict = params.dict()
-            params_dict["msToken"] = ""
-            a_bogus = BogusManager.ab_model_2_endpoint(params_dict, kwargs["headers"]["User-Agent"])
-            endpoint = f"{DouyinAPIEndpoints.POST_DETAIL}?{urlencode(params_dict)}&a_bogus={a_bogus}"
+            a_bogus = BogusManager.ab_model_2_endpoint(params, kwargs["headers"]["User-Agent"])
+            endpoint = f"{DouyinAPIEndpoints.POST_DETAIL}?{params}&a_bogus={a_bogus}"
 
             response = await crawler.fetch_get_json(endpoint)
         return response
@@ -92,17 +91,19 @@ class DouyinWebCrawler:
         kwargs = await self.get_douyin_headers()
         base_crawler = BaseCrawler(proxies=kwargs["proxies"], crawler_headers=kwargs["headers"])
         async with base_crawler as crawler:
-            params = UserPost(sec_user_id=sec_user_id, max_cursor=max_cursor, count=count)
+            params = render_query(
+                UserPost,
+                {"sec_user_id": sec_user_id, "max_cursor": max_cursor, "count": count},
+                overrides={"msToken": ""},
+            )
             # endpoint = BogusManager.xb_model_2_endpoint(
             #     DouyinAPIEndpoints.USER_POST, params.dict(), kwargs["headers"]["User-Agent"]
             # )
             # response = await crawler.fetch_get_json(endpoint)
 
             # 生成一个用户发布作品数据的带有a_bogus加密参数的Endpoint
-            params_dict = params.dict()
-            params_dict["msToken"] = ""
-            a_bogus = BogusManager.ab_model_2_endpoint(params_dict, kwargs["headers"]["User-Agent"])
-            endpoint = f"{DouyinAPIEndpoints.USER_POST}?{urlencode(params_dict)}&a_bogus={a_bogus}"
+            a_bogus = BogusManager.ab_model_2_endpoint(params, kwargs["headers"]["User-Agent"])
+            endpoint = f"{DouyinAPIEndpoints.USER_POST}?{params}&a_bogus={a_bogus}"
 
             response = await crawler.fetch_get_json(endpoint)
         return response
@@ -112,16 +113,18 @@ class DouyinWebCrawler:
         kwargs = await self.get_douyin_headers()
         base_crawler = BaseCrawler(proxies=kwargs["proxies"], crawler_headers=kwargs["headers"])
         async with base_crawler as crawler:
-            params = UserLike(sec_user_id=sec_user_id, max_cursor=max_cursor, count=count)
+            params = render_query(
+                UserLike,
+                {"sec_user_id": sec_user_id, "max_cursor": max_cursor, "count": count},
+                overrides={"msToken": ""},
+            )
             # endpoint = BogusManager.xb_model_2_endpoint(
             #     DouyinAPIEndpoints.USER_FAVORITE_A, params.dict(), kwargs["headers"]["User-Agent"]
             # )
             # response = await crawler.fetch_get_json(endpoint)
 
-            params_dict = params.dict()
-            params_dict["msToken"] = ""
-            a_bogus = BogusManager.ab_model_2_endpoint(params_dict, kwargs["headers"]["User-Agent"])
-            endpoint = f"{DouyinAPIEndpoints.USER_FAVORITE_A}?{urlencode(params_dict)}&a_bogus={a_bogus}"
+            a_bogus = BogusManager.ab_model_2_endpoint(params, kwargs["headers"]["User-Agent"])
+            endpoint = f"{DouyinAPIEndpoints.USER_FAVORITE_A}?{params}&a_bogus={a_bogus}"
 
             response = await crawler.fetch_get_json(endpoint)
         return response
@@ -132,9 +135,9 @@ class DouyinWebCrawler:
         kwargs["headers"]["Cookie"] = cookie
         base_crawler = BaseCrawler(proxies=kwargs["proxies"], crawler_headers=kwargs["headers"])
         async with base_crawler as crawler:
-            params = UserCollection(cursor=cursor, count=count)
+            params = render_query(UserCollection, {"cursor": cursor, "count": count}, encode=False)
             endpoint = BogusManager.xb_model_2_endpoint(
-                DouyinAPIEndpoints.USER_COLLECTION, params.dict(), kwargs["headers"]["User-Agent"]
+                DouyinAPIEndpoints.USER_COLLECTION, params, kwargs["headers"]["User-Agent"]
             )
             response = await crawler.fetch_post_json(endpoint)
         return response
@@ -144,9 +147,9 @@ class DouyinWebCrawler:
         kwargs = await self.get_douyin_headers()
         base_crawler = BaseCrawler(proxies=kwargs["proxies"], crawler_headers=kwargs["headers"])
         async with base_crawler as crawler:
-            params = UserMix(mix_id=mix_id, cursor=cursor, count=count)
+            params = render_query(UserMix, {"mix_id": mix_id, "cursor": cursor, "count": count}, encode=False)
             endpoint = BogusManager.xb_model_2_endpoint(
-                DouyinAPIEndpoints.MIX_AWEME, params.dict(), kwargs["headers"]["User-Agent"]
+                DouyinAPIEndpoints.MIX_AWEME, params, kwargs["headers"]["User-Agent"]
             )
             response = await crawler.fetch_get_json(endpoint)
         return response
@@ -156,9 +159,9 @@ class DouyinWebCrawler:
         kwargs = await self.get_douyin_headers()
         base_crawler = BaseCrawler(proxies=kwargs["proxies"], crawler_headers=kwargs["headers"])
         async with base_crawler as crawler:
-            params = UserLive(web_rid=webcast_id, room_id_str=room_id_str)
+            params = render_query(UserLive, {"web_rid": webcast_id, "room_id_str": room_id_str}, encode=False)
             endpoint = BogusManager.xb_model_2_endpoint(
-                DouyinAPIEndpoints.LIVE_INFO, params.dict(), kwargs["headers"]["User-Agent"]
+                DouyinAPIEndpoints.LIVE_INFO, params, kwargs["headers"]["User-Agent"]
             )
             response = await crawler.fetch_get_json(endpoint)
         return response
@@ -168,9 +171,9 @@ class DouyinWebCrawler:
         kwargs = await self.get_douyin_headers()
         base_crawler = BaseCrawler(proxies=kwargs["proxies"], crawler_headers=kwargs["headers"])
         async with base_crawler as crawler:
-            params = UserLive2(room_id=room_id)
+            params = render_query(UserLive2, {"room_id": room_id}, encode=False)
             endpoint = BogusManager.xb_model_2_endpoint(
-                DouyinAPIEndpoints.LIVE_INFO_ROOM_ID, params.dict(), kwargs["headers"]["User-Agent"]
+                DouyinAPIEndpoints.LIVE_INFO_ROOM_ID, params, kwargs["headers"]["User-Agent"]
             )
             response = await crawler.fetch_get_json(endpoint)
         return response
@@ -180,9 +183,9 @@ class DouyinWebCrawler:
         kwargs = await self.get_douyin_headers()
         base_crawler = BaseCrawler(proxies=kwargs["proxies"], crawler_headers=kwargs["headers"])
         async with base_crawler as crawler:
-            params = LiveRoomRanking(room_id=room_id, rank_type=rank_type)
+            params = render_query(LiveRoomRanking, {"room_id": room_id, "rank_type": rank_type}, encode=False)
             endpoint = BogusManager.xb_model_2_endpoint(
-                DouyinAPIEndpoints.LIVE_GIFT_RANK, params.dict(), kwargs["headers"]["User-Agent"]
+                DouyinAPIEndpoints.LIVE_GIFT_RANK, params, kwargs["headers"]["User-Agent"]
             )
             response = await crawler.fetch_get_json(endpoint)
         return response
@@ -192,9 +195,9 @@ class DouyinWebCrawler:
         kwargs = await self.get_douyin_headers()
         base_crawler = BaseCrawler(proxies=kwargs["proxies"], crawler_headers=kwargs["headers"])
         async with base_crawler as crawler:
-            params = UserProfile(sec_user_id=sec_user_id)
+            params = render_query(UserProfile, {"sec_user_id": sec_user_id}, encode=False)
             endpoint = BogusManager.xb_model_2_endpoint(
-                DouyinAPIEndpoints.USER_DETAIL, params.dict(), kwargs["headers"]["User-Agent"]
+                DouyinAPIEndpoints.USER_DETAIL, params, kwargs["headers"]["User-Agent"]
             )
             response = await crawler.fetch_get_json(endpoint)
         return response
@@ -204,9 +207,9 @@ class DouyinWebCrawler:
         kwargs = await self.get_douyin_headers()
         base_crawler = BaseCrawler(proxies=kwargs["proxies"], crawler_headers=kwargs["headers"])
         async with base_crawler as crawler:
-            params = PostComments(aweme_id=aweme_id, cursor=cursor, count=count)
+            params = render_query(PostComments, {"aweme_id": aweme_id, "cursor": cursor, "count": count}, encode=False)
             endpoint = BogusManager.xb_model_2_endpoint(
-                DouyinAPIEndpoints.POST_COMMENT, params.dict(), kwargs["headers"]["User-Agent"]
+                DouyinAPIEndpoints.POST_COMMENT, params, kwargs["headers"]["User-Agent"]
             )
             response = await crawler.fetch_get_json(endpoint)
         return response
@@ -216,9 +219,13 @@ class DouyinWebCrawler:
         kwargs = await self.get_douyin_headers()
         base_crawler = BaseCrawler(proxies=kwargs["proxies"], crawler_headers=kwargs["headers"])
         async with base_crawler as crawler:
-            params = PostCommentsReply(item_id=item_id, comment_id=comment_id, cursor=cursor, count=count)
+            params = render_query(
+                PostCommentsReply,
+                {"item_id": item_id, "comment_id": comment_id, "cursor": cursor, "count": count},
+                encode=False,
+            )
             endpoint = BogusManager.xb_model_2_endpoint(
-                DouyinAPIEndpoints.POST_COMMENT_REPLY, params.dict(), kwargs["headers"]["User-Agent"]
+                DouyinAPIEndpoints.POST_COMMENT_REPLY, params, kwargs["headers"]["User-Agent"]
             )
             response = await crawler.fetch_get_json(endpoint)
         return response
@@ -228,9 +235,9 @@ class DouyinWebCrawler:
         kwargs = await self.get_douyin_headers()
         base_crawler = BaseCrawler(proxies=kwargs["proxies"], crawler_headers=kwargs["headers"])
         async with base_crawler as crawler:
-            params = BaseRequestModel()
+            params = render_query(BaseRequestModel, {}, encode=False)
             endpoint = BogusManager.xb_model_2_endpoint(
-                DouyinAPIEndpoints.DOUYIN_HOT_SEARCH, params.dict(), kwargs["headers"]["User-Agent"]
+                DouyinAPIEndpoints.DOUYIN_HOT_SEARCH, params, kwargs["headers"]["User-Agent"]
             )
             response = await crawler.fetch_get_json(endpoint)
         return response
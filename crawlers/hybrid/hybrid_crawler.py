@@ -7,6 +7,9 @@ from crawlers.bilibili.web.web_crawler import BilibiliWebCrawler  # 导入Bilibi
 from crawlers.douyin.web.web_crawler import DouyinWebCrawler  # 导入抖音Web爬虫
 from crawlers.tiktok.app.app_crawler import TikTokAPPCrawler  # 导入TikTok App爬虫
 from crawlers.tiktok.web.web_crawler import TikTokWebCrawler  # 导入TikTok Web爬虫
+from crawlers.utils.availability import check_bilibili_detail, check_douyin_detail  # 导入作品可用性校验
+from crawlers.utils.cache import hybrid_cache  # 导入结果缓存
+from crawlers.utils.url_router import RoutedURL, route_url  # 导入URL路由
 
 
 class HybridCrawler:
@@ -20,11 +23,17 @@ class HybridCrawler:
         """
         从 Bilibili URL 中提取 BV 号，支持短链重定向
         """
+        # 规范链接直接本地提取，无需网络请求
+        routed = route_url(url)
+        if routed is not None and routed.platform == "bilibili" and routed.post_id:
+            return routed.post_id
+
         # 如果是 b23.tv 短链，需要重定向获取真实URL
-        if "b23.tv" in url:
+        if routed is not None and routed.is_short:
             from urllib.parse import urlparse
             import socket
             import ipaddress
+            url = routed.url
             p = urlparse(url)
             if p.scheme != "https" or (p.hostname or "").lower() != "b23.tv" or p.port not in (None, 443):
                 raise ValueError("Invalid b23.tv short link")
@@ -59,20 +68,59 @@ class HybridCrawler:
         else:
             raise ValueError(f"Cannot extract BV ID from URL: {url}")
 
+    async def get_video_id(self, routed: RoutedURL) -> str:
+        """
+        获取作品ID：规范链接本地提取，仅短链等无法本地识别的链接才走网络解析
+        (Get the post id: extracted locally for canonical links, network resolution only for short links)
+
+        Args:
+            routed (RoutedURL): route_url 的路由结果 (Result of route_url)
+
+        Returns:
+            str: 作品ID，抖音/TikTok为aweme_id，Bilibili为BV号 (Post id: aweme_id or BV id)
+        """
+        if routed.post_id:
+            return routed.post_id
+        if routed.platform == "douyin":
+            return await self.DouyinWebCrawler.get_aweme_id(routed.url)
+        if routed.platform == "tiktok":
+            return await self.TikTokWebCrawler.get_aweme_id(routed.url)
+        return await self.get_bilibili_bv_id(routed.url)
+
     async def hybrid_parsing_single_video(self, url: str, minimal: bool = False):
+        # 根据主机名判断平台/Judge the platform by hostname
+        routed = route_url(url)
+        if routed is None:
+            raise ValueError("hybrid_parsing_single_video: Cannot judge the video source from the URL.")
+        platform = routed.platform
+        aweme_id = await self.get_video_id(routed)
+
+        # 结果缓存：TTL 跟随媒体签名URL的过期时间/Result cache: TTL follows the media URL signature expiry
+        return await hybrid_cache.get_or_load(
+            (platform, aweme_id, minimal),
+            lambda: self.build_video_data(platform, aweme_id, minimal),
+        )
+
+    async def build_video_data(self, platform: str, aweme_id: str, minimal: bool = False):
+        """
+        拉取并构建单个作品数据，不经过缓存 (Fetch and build a single post's data, bypassing the cache)
+
+        Args:
+            platform (str): 平台名称 douyin/tiktok/bilibili (Platform name)
+            aweme_id (str): 作品ID，Bilibili为BV号 (Post id, BV id for Bilibili)
+            minimal (bool): 是否返回最小数据 (Return minimal data)
+
+        Returns:
+            dict: 作品数据 (Post data)
+        """
         # 解析抖音视频/Parse Douyin video
-        if "douyin" in url:
-            platform = "douyin"
-            aweme_id = await self.DouyinWebCrawler.get_aweme_id(url)
-            data = await self.DouyinWebCrawler.fetch_one_video(aweme_id)
+        if platform == "douyin":
+            data = check_douyin_detail(await self.DouyinWebCrawler.fetch_one_video(aweme_id), aweme_id)
             data = data.get("aweme_detail")
             # $.aweme_detail.aweme_type
             aweme_type = data.get("aweme_type")
         # 解析TikTok视频/Parse TikTok video
-        elif "tiktok" in url:
-            platform = "tiktok"
-            aweme_id = await self.TikTokWebCrawler.get_aweme_id(url)
-
+        elif platform == "tiktok":
             # 2024-09-14: Switch to TikTokAPPCrawler instead of TikTokWebCrawler
             # data = await self.TikTokWebCrawler.fetch_one_video(aweme_id)
             # data = data.get("itemInfo").get("itemStruct")
@@ -81,15 +129,13 @@ class HybridCrawler:
             # $.imagePost exists if aweme_type is photo
             aweme_type = data.get("aweme_type")
         # 解析Bilibili视频/Parse Bilibili video
-        elif "bilibili" in url or "b23.tv" in url:
-            platform = "bilibili"
-            aweme_id = await self.get_bilibili_bv_id(url)  # BV号作为统一的video_id
-            response = await self.BilibiliWebCrawler.fetch_one_video(aweme_id)
+        else:
+            response = check_bilibili_detail(
+                await self.BilibiliWebCrawler.fetch_one_video(aweme_id), aweme_id
+            )  # BV号作为统一的video_id
             data = response.get("data", {})  # 提取data部分
             # Bilibili只有视频类型，aweme_type设为0(video)
             aweme_type = 0
-        else:
-            raise ValueError("hybrid_parsing_single_video: Cannot judge the video source from the URL.")
 
         # 检查是否需要返回最小数据/Check if minimal data is required
         if not minimal:
@@ -5,7 +5,7 @@ import time  # 时间操作
 import yaml  # 配置文件
 
 # 重试机制
-from tenacity import retry, stop_after_attempt, wait_fixed
+from tenacity import retry, retry_if_not_exception_type, stop_after_attempt, wait_fixed
 
 # 基础爬虫客户端和TikTokAPI端点
 from crawlers.base_crawler import BaseCrawler
@@ -14,6 +14,9 @@ from crawlers.tiktok.app.endpoints import TikTokAPIEndpoints
 # TikTok接口数据请求模型
 from crawlers.tiktok.app.models import FeedVideoDetail
 
+# 作品不可用异常
+from crawlers.utils.api_exceptions import APIContentUnavailableError
+
 # 标记已废弃的方法
 from crawlers.utils.utils import model_to_query_string
 
@@ -44,7 +47,13 @@ class TikTokAPPCrawler:
 
     # 获取单个作品数据
     # @deprecated("TikTok APP fetch_one_video is deprecated and will be removed in a future release. Use Web API instead. | TikTok APP fetch_one_video 已弃用，将在将来的版本中删除。请改用Web API。")
-    @retry(stop=stop_after_attempt(10), wait=wait_fixed(1))
+    # 作品确定不可用时不再重试 / Do not retry when the post is definitively unavailable
+    @retry(
+        stop=stop_after_attempt(10),
+        wait=wait_fixed(1),
+        retry=retry_if_not_exception_type(APIContentUnavailableError),
+        reraise=True,
+    )
     async def fetch_one_video(self, aweme_id: str):
         # 获取TikTok的实时Cookie
         kwargs = await self.get_tiktok_headers()
@@ -55,9 +64,15 @@ class TikTokAPPCrawler:
         base_crawler = BaseCrawler(proxies=kwargs["proxies"], crawler_headers=kwargs["headers"])
         async with base_crawler as crawler:
             response = await crawler.fetch_get_json(url)
-            response = response.get("aweme_list")[0]
+            aweme_list = response.get("aweme_list") or []
+            if not aweme_list:
+                raise APIContentUnavailableError(
+                    "作品列表为空/Empty aweme_list", APIContentUnavailableError.EMPTY_DETAIL
+                )
+            response = aweme_list[0]
+            # feed 接口在作品不存在时会返回其他作品 / The feed endpoint returns another post when the id is gone
             if response.get("aweme_id") != aweme_id:
-                raise Exception("作品ID错误/Video ID error")
+                raise APIContentUnavailableError("作品ID错误/Video ID error", APIContentUnavailableError.ID_MISMATCH)
         return response
 
     """-------------------------------------------------------main------------------------------------------------------"""
@@ -1,4 +1,3 @@
-import asyncio
 import json
 import os
 import re
@@ -15,7 +14,10 @@ from crawlers.utils.api_exceptions import (
     APIResponseError,
     APIUnauthorizedError,
 )
+from crawlers.utils.batch import batch_concurrency, borrow_client, bounded_map
 from crawlers.utils.logger import logger
+from crawlers.utils.redirects import resolve_redirects
+from crawlers.utils.url_router import KIND_USER, route_url
 from crawlers.utils.utils import (
     extract_valid_urls,
     gen_random_str,
@@ -266,15 +268,18 @@ class BogusManager:
     def model_2_endpoint(
         cls,
         base_endpoint: str,
-        params: dict,
+        params: dict | str,
         user_agent: str,
     ) -> str:
-        # 检查params是否是一个字典 (Check if params is a dict)
-        if not isinstance(params, dict):
+        # 检查params是否是一个字典，预编译模板生成的参数字符串直接使用
+        # (Check if params is a dict; a precompiled template query string is used as-is)
+        if isinstance(params, str):
+            param_str = params
+        elif isinstance(params, dict):
+            param_str = "&".join([f"{k}={v}" for k, v in params.items()])
+        else:
             raise TypeError("参数必须是字典类型")
 
-        param_str = "&".join([f"{k}={v}" for k, v in params.items()])
-
         try:
             xb_value = XB(user_agent).getXBogus(param_str)
         except Exception as e:
@@ -289,19 +294,84 @@ class BogusManager:
 
 
 class SecUserIdFetcher:
+    # 用户主页中 rehydration 数据脚本的起止标记 (Start/end markers of the rehydration data script)
+    _TIKTOK_SECUID_START = b'<script id="__UNIVERSAL_DATA_FOR_REHYDRATION__" type="application/json">'
+    _TIKTOK_SECUID_END = b"</script>"
+    # 用户详情所在的键，只解码这一段 JSON (Key of the user detail; only this part of the JSON is decoded)
+    _TIKTOK_USER_DETAIL_KEY = re.compile(r'"webapp\.user-detail"\s*:\s*')
+    # 流式读取主页的最大字节数 (Max bytes read from a profile page)
+    _TIKTOK_PAGE_LIMIT = 4 * 1024 * 1024
     # 预编译正则表达式
-    _TIKTOK_SECUID_PARREN = re.compile(
-        r"<script id=\"__UNIVERSAL_DATA_FOR_REHYDRATION__\" type=\"application/json\">(.*?)</script>"
-    )
     _TIKTOK_UNIQUEID_PARREN = re.compile(r"/@([^/?]*)")
     _TIKTOK_NOTFOUND_PARREN = re.compile(r"notfound")
 
     @classmethod
-    async def get_secuid(cls, url: str) -> str:
+    def _client(cls) -> httpx.AsyncClient:
+        """创建请求客户端，批量解析时整批共享 (Create the HTTP client, shared by a whole batch)"""
+        return httpx.AsyncClient(
+            transport=httpx.AsyncHTTPTransport(retries=5), proxies=TokenManager.proxies, timeout=10, trust_env=False
+        )
+
+    @classmethod
+    async def _read_rehydration_data(cls, response: httpx.Response) -> str | None:
+        """
+        流式读取主页，读到 rehydration 脚本的结束标签即停止，不下载页面剩余部分
+        (Stream the profile page and stop at the closing tag of the rehydration script, skipping the rest of the page)
+
+        Args:
+            response: 尚未读取响应体的流式响应 (Unread streaming response)
+        Return:
+            脚本内的 JSON 文本，未找到时返回 None (JSON text inside the script, None when not found)
+        """
+        buffer = bytearray()
+        start = -1
+        scanned = 0
+        async for chunk in response.aiter_bytes():
+            buffer += chunk
+            if start < 0:
+                found = buffer.find(cls._TIKTOK_SECUID_START, max(0, scanned - len(cls._TIKTOK_SECUID_START)))
+                if found < 0:
+                    # 起始标记之前的内容无需保留 (Nothing before the start marker is needed)
+                    keep = len(cls._TIKTOK_SECUID_START)
+                    del buffer[:-keep]
+                    scanned = len(buffer)
+                    continue
+                start = found + len(cls._TIKTOK_SECUID_START)
+                scanned = start
+            end = buffer.find(cls._TIKTOK_SECUID_END, max(start, scanned - len(cls._TIKTOK_SECUID_END)))
+            if end >= 0:
+                return buffer[start:end].decode("utf-8", errors="replace")
+            scanned = len(buffer)
+            if scanned - start > cls._TIKTOK_PAGE_LIMIT:
+                break
+        return None
+
+    @classmethod
+    def _extract_secuid(cls, blob: str) -> tuple[str | None, dict]:
+        """
+        只解码用户详情对象并读取 secUid (Decode only the user detail object and read its secUid)
+
+        Args:
+            blob: rehydration 脚本内的 JSON 文本 (JSON text of the rehydration script)
+        Return:
+            (secUid, 用户信息) (secUid and the user info)
+        """
+        match = cls._TIKTOK_USER_DETAIL_KEY.search(blob)
+        if not match:
+            return None, {}
+        user_detail, _ = json.JSONDecoder().raw_decode(blob, match.end())
+        if not isinstance(user_detail, dict):
+            return None, {}
+        user_info = user_detail.get("userInfo", {}).get("user", {})
+        return user_info.get("secUid"), user_info
+
+    @classmethod
+    async def get_secuid(cls, url: str, client: httpx.AsyncClient = None) -> str:
         """
         获取TikTok用户sec_uid
         Args:
             url: 用户主页链接
+            client: 批量解析共享的客户端，为空时临时创建
         Return:
             sec_uid: 用户唯一标识
         """
@@ -318,15 +388,15 @@ class SecUserIdFetcher:
         if not _is_allowed_tiktok_url(url, {"www.tiktok.com", "m.tiktok.com"}):
             raise APINotFoundError("输入的URL不合法（不是 TikTok 网页域名）。类名：{0}".format(cls.__name__))
 
-        transport = httpx.AsyncHTTPTransport(retries=5)
-        async with httpx.AsyncClient(transport=transport, proxies=TokenManager.proxies, timeout=10, trust_env=False) as client:
+        async with borrow_client(client, cls._client) as client:
             try:
                 from urllib.parse import urlparse as _up
                 _p = _up(url)
                 safe_url = f"https://{(_p.hostname or '').lower().rstrip('.')}{_p.path or '/'}" + (f"?{_p.query}" if _p.query else "")
-                response = await client.get(safe_url, follow_redirects=True)
-                # 444一般为Nginx拦截，不返回状态 (444 is generally intercepted by Nginx and does not return status)
-                if response.status_code in {200, 444}:
+                async with client.stream("GET", safe_url, follow_redirects=True) as response:
+                    # 444一般为Nginx拦截，不返回状态 (444 is generally intercepted by Nginx and does not return status)
+                    if response.status_code not in {200, 444}:
+                        raise ConnectionError("接口状态码异常, 请检查重试")
                     # 校验重定向后的域名仍在允许集合
                     from urllib.parse import urlparse as _up
                     pf = _up(str(response.url))
@@ -337,25 +407,19 @@ class SecUserIdFetcher:
                             "页面不可用，可能是由于区域限制（代理）造成的。类名: {0}".format(cls.__name__)
                         )
 
-                    match = cls._TIKTOK_SECUID_PARREN.search(str(response.text))
-                    if not match:
-                        raise APIResponseError(
-                            "未在响应中找到 {0}，检查链接是否为用户主页。类名: {1}".format("sec_uid", cls.__name__)
-                        )
-
-                    # 提取SIGI_STATE对象中的sec_uid
-                    data = json.loads(match.group(1))
-                    default_scope = data.get("__DEFAULT_SCOPE__", {})
-                    user_detail = default_scope.get("webapp.user-detail", {})
-                    user_info = user_detail.get("userInfo", {}).get("user", {})
-                    sec_uid = user_info.get("secUid")
+                    # 读到脚本结束标签即关闭连接 (The connection is closed once the closing tag is seen)
+                    blob = await cls._read_rehydration_data(response)
+                if blob is None:
+                    raise APIResponseError(
+                        "未在响应中找到 {0}，检查链接是否为用户主页。类名: {1}".format("sec_uid", cls.__name__)
+                    )
 
-                    if sec_uid is None:
-                        raise RuntimeError("获取 {0} 失败，{1}".format(sec_uid, user_info))
+                # 提取rehydration数据中的sec_uid
+                sec_uid, user_info = cls._extract_secuid(blob)
+                if sec_uid is None:
+                    raise RuntimeError("获取 {0} 失败，{1}".format(sec_uid, user_info))
 
-                    return sec_uid
-                else:
-                    raise ConnectionError("接口状态码异常, 请检查重试")
+                return sec_uid
 
             except httpx.RequestError as exc:
                 # 捕获所有与 httpx 请求相关的异常情况 (Captures all httpx request-related exceptions)
@@ -374,7 +438,8 @@ class SecUserIdFetcher:
             urls: list: 用户url列表 (User url list)
 
         Return:
-            secuids: list: 用户secuid列表 (User secuid list)
+            secuids: list: 按输入顺序的逐项结果，成功项的 data 为 secuid
+                (Per-item results in input order; data holds the secuid of successful items)
         """
 
         if not isinstance(urls, list):
@@ -386,15 +451,18 @@ class SecUserIdFetcher:
         if urls == []:
             raise (APINotFoundError("输入的URL List不合法。类名：{0}".format(cls.__name__)))
 
-        secuids = [cls.get_secuid(url) for url in urls]
-        return await asyncio.gather(*secuids)
+        async with cls._client() as client:
+            return await bounded_map(
+                lambda url: cls.get_secuid(url, client=client), urls, batch_concurrency(global_config)
+            )
 
     @classmethod
-    async def get_uniqueid(cls, url: str) -> str:
+    async def get_uniqueid(cls, url: str, client: httpx.AsyncClient = None) -> str:
         """
         获取TikTok用户unique_id
         Args:
             url: 用户主页链接
+            client: 批量解析共享的客户端，为空时临时创建
         Return:
             unique_id: 用户唯一id
         """
@@ -411,37 +479,36 @@ class SecUserIdFetcher:
         if not _is_allowed_tiktok_url(url, {"www.tiktok.com", "m.tiktok.com"}):
             raise APINotFoundError("输入的URL不合法（不是 TikTok 网页域名）。类名：{0}".format(cls.__name__))
 
-        transport = httpx.AsyncHTTPTransport(retries=5)
-        async with httpx.AsyncClient(transport=transport, proxies=TokenManager.proxies, timeout=10, trust_env=False) as client:
+        async with borrow_client(client, cls._client) as client:
             try:
                 from urllib.parse import urlparse as _up
                 _p = _up(url)
                 safe_url = f"https://{(_p.hostname or '').lower().rstrip('.')}{_p.path or '/'}" + (f"?{_p.query}" if _p.query else "")
-                response = await client.get(safe_url, follow_redirects=True)
-
-                if response.status_code in {200, 444}:
-                    # 校验重定向后的域名仍在允许集合
-                    from urllib.parse import urlparse as _up
-                    pf = _up(str(response.url))
-                    if (pf.hostname or "").lower() not in {"www.tiktok.com", "m.tiktok.com"}:
-                        raise APIResponseError("重定向目标不在允许域名范围内")
-                    if cls._TIKTOK_NOTFOUND_PARREN.search(str(response.url)):
-                        raise APINotFoundError(
-                            "页面不可用，可能是由于区域限制（代理）造成的。类名: {0}".format(cls.__name__)
-                        )
-
-                    match = cls._TIKTOK_UNIQUEID_PARREN.search(str(response.url))
-                    if not match:
-                        raise APIResponseError("未在响应中找到 {0}".format("unique_id"))
-
-                    unique_id = match.group(1)
-
-                    if unique_id is None:
-                        raise RuntimeError("获取 {0} 失败，{1}".format("unique_id", response.url))
-
-                    return unique_id
-                else:
-                    raise ConnectionError("接口状态码异常 {0}, 请检查重试".format(response.status_code))
+                # unique_id 只取自重定向后的地址，无需读取页面内容 (unique_id comes from the final URL; the page body is never read)
+                async with client.stream("GET", safe_url, follow_redirects=True) as response:
+                    if response.status_code in {200, 444}:
+                        # 校验重定向后的域名仍在允许集合
+                        from urllib.parse import urlparse as _up
+                        pf = _up(str(response.url))
+                        if (pf.hostname or "").lower() not in {"www.tiktok.com", "m.tiktok.com"}:
+                            raise APIResponseError("重定向目标不在允许域名范围内")
+                        if cls._TIKTOK_NOTFOUND_PARREN.search(str(response.url)):
+                            raise APINotFoundError(
+                                "页面不可用，可能是由于区域限制（代理）造成的。类名: {0}".format(cls.__name__)
+                            )
+
+                        match = cls._TIKTOK_UNIQUEID_PARREN.search(str(response.url))
+                        if not match:
+                            raise APIResponseError("未在响应中找到 {0}".format("unique_id"))
+
+                        unique_id = match.group(1)
+
+                        if unique_id is None:
+                            raise RuntimeError("获取 {0} 失败，{1}".format("unique_id", response.url))
+
+                        return unique_id
+                    else:
+                        raise ConnectionError("接口状态码异常 {0}, 请检查重试".format(response.status_code))
 
             except httpx.RequestError:
                 raise APIConnectionError(
@@ -459,7 +526,8 @@ class SecUserIdFetcher:
             urls: list: 用户url列表 (User url list)
 
         Return:
-            unique_ids: list: 用户unique_id列表 (User unique_id list)
+            unique_ids: list: 按输入顺序的逐项结果，成功项的 data 为 unique_id
+                (Per-item results in input order; data holds the unique_id of successful items)
         """
 
         if not isinstance(urls, list):
@@ -471,8 +539,10 @@ class SecUserIdFetcher:
         if urls == []:
             raise (APINotFoundError("输入的URL List不合法。类名：{0}".format(cls.__name__)))
 
-        unique_ids = [cls.get_uniqueid(url) for url in urls]
-        return await asyncio.gather(*unique_ids)
+        async with cls._client() as client:
+            return await bounded_map(
+                lambda url: cls.get_uniqueid(url, client=client), urls, batch_concurrency(global_config)
+            )
 
 
 class AwemeIdFetcher:
@@ -486,11 +556,19 @@ class AwemeIdFetcher:
     _TIKTOK_NOTFOUND_PATTERN = re.compile(r"notfound")
 
     @classmethod
-    async def get_aweme_id(cls, url: str) -> str:
+    def _client(cls) -> httpx.AsyncClient:
+        """创建请求客户端，批量解析时整批共享 (Create the HTTP client, shared by a whole batch)"""
+        return httpx.AsyncClient(
+            transport=httpx.AsyncHTTPTransport(retries=10), proxies=TokenManager.proxies, timeout=10, trust_env=False
+        )
+
+    @classmethod
+    async def get_aweme_id(cls, url: str, client: httpx.AsyncClient = None) -> str:
         """
         获取TikTok作品aweme_id或photo_id
         Args:
             url: 作品链接
+            client: 批量解析共享的客户端，为空时临时创建
         Return:
             aweme_id: 作品唯一标识
         """
@@ -505,59 +583,53 @@ class AwemeIdFetcher:
         if url is None:
             raise APINotFoundError("输入的URL不合法。类名：{0}".format(cls.__name__))
 
-        # 处理不是短连接的情况
-        if "tiktok" and "@" in url:
-            print(f"输入的URL无需重定向: {url}")
-            video_match = cls._TIKTOK_AWEMEID_PATTERN.search(url)
-            photo_match = cls._TIKTOK_PHOTOID_PATTERN.search(url)
-
-            if not video_match and not photo_match:
+        # 处理不是短连接的情况：按主机名路由并在本地提取 video/photo ID
+        routed = route_url(url)
+        if routed is not None and routed.platform == "tiktok":
+            if routed.post_id:
+                return routed.post_id
+            if routed.kind == KIND_USER:
                 raise APIResponseError("未在响应中找到 aweme_id 或 photo_id")
 
-            aweme_id = video_match.group(1) if video_match else photo_match.group(1)
-
-            if aweme_id is None:
-                raise RuntimeError("获取 aweme_id 或 photo_id 失败，{0}".format(url))
-
-            return aweme_id
-
         # 处理短连接的情况，根据重定向后的链接获取aweme_id
         print(f"输入的URL需要重定向: {url}")
-        transport = httpx.AsyncHTTPTransport(retries=10)
-        async with httpx.AsyncClient(transport=transport, proxies=TokenManager.proxies, timeout=10, trust_env=False) as client:
+        async with borrow_client(client, cls._client) as client:
             try:
                 if not _is_allowed_tiktok_url(url, {"vt.tiktok.com", "www.tiktok.com", "m.tiktok.com"}):
                     raise APINotFoundError("输入的URL不合法（不是 TikTok 网页/短链域名）。类名：{0}".format(cls.__name__))
                 from urllib.parse import urlparse as _up
                 _p = _up(url)
                 safe_url = f"https://{(_p.hostname or '').lower().rstrip('.')}{_p.path or '/'}" + (f"?{_p.query}" if _p.query else "")
-                response = await client.get(safe_url, follow_redirects=True)
+                # 逐跳解析重定向，任一跳地址含作品ID即停止，不下载落地页 (Stop at the first hop carrying a post id)
+                final_url, aweme_id, status_code = await resolve_redirects(
+                    client,
+                    safe_url,
+                    lambda target: _is_allowed_tiktok_url(target, {"vt.tiktok.com", "www.tiktok.com", "m.tiktok.com"}),
+                    cls._match_aweme_id,
+                )
+                if aweme_id:
+                    return aweme_id
 
-                if response.status_code in {200, 444}:
+                if status_code in {200, 444}:
                     # 校验重定向后的域名仍在允许集合
                     from urllib.parse import urlparse as _up
-                    pf = _up(str(response.url))
+                    pf = _up(final_url)
                     if (pf.hostname or "").lower() not in {"www.tiktok.com", "m.tiktok.com"}:
                         raise APIResponseError("重定向目标不在允许域名范围内")
-                    if cls._TIKTOK_NOTFOUND_PATTERN.search(str(response.url)):
+                    if cls._TIKTOK_NOTFOUND_PATTERN.search(final_url):
                         raise APINotFoundError(
                             "页面不可用，可能是由于区域限制（代理）造成的。类名: {0}".format(cls.__name__)
                         )
 
-                    video_match = cls._TIKTOK_AWEMEID_PATTERN.search(str(response.url))
-                    photo_match = cls._TIKTOK_PHOTOID_PATTERN.search(str(response.url))
+                    video_match = cls._TIKTOK_AWEMEID_PATTERN.search(final_url)
+                    photo_match = cls._TIKTOK_PHOTOID_PATTERN.search(final_url)
 
                     if not video_match and not photo_match:
                         raise APIResponseError("未在响应中找到 aweme_id 或 photo_id")
 
-                    aweme_id = video_match.group(1) if video_match else photo_match.group(1)
-
-                    if aweme_id is None:
-                        raise RuntimeError("获取 aweme_id 或 photo_id 失败，{0}".format(response.url))
-
-                    return aweme_id
+                    return video_match.group(1) if video_match else photo_match.group(1)
                 else:
-                    raise ConnectionError("接口状态码异常 {0}，请检查重试".format(response.status_code))
+                    raise ConnectionError("接口状态码异常 {0}，请检查重试".format(status_code))
 
             except httpx.RequestError as exc:
                 # 捕获所有与 httpx 请求相关的异常情况
@@ -567,6 +639,12 @@ class AwemeIdFetcher:
                     )
                 )
 
+    @staticmethod
+    def _match_aweme_id(url: str):
+        """从重定向目标中提取作品ID (Extract a post id from a redirect target)"""
+        routed = route_url(url)
+        return routed.post_id if routed is not None and routed.platform == "tiktok" else None
+
     @classmethod
     async def get_all_aweme_id(cls, urls: list) -> list:
         """
@@ -576,7 +654,8 @@ class AwemeIdFetcher:
             urls: list: 列表url (list url)
 
         Return:
-            aweme_ids: list: 视频的唯一标识，返回列表 (The unique identifier of the video, return list)
+            aweme_ids: list: 按输入顺序的逐项结果，成功项的 data 为 aweme_id
+                (Per-item results in input order; data holds the aweme_id of successful items)
         """
 
         if not isinstance(urls, list):
@@ -588,8 +667,10 @@ class AwemeIdFetcher:
         if urls == []:
             raise (APINotFoundError("输入的URL List不合法。类名：{0}".format(cls.__name__)))
 
-        aweme_ids = [cls.get_aweme_id(url) for url in urls]
-        return await asyncio.gather(*aweme_ids)
+        async with cls._client() as client:
+            return await bounded_map(
+                lambda url: cls.get_aweme_id(url, client=client), urls, batch_concurrency(global_config)
+            )
 
 
 def format_file_name(
@@ -25,6 +25,7 @@ from crawlers.tiktok.web.models import (
 
 # TikTok加密参数生成器
 from crawlers.tiktok.web.utils import AwemeIdFetcher, BogusManager, SecUserIdFetcher, TokenManager
+from crawlers.utils.query_template import render_query
 from crawlers.utils.utils import extract_valid_urls
 
 # 配置文件路径（统一从项目根的 config 目录读取）
@@ -63,10 +64,10 @@ class TikTokWebCrawler:
         base_crawler = BaseCrawler(proxies=kwargs["proxies"], crawler_headers=kwargs["headers"])
         async with base_crawler as crawler:
             # 创建一个作品详情的BaseModel参数
-            params = PostDetail(itemId=itemId)
+            params = render_query(PostDetail, {"itemId": itemId}, encode=False)
             # 生成一个作品详情的带有加密参数的Endpoint
             endpoint = BogusManager.model_2_endpoint(
-                TikTokAPIEndpoints.POST_DETAIL, params.dict(), kwargs["headers"]["User-Agent"]
+                TikTokAPIEndpoints.POST_DETAIL, params, kwargs["headers"]["User-Agent"]
             )
             response = await crawler.fetch_get_json(endpoint)
         return response
@@ -79,10 +80,10 @@ class TikTokWebCrawler:
         base_crawler = BaseCrawler(proxies=kwargs["proxies"], crawler_headers=kwargs["headers"])
         async with base_crawler as crawler:
             # 创建一个用户详情的BaseModel参数
-            params = UserProfile(secUid=secUid, uniqueId=uniqueId)
+            params = render_query(UserProfile, {"secUid": secUid, "uniqueId": uniqueId}, encode=False)
             # 生成一个用户详情的带有加密参数的Endpoint
             endpoint = BogusManager.model_2_endpoint(
-                TikTokAPIEndpoints.USER_DETAIL, params.dict(), kwargs["headers"]["User-Agent"]
+                TikTokAPIEndpoints.USER_DETAIL, params, kwargs["headers"]["User-Agent"]
             )
             response = await crawler.fetch_get_json(endpoint)
         return response
@@ -96,10 +97,12 @@ class TikTokWebCrawler:
         base_crawler = BaseCrawler(proxies=kwargs["proxies"], crawler_headers=kwargs["headers"])
         async with base_crawler as crawler:
             # 创建一个用户作品的BaseModel参数
-            params = UserPost(secUid=secUid, cursor=cursor, count=count, coverFormat=coverFormat)
+            params = render_query(
+                UserPost, {"secUid": secUid, "cursor": cursor, "count": count, "coverFormat": coverFormat}, encode=False
+            )
             # 生成一个用户作品的带有加密参数的Endpoint
             endpoint = BogusManager.model_2_endpoint(
-                TikTokAPIEndpoints.USER_POST, params.dict(), kwargs["headers"]["User-Agent"]
+                TikTokAPIEndpoints.USER_POST, params, kwargs["headers"]["User-Agent"]
             )
             response = await crawler.fetch_get_json(endpoint)
         return response
@@ -112,10 +115,12 @@ class TikTokWebCrawler:
         base_crawler = BaseCrawler(proxies=kwargs["proxies"], crawler_headers=kwargs["headers"])
         async with base_crawler as crawler:
             # 创建一个用户点赞的BaseModel参数
-            params = UserLike(secUid=secUid, cursor=cursor, count=count, coverFormat=coverFormat)
+            params = render_query(
+                UserLike, {"secUid": secUid, "cursor": cursor, "count": count, "coverFormat": coverFormat}, encode=False
+            )
             # 生成一个用户点赞的带有加密参数的Endpoint
             endpoint = BogusManager.model_2_endpoint(
-                TikTokAPIEndpoints.USER_LIKE, params.dict(), kwargs["headers"]["User-Agent"]
+                TikTokAPIEndpoints.USER_LIKE, params, kwargs["headers"]["User-Agent"]
             )
             response = await crawler.fetch_get_json(endpoint)
         return response
@@ -131,10 +136,14 @@ class TikTokWebCrawler:
         base_crawler = BaseCrawler(proxies=kwargs["proxies"], crawler_headers=kwargs["headers"])
         async with base_crawler as crawler:
             # 创建一个用户收藏的BaseModel参数
-            params = UserCollect(cookie=cookie, secUid=secUid, cursor=cursor, count=count, coverFormat=coverFormat)
+            params = render_query(
+                UserCollect,
+                {"cookie": cookie, "secUid": secUid, "cursor": cursor, "count": count, "coverFormat": coverFormat},
+                encode=False,
+            )
             # 生成一个用户收藏的带有加密参数的Endpoint
             endpoint = BogusManager.model_2_endpoint(
-                TikTokAPIEndpoints.USER_COLLECT, params.dict(), kwargs["headers"]["User-Agent"]
+                TikTokAPIEndpoints.USER_COLLECT, params, kwargs["headers"]["User-Agent"]
             )
             response = await crawler.fetch_get_json(endpoint)
         return response
@@ -147,10 +156,10 @@ class TikTokWebCrawler:
         base_crawler = BaseCrawler(proxies=kwargs["proxies"], crawler_headers=kwargs["headers"])
         async with base_crawler as crawler:
             # 创建一个用户播放列表的BaseModel参数
-            params = UserPlayList(secUid=secUid, cursor=cursor, count=count)
+            params = render_query(UserPlayList, {"secUid": secUid, "cursor": cursor, "count": count}, encode=False)
             # 生成一个用户播放列表的带有加密参数的Endpoint
             endpoint = BogusManager.model_2_endpoint(
-                TikTokAPIEndpoints.USER_PLAY_LIST, params.dict(), kwargs["headers"]["User-Agent"]
+                TikTokAPIEndpoints.USER_PLAY_LIST, params, kwargs["headers"]["User-Agent"]
             )
             response = await crawler.fetch_get_json(endpoint)
         return response
@@ -163,10 +172,10 @@ class TikTokWebCrawler:
         base_crawler = BaseCrawler(proxies=kwargs["proxies"], crawler_headers=kwargs["headers"])
         async with base_crawler as crawler:
             # 创建一个用户合辑的BaseModel参数
-            params = UserMix(mixId=mixId, cursor=cursor, count=count)
+            params = render_query(UserMix, {"mixId": mixId, "cursor": cursor, "count": count}, encode=False)
             # 生成一个用户合辑的带有加密参数的Endpoint
             endpoint = BogusManager.model_2_endpoint(
-                TikTokAPIEndpoints.USER_MIX, params.dict(), kwargs["headers"]["User-Agent"]
+                TikTokAPIEndpoints.USER_MIX, params, kwargs["headers"]["User-Agent"]
             )
             response = await crawler.fetch_get_json(endpoint)
         return response
@@ -180,10 +189,14 @@ class TikTokWebCrawler:
         base_crawler = BaseCrawler(proxies=kwargs["proxies"], crawler_headers=kwargs["headers"])
         async with base_crawler as crawler:
             # 创建一个作品评论的BaseModel参数
-            params = PostComment(aweme_id=aweme_id, cursor=cursor, count=count, current_region=current_region)
+            params = render_query(
+                PostComment,
+                {"aweme_id": aweme_id, "cursor": cursor, "count": count, "current_region": current_region},
+                encode=False,
+            )
             # 生成一个作品评论的带有加密参数的Endpoint
             endpoint = BogusManager.model_2_endpoint(
-                TikTokAPIEndpoints.POST_COMMENT, params.dict(), kwargs["headers"]["User-Agent"]
+                TikTokAPIEndpoints.POST_COMMENT, params, kwargs["headers"]["User-Agent"]
             )
             response = await crawler.fetch_get_json(endpoint)
         return response
@@ -198,12 +211,20 @@ class TikTokWebCrawler:
         base_crawler = BaseCrawler(proxies=kwargs["proxies"], crawler_headers=kwargs["headers"])
         async with base_crawler as crawler:
             # 创建一个作品评论的BaseModel参数
-            params = PostCommentReply(
-                item_id=item_id, comment_id=comment_id, cursor=cursor, count=count, current_region=current_region
+            params = render_query(
+                PostCommentReply,
+                {
+                    "item_id": item_id,
+                    "comment_id": comment_id,
+                    "cursor": cursor,
+                    "count": count,
+                    "current_region": current_region,
+                },
+                encode=False,
             )
             # 生成一个作品评论的带有加密参数的Endpoint
             endpoint = BogusManager.model_2_endpoint(
-                TikTokAPIEndpoints.POST_COMMENT_REPLY, params.dict(), kwargs["headers"]["User-Agent"]
+                TikTokAPIEndpoints.POST_COMMENT_REPLY, params, kwargs["headers"]["User-Agent"]
             )
             response = await crawler.fetch_get_json(endpoint)
         return response
@@ -216,10 +237,14 @@ class TikTokWebCrawler:
         base_crawler = BaseCrawler(proxies=kwargs["proxies"], crawler_headers=kwargs["headers"])
         async with base_crawler as crawler:
             # 创建一个用户关注的BaseModel参数
-            params = UserFans(secUid=secUid, count=count, maxCursor=maxCursor, minCursor=minCursor)
+            params = render_query(
+                UserFans,
+                {"secUid": secUid, "count": count, "maxCursor": maxCursor, "minCursor": minCursor},
+                encode=False,
+            )
             # 生成一个用户关注的带有加密参数的Endpoint
             endpoint = BogusManager.model_2_endpoint(
-                TikTokAPIEndpoints.USER_FANS, params.dict(), kwargs["headers"]["User-Agent"]
+                TikTokAPIEndpoints.USER_FANS, params, kwargs["headers"]["User-Agent"]
             )
             response = await crawler.fetch_get_json(endpoint)
         return response
@@ -232,10 +257,14 @@ class TikTokWebCrawler:
         base_crawler = BaseCrawler(proxies=kwargs["proxies"], crawler_headers=kwargs["headers"])
         async with base_crawler as crawler:
             # 创建一个用户关注的BaseModel参数
-            params = UserFollow(secUid=secUid, count=count, maxCursor=maxCursor, minCursor=minCursor)
+            params = render_query(
+                UserFollow,
+                {"secUid": secUid, "count": count, "maxCursor": maxCursor, "minCursor": minCursor},
+                encode=False,
+            )
             # 生成一个用户关注的带有加密参数的Endpoint
             endpoint = BogusManager.model_2_endpoint(
-                TikTokAPIEndpoints.USER_FOLLOW, params.dict(), kwargs["headers"]["User-Agent"]
+                TikTokAPIEndpoints.USER_FOLLOW, params, kwargs["headers"]["User-Agent"]
             )
             response = await crawler.fetch_get_json(endpoint)
         return response
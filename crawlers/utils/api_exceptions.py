@@ -64,3 +64,22 @@ class APIRetryExhaustedError(APIError):
 
     def display_error(self):
         return f"API Retry Exhausted Error: {self.args[0]}."
+
+
+class APIContentUnavailableError(APIError):
+    """当作品确定不可用时抛出（不存在、私密、地区限制、ID不匹配、详情为空），重试无意义"""
+
+    # 不可用原因 (Unavailability reasons)
+    NOT_FOUND = "not_found"
+    PRIVATE = "private"
+    REGION_BLOCKED = "region_blocked"
+    ID_MISMATCH = "id_mismatch"
+    EMPTY_DETAIL = "empty_detail"
+
+    def __init__(self, message, reason=NOT_FOUND):
+        super().__init__()
+        self.args = (message,)
+        self.reason = reason
+
+    def display_error(self):
+        return f"API Content Unavailable Error ({self.reason}): {self.args[0]}."
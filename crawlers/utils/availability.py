@@ -0,0 +1,96 @@
+from typing import Optional
+
+from crawlers.utils.api_exceptions import APIContentUnavailableError
+
+# 抖音 filter_detail.filter_reason 关键字到不可用原因的映射 (Douyin filter_reason keywords to reasons)
+_DOUYIN_FILTER_REASONS = (
+    ("self_see", APIContentUnavailableError.PRIVATE),
+    ("friend", APIContentUnavailableError.PRIVATE),
+    ("private", APIContentUnavailableError.PRIVATE),
+    ("delete", APIContentUnavailableError.NOT_FOUND),
+    ("region", APIContentUnavailableError.REGION_BLOCKED),
+    ("country", APIContentUnavailableError.REGION_BLOCKED),
+)
+
+# TikTok Web itemDetail statusCode 到不可用原因的映射 (TikTok web statusCode to reasons)
+_TIKTOK_WEB_STATUS = {
+    10204: APIContentUnavailableError.NOT_FOUND,
+    10216: APIContentUnavailableError.PRIVATE,
+    10222: APIContentUnavailableError.PRIVATE,
+}
+
+# Bilibili view 接口 code 到不可用原因的映射 (Bilibili view API code to reasons)
+_BILIBILI_CODES = {
+    -404: APIContentUnavailableError.NOT_FOUND,
+    62002: APIContentUnavailableError.NOT_FOUND,
+    62004: APIContentUnavailableError.NOT_FOUND,
+    62012: APIContentUnavailableError.PRIVATE,
+    -10403: APIContentUnavailableError.REGION_BLOCKED,
+}
+
+
+def check_douyin_detail(data: Optional[dict], aweme_id: str) -> dict:
+    """
+    校验抖音作品详情响应，作品确定不可用时抛出异常 (Validate a Douyin post detail response)
+
+    Args:
+        data (dict): aweme/detail 接口原始响应 (Raw aweme/detail response)
+        aweme_id (str): 请求的作品ID (Requested post id)
+
+    Returns:
+        dict: 原始响应 (The raw response)
+
+    Raises:
+        APIContentUnavailableError: 作品不存在/私密/地区限制/详情为空 (Post is definitively unavailable)
+    """
+    detail = (data or {}).get("aweme_detail")
+    if detail:
+        if str(detail.get("aweme_id", aweme_id)) != str(aweme_id):
+            raise APIContentUnavailableError(f"作品ID不匹配: {aweme_id}", APIContentUnavailableError.ID_MISMATCH)
+        return data
+    filter_detail = (data or {}).get("filter_detail") or {}
+    filter_reason = str(filter_detail.get("filter_reason") or "").lower()
+    for keyword, reason in _DOUYIN_FILTER_REASONS:
+        if keyword in filter_reason:
+            raise APIContentUnavailableError(filter_detail.get("detail_msg") or filter_reason, reason)
+    raise APIContentUnavailableError(f"aweme_detail 为空: {aweme_id}", APIContentUnavailableError.EMPTY_DETAIL)
+
+
+def check_tiktok_web_detail(data: Optional[dict], item_id: str) -> dict:
+    """
+    校验TikTok Web作品详情响应 (Validate a TikTok web item detail response)
+
+    Args:
+        data (dict): item/detail 接口原始响应 (Raw item/detail response)
+        item_id (str): 请求的作品ID (Requested post id)
+
+    Returns:
+        dict: 原始响应 (The raw response)
+    """
+    data = data or {}
+    reason = _TIKTOK_WEB_STATUS.get(data.get("statusCode"))
+    if reason is not None:
+        raise APIContentUnavailableError(data.get("statusMsg") or f"作品不可用: {item_id}", reason)
+    if data.get("statusCode") == 0 and not (data.get("itemInfo") or {}).get("itemStruct"):
+        raise APIContentUnavailableError(f"itemStruct 为空: {item_id}", APIContentUnavailableError.EMPTY_DETAIL)
+    return data
+
+
+def check_bilibili_detail(data: Optional[dict], bv_id: str) -> dict:
+    """
+    校验Bilibili视频详情响应 (Validate a Bilibili video detail response)
+
+    Args:
+        data (dict): view 接口原始响应 (Raw view response)
+        bv_id (str): 请求的BV号 (Requested BV id)
+
+    Returns:
+        dict: 原始响应 (The raw response)
+    """
+    data = data or {}
+    reason = _BILIBILI_CODES.get(data.get("code"))
+    if reason is not None:
+        raise APIContentUnavailableError(data.get("message") or f"视频不可用: {bv_id}", reason)
+    if data.get("code") == 0 and not data.get("data"):
+        raise APIContentUnavailableError(f"视频详情为空: {bv_id}", APIContentUnavailableError.EMPTY_DETAIL)
+    return data
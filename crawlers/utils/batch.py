@@ -0,0 +1,79 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable, Iterable, Optional
+
+import httpx
+
+# 批量解析的默认并发数 (Default concurrency of batch resolution)
+DEFAULT_CONCURRENCY = 8
+
+
+def batch_concurrency(global_config: Optional[dict]) -> int:
+    """
+    读取批量解析并发数 API.Batch_Concurrency (Read the batch concurrency from API.Batch_Concurrency)
+
+    Args:
+        global_config (dict): 全局配置 (Global config)
+
+    Returns:
+        int: 并发数，至少为 1 (Concurrency, at least 1)
+    """
+    value = ((global_config or {}).get("API") or {}).get("Batch_Concurrency", DEFAULT_CONCURRENCY)
+    try:
+        return max(1, int(value))
+    except (TypeError, ValueError):
+        return DEFAULT_CONCURRENCY
+
+
+async def bounded_map(
+    func: Callable[[Any], Awaitable[Any]], items: Iterable, concurrency: int = DEFAULT_CONCURRENCY
+) -> list[dict]:
+    """
+    以有限并发对每个输入调用 func，按输入顺序返回逐项结果，单项失败不影响其余项
+    (Call func for every item with bounded concurrency and return per-item results in input order;
+    one failure does not abort the batch)
+
+    只启动 concurrency 个工作协程依次领取输入，不会为每个输入同时创建任务与连接
+    (Only `concurrency` workers pull items in turn, so a large batch never opens one connection per item at once)
+
+    Args:
+        func (Callable): 单项处理协程函数 (Coroutine function handling one item)
+        items (Iterable): 输入列表 (Inputs)
+        concurrency (int): 最大并发数 (Maximum concurrency)
+
+    Returns:
+        list[dict]: 每项为 {"input", "success", "data", "error"} (One {"input", "success", "data", "error"} per item)
+    """
+    items = list(items)
+    results: list[Optional[dict]] = [None] * len(items)
+    pending = iter(enumerate(items))
+
+    async def worker():
+        for index, item in pending:
+            try:
+                data = await func(item)
+            except Exception as e:
+                results[index] = {"input": item, "success": False, "data": None, "error": str(e) or type(e).__name__}
+            else:
+                results[index] = {"input": item, "success": True, "data": data, "error": None}
+
+    workers = min(max(1, int(concurrency)), len(items))
+    await asyncio.gather(*(worker() for _ in range(workers)))
+    return results
+
+
+@asynccontextmanager
+async def borrow_client(client: Optional[httpx.AsyncClient], factory: Callable[[], httpx.AsyncClient]):
+    """
+    有共享客户端时直接使用（不关闭），否则临时创建一个并在退出时关闭
+    (Use a shared client as-is without closing it, or create a temporary one closed on exit)
+
+    Args:
+        client (httpx.AsyncClient | None): 批量调用共享的客户端 (Client shared by a batch)
+        factory (Callable): 创建客户端的函数 (Client factory)
+    """
+    if client is not None:
+        yield client
+        return
+    async with factory() as owned:
+        yield owned
@@ -0,0 +1,384 @@
+import asyncio
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Hashable, Optional
+from urllib.parse import parse_qsl, urlsplit
+
+import yaml
+
+from crawlers.utils.api_exceptions import APIContentUnavailableError
+from crawlers.utils.logger import log_metric
+
+# 签名URL中携带过期时间(Unix秒)的查询参数 (Query parameters carrying the expiry (unix seconds) of signed URLs)
+# Bilibili: deadline=；抖音/TikTok: x-expires= / expire=
+EXPIRY_PARAMS = ("deadline", "x-expires", "expire")
+
+# 缓存状态 (Cache statuses)
+STATUS_HIT = "HIT"
+STATUS_MISS = "MISS"
+STATUS_STALE = "STALE"  # 过期但在 stale-while-revalidate 窗口内，后台刷新中
+STATUS_STALE_ERROR = "STALE-ERROR"  # 上游出错，返回 stale-if-error 窗口内的旧数据
+STATUS_NEGATIVE = "NEGATIVE"  # 命中负缓存，直接返回错误
+
+# 各不可用原因的默认负缓存TTL秒数 (Default negative TTLs per unavailability reason)
+DEFAULT_NEGATIVE_TTLS = {
+    APIContentUnavailableError.NOT_FOUND: 300,
+    APIContentUnavailableError.PRIVATE: 300,
+    APIContentUnavailableError.REGION_BLOCKED: 600,
+    APIContentUnavailableError.ID_MISMATCH: 60,
+    APIContentUnavailableError.EMPTY_DETAIL: 60,
+}
+
+# 当前请求最近一次缓存查询的 (状态, 数据年龄秒数)，供接口层设置响应头
+# (Status and age of the latest cache lookup in the current request, used by endpoints to set response headers)
+cache_status: ContextVar[Optional[tuple]] = ContextVar("cache_status", default=None)
+
+
+def parse_url_expiry(url: str) -> Optional[float]:
+    """
+    从签名URL中解析过期时间 (Parse the expiry timestamp from a signed URL)
+
+    Args:
+        url (str): 媒体URL (Media URL)
+
+    Returns:
+        float | None: 过期时间戳，未携带时返回 None (Expiry timestamp, None if absent)
+    """
+    if not isinstance(url, str) or "?" not in url:
+        return None
+    try:
+        query = urlsplit(url).query
+    except ValueError:
+        return None
+    expiry = None
+    for name, value in parse_qsl(query):
+        if name.lower() in EXPIRY_PARAMS and value.isdigit():
+            ts = float(value)
+            # 部分CDN使用毫秒时间戳 (Some CDNs use millisecond timestamps)
+            if ts > 1e11:
+                ts /= 1000
+            expiry = ts if expiry is None else min(expiry, ts)
+    return expiry
+
+
+def earliest_expiry(data: Any) -> Optional[float]:
+    """
+    遍历嵌套数据中的所有URL，返回最早的过期时间 (Walk every URL in nested data and return the earliest expiry)
+
+    Args:
+        data (Any): dict/list/str 组成的解析结果 (Parsed result made of dict/list/str)
+
+    Returns:
+        float | None: 最早过期时间戳，没有签名URL时返回 None (Earliest expiry, None if no signed URL)
+    """
+    earliest = None
+    stack = [data]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, dict):
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple)):
+            stack.extend(item)
+        elif isinstance(item, str) and item.startswith("http"):
+            expiry = parse_url_expiry(item)
+            if expiry is not None and (earliest is None or expiry < earliest):
+                earliest = expiry
+    return earliest
+
+
+def cache_headers() -> dict:
+    """
+    根据当前请求的缓存状态生成响应头 (Build response headers from the cache status of the current request)
+
+    Returns:
+        dict: X-Cache / Age，过期数据额外附带 Warning 头 (X-Cache / Age, plus Warning for stale data)
+    """
+    state = cache_status.get()
+    if state is None:
+        return {}
+    status, age = state
+    headers = {"X-Cache": status, "Age": str(max(0, int(age)))}
+    if status == STATUS_STALE:
+        headers["Warning"] = '110 - "Response is Stale"'
+    elif status == STATUS_STALE_ERROR:
+        headers["Warning"] = '111 - "Revalidation Failed"'
+    return headers
+
+
+class _Entry:
+    __slots__ = ("value", "stored_at", "expires_at", "hits", "refreshing")
+
+    def __init__(self, value: Any, stored_at: float, expires_at: float):
+        self.value = value
+        self.stored_at = stored_at
+        self.expires_at = expires_at
+        self.hits = 0
+        self.refreshing = False
+
+
+class ResultCache:
+    """
+    解析结果缓存，TTL 由结果中签名URL的最早过期时间决定 (Result cache whose TTL follows the earliest signed-URL expiry)
+
+    - 有签名URL：TTL = 最早过期时间 - 安全余量，且不超过 max_ttl
+    - 无签名URL：TTL = default_ttl
+    - 热点键（命中次数 >= hot_hits）在剩余时间小于 refresh_ahead 时于后台提前刷新
+    - 过期后 stale_while_revalidate 秒内直接返回旧数据，并仅触发一次后台刷新
+    - 过期后 stale_if_error 秒内，上游出错时返回旧数据而不是报错
+    - loader 抛出 APIContentUnavailableError 时按原因写入负缓存，TTL 内同一键直接抛错，不再请求上游
+    - 同一进程内的多个事件循环（如 PyWebIO 线程中的 asyncio.run）共享同一实例，内部状态由线程锁保护
+    - 返回的缓存值为共享对象，调用方不应修改
+
+    Args:
+        max_entries (int): 最大条目数，超出后按LRU淘汰 (Max entries, LRU eviction)
+        default_ttl (float): 结果不含签名URL时的TTL秒数 (TTL when no signed URL is present)
+        max_ttl (float): TTL上限秒数 (Upper bound of the TTL)
+        safety_margin (float): 距签名过期的安全余量秒数 (Seconds kept before the signature expires)
+        refresh_ahead (float): 热点键提前刷新的窗口秒数 (Refresh-ahead window for hot keys)
+        hot_hits (int): 判定为热点键的命中次数 (Hits needed to treat a key as hot)
+        stale_while_revalidate (float): 过期后仍可直接返回的秒数 (Seconds a stale value is served while revalidating)
+        stale_if_error (float): 上游出错时仍可返回旧数据的秒数 (Seconds a stale value is served on upstream errors)
+        negative_ttls (dict): 各不可用原因的负缓存秒数，0 表示不缓存 (Negative TTL per reason, 0 disables)
+        enabled (bool): 是否启用缓存 (Enable the cache)
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        default_ttl: float = 300,
+        max_ttl: float = 3600,
+        safety_margin: float = 60,
+        refresh_ahead: float = 120,
+        hot_hits: int = 3,
+        stale_while_revalidate: float = 0,
+        stale_if_error: float = 0,
+        negative_ttls: Optional[dict] = None,
+        enabled: bool = True,
+        name: str = "result_cache",
+    ):
+        self.max_entries = max(1, int(max_entries))
+        self.default_ttl = float(default_ttl)
+        self.max_ttl = float(max_ttl)
+        self.safety_margin = float(safety_margin)
+        self.refresh_ahead = float(refresh_ahead)
+        self.hot_hits = max(1, int(hot_hits))
+        self.stale_while_revalidate = max(0.0, float(stale_while_revalidate))
+        self.stale_if_error = max(self.stale_while_revalidate, float(stale_if_error))
+        self.negative_ttls = dict(DEFAULT_NEGATIVE_TTLS)
+        self.negative_ttls.update({k: float(v) for k, v in (negative_ttls or {}).items()})
+        self.enabled = bool(enabled)
+        self.name = name
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        # 负缓存：键 -> (错误信息, 原因, 过期时间) (Negative cache: key -> (message, reason, expires_at))
+        self._negative: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._tasks: set = set()
+
+    @classmethod
+    def from_config(cls, cfg: Optional[dict], name: str = "result_cache") -> "ResultCache":
+        """从配置字典创建缓存 (Create a cache from a config dict)"""
+        cfg = cfg or {}
+        return cls(
+            max_entries=cfg.get("Max_Entries", 1024),
+            default_ttl=cfg.get("Default_TTL", 300),
+            max_ttl=cfg.get("Max_TTL", 3600),
+            safety_margin=cfg.get("Safety_Margin", 60),
+            refresh_ahead=cfg.get("Refresh_Ahead", 120),
+            hot_hits=cfg.get("Hot_Hits", 3),
+            stale_while_revalidate=cfg.get("Stale_While_Revalidate", 0),
+            stale_if_error=cfg.get("Stale_If_Error", 0),
+            negative_ttls=cfg.get("Negative_TTL"),
+            enabled=cfg.get("Enabled", True),
+            name=name,
+        )
+
+    def ttl_for(self, value: Any, now: Optional[float] = None) -> float:
+        """
+        计算结果的TTL，<= 0 表示不应缓存 (Compute the TTL of a value, <= 0 means do not cache)
+        """
+        now = time.time() if now is None else now
+        expiry = earliest_expiry(value)
+        if expiry is None:
+            return self.default_ttl
+        return min(expiry - self.safety_margin - now, self.max_ttl)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """读取未过期的缓存值 (Read a fresh cached value)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.expires_at <= time.time():
+                return None
+            return entry.value
+
+    def set(self, key: Hashable, value: Any) -> bool:
+        """
+        写入缓存，TTL 不为正时跳过 (Store a value, skipped when the TTL is not positive)
+
+        Returns:
+            bool: 是否已写入 (Whether it was stored)
+        """
+        if not self.enabled:
+            return False
+        now = time.time()
+        ttl = self.ttl_for(value, now)
+        if ttl <= 0:
+            return False
+        with self._lock:
+            self._negative.pop(key, None)
+            self._entries[key] = _Entry(value, now, now + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return True
+
+    def set_negative(self, key: Hashable, error: APIContentUnavailableError) -> bool:
+        """
+        按不可用原因写入负缓存 (Store a negative entry for the reason of the error)
+
+        Returns:
+            bool: 是否已写入 (Whether it was stored)
+        """
+        ttl = self.negative_ttls.get(error.reason, 0)
+        if not self.enabled or ttl <= 0:
+            return False
+        with self._lock:
+            self._entries.pop(key, None)
+            self._negative[key] = (error.args[0] if error.args else "", error.reason, time.time() + ttl)
+            self._negative.move_to_end(key)
+            while len(self._negative) > self.max_entries:
+                self._negative.popitem(last=False)
+        return True
+
+    def _check_negative(self, key: Hashable) -> None:
+        """已知不可用的键直接抛错 (Raise at once for keys known to be unavailable)"""
+        with self._lock:
+            negative = self._negative.get(key)
+            if negative is None:
+                return
+            message, reason, expires_at = negative
+            if expires_at <= time.time():
+                del self._negative[key]
+                return
+        cache_status.set((STATUS_NEGATIVE, 0))
+        log_metric(self.name, status="negative", reason=reason)
+        raise APIContentUnavailableError(message, reason)
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+            self._negative.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._negative.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def get_or_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        命中则直接返回，否则调用 loader 并写入缓存；热点键临近过期或数据已过期时在后台刷新。
+        结果状态写入 cache_status，接口层可通过 cache_headers() 生成响应头。
+        (Return a hit directly, otherwise call loader and store the result; hot keys near expiry and stale
+        entries are refreshed in background. The status is written to cache_status for cache_headers().)
+
+        Args:
+            key (Hashable): 缓存键 (Cache key)
+            loader (Callable): 无参协程函数，返回待缓存的结果 (Zero-arg coroutine function producing the value)
+
+        Returns:
+            Any: 缓存或新加载的结果 (Cached or freshly loaded value)
+        """
+        if not self.enabled:
+            return await loader()
+        self._check_negative(key)
+
+        status = None
+        refresh = False
+        with self._lock:
+            entry = self._entries.get(key)
+            now = time.time()
+            if entry is None:
+                pass
+            elif entry.expires_at > now:
+                status = STATUS_HIT
+                entry.hits += 1
+                self._entries.move_to_end(key)
+                refresh = entry.hits >= self.hot_hits and entry.expires_at - now <= self.refresh_ahead
+            elif now < entry.expires_at + self.stale_while_revalidate:
+                status = STATUS_STALE
+                refresh = True
+            elif now >= entry.expires_at + self.stale_if_error:
+                # 超出所有过期窗口，丢弃 (Beyond every stale window, drop it)
+                del self._entries[key]
+                entry = None
+            if refresh and not entry.refreshing:
+                entry.refreshing = True
+            else:
+                refresh = False
+
+        if status is not None:
+            cache_status.set((status, now - entry.stored_at))
+            log_metric(self.name, status=status.lower(), refresh=refresh)
+            if refresh:
+                task = asyncio.get_running_loop().create_task(self._refresh(key, loader, entry))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+            return entry.value
+
+        try:
+            value = await loader()
+        except APIContentUnavailableError as e:
+            # 作品确定不可用：不返回旧数据，写入负缓存 (Definitively unavailable: no stale value, cache the failure)
+            self.set_negative(key, e)
+            log_metric(self.name, status="unavailable", reason=e.reason)
+            raise
+        except Exception as e:
+            # 上游出错：在 stale-if-error 窗口内返回旧数据 (Upstream error: serve the old value within stale-if-error)
+            if entry is not None:
+                cache_status.set((STATUS_STALE_ERROR, time.time() - entry.stored_at))
+                log_metric(self.name, status="stale-error", error=type(e).__name__)
+                return entry.value
+            raise
+        cache_status.set((STATUS_MISS, 0))
+        log_metric(self.name, status="miss")
+        self.set(key, value)
+        return value
+
+    async def _refresh(self, key: Hashable, loader: Callable[[], Awaitable[Any]], entry: _Entry) -> None:
+        try:
+            value = await loader()
+        except APIContentUnavailableError as e:
+            self.set_negative(key, e)
+            log_metric(self.name, status="refresh_unavailable", reason=e.reason)
+        except Exception as e:
+            # 刷新失败不影响现有条目，后续请求按过期窗口处理 (A failed refresh keeps the current entry for the stale windows)
+            log_metric(self.name, status="refresh_error", error=type(e).__name__)
+        else:
+            if self.set(key, value):
+                # 刷新后保留热度，避免热点键下一轮又要积累命中 (Keep the hit count so the key stays hot)
+                with self._lock:
+                    fresh = self._entries.get(key)
+                    if fresh is not None:
+                        fresh.hits = entry.hits
+            log_metric(self.name, status="refreshed")
+        finally:
+            entry.refreshing = False
+
+
+# 读取全局配置文件中的缓存配置（项目根 config 目录）
+_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+try:
+    with open(os.path.join(_root, "config", "config.yaml"), "r", encoding="utf-8") as f:
+        _cache_config = (yaml.safe_load(f) or {}).get("API", {}).get("Cache", {}) or {}
+except Exception:
+    _cache_config = {}
+
+# 进程内共享的缓存实例 (Process-wide cache instances)
+# hybrid_cache: 混合解析结果；metadata_cache: 各平台 fetch_one_video 原始数据
+hybrid_cache = ResultCache.from_config(_cache_config.get("Hybrid"), name="hybrid_cache")
+metadata_cache = ResultCache.from_config(_cache_config.get("Metadata"), name="metadata_cache")
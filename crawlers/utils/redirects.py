@@ -0,0 +1,57 @@
+from typing import Callable, Optional
+from urllib.parse import urljoin
+
+import httpx
+
+from crawlers.utils.api_exceptions import APIResponseError
+
+# 短链解析最多跟随的跳数 (Max hops followed when resolving a short link)
+MAX_REDIRECT_HOPS = 10
+
+
+async def resolve_redirects(
+    client: httpx.AsyncClient,
+    url: str,
+    allowed: Callable[[str], bool],
+    match: Callable[[str], Optional[str]],
+    max_hops: int = MAX_REDIRECT_HOPS,
+) -> tuple[str, Optional[str], int]:
+    """
+    逐跳解析短链重定向，只读取响应头中的 Location，不下载落地页内容
+    (Resolve short-link redirects hop by hop from Location headers without downloading the landing page)
+
+    - 每一跳的目标地址先用 match 尝试提取ID，提取到即停止，不再请求该地址
+    - 需要继续请求的地址必须通过 allowed 校验（白名单与DNS），否则拒绝
+    - 重定向响应体很小，读取后连接可被下一跳复用；最终页面的响应体不读取，直接关闭
+
+    Args:
+        client (httpx.AsyncClient): 请求客户端 (HTTP client)
+        url (str): 已校验的起始地址 (Validated start URL)
+        allowed (Callable[[str], bool]): 跳转目标校验函数 (Validator for redirect targets)
+        match (Callable[[str], str | None]): 从地址中提取ID的函数 (Extracts an id from a URL)
+        max_hops (int): 最大跳数 (Max hops)
+
+    Returns:
+        tuple: (最后到达的地址, 提取到的ID或None, 最后响应的状态码)
+            (Last URL reached, extracted id or None, status code of the last response)
+
+    Raises:
+        APIResponseError: 跳转目标不在允许范围内或跳数过多 (A redirect target is not allowed or too many hops)
+    """
+    current = url
+    for _ in range(max_hops + 1):
+        async with client.stream("GET", current, follow_redirects=False) as response:
+            status = response.status_code
+            location = response.headers.get("location") if response.is_redirect else None
+            if location is not None:
+                await response.aread()
+        if location is None:
+            return current, None, status
+        target = urljoin(current, location)
+        found = match(target)
+        if found:
+            return target, found, status
+        if not allowed(target):
+            raise APIResponseError("重定向目标不在允许域名范围内")
+        current = target
+    raise APIResponseError("重定向次数过多: {0}".format(url))
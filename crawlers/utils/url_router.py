@@ -0,0 +1,163 @@
+import re
+from typing import Optional
+from urllib.parse import urlsplit
+
+# 链接类型 (Link kinds)
+KIND_VIDEO = "video"
+KIND_NOTE = "note"
+KIND_PHOTO = "photo"
+KIND_USER = "user"
+KIND_LIVE = "live"
+KIND_SHORT = "short"
+KIND_PAGE = "page"
+
+# 可以直接作为作品ID使用的链接类型 (Kinds whose id is a post id)
+POST_KINDS = frozenset({KIND_VIDEO, KIND_NOTE, KIND_PHOTO})
+
+# 与 extract_valid_urls 相同的URL提取规则 (Same URL extraction rule as extract_valid_urls)
+_URL_PATTERN = re.compile(r"https?://[^\s`]+")
+
+
+class RoutedURL:
+    """
+    URL路由结果 (URL routing result)
+
+    Attributes:
+        platform (str): 平台名称 douyin/tiktok/bilibili (Platform name)
+        kind (str): 链接类型，见 KIND_* 常量 (Link kind, see KIND_* constants)
+        id (str | None): 本地提取到的ID，短链等无法本地提取时为 None (Locally extracted id, None for short links)
+        url (str): 规范化后的URL (Normalized URL)
+    """
+
+    __slots__ = ("platform", "kind", "id", "url")
+
+    def __init__(self, platform: str, kind: str, id: Optional[str], url: str):
+        self.platform = platform
+        self.kind = kind
+        self.id = id
+        self.url = url
+
+    @property
+    def is_short(self) -> bool:
+        return self.kind == KIND_SHORT
+
+    @property
+    def post_id(self) -> Optional[str]:
+        """作品ID，仅作品类链接返回 (Post id, only for post links)"""
+        return self.id if self.kind in POST_KINDS else None
+
+    def __eq__(self, other):
+        if not isinstance(other, RoutedURL):
+            return NotImplemented
+        return (self.platform, self.kind, self.id, self.url) == (other.platform, other.kind, other.id, other.url)
+
+    def __repr__(self):
+        return f"RoutedURL(platform={self.platform!r}, kind={self.kind!r}, id={self.id!r}, url={self.url!r})"
+
+
+# 路径规则：(链接类型, 预编译正则, 作用对象 path/query) (Path rules: (kind, compiled regex, target))
+_DOUYIN_WEB_RULES = (
+    (KIND_VIDEO, re.compile(r"/video/(\d+)"), "path"),
+    (KIND_NOTE, re.compile(r"/note/(\d+)"), "path"),
+    (KIND_VIDEO, re.compile(r"(?:^|&)modal_id=(\d+)"), "query"),
+    (KIND_VIDEO, re.compile(r"(?:^|&)vid=(\d+)"), "query"),
+    # /user/self 是当前登录用户的主页而非 sec_user_id/"/user/self" is the logged-in user's page, not a sec_user_id
+    (KIND_USER, re.compile(r"/user/(?!self(?:[/?#]|$))([^/?#]+)"), "path"),
+)
+_DOUYIN_SHARE_RULES = (
+    (KIND_VIDEO, re.compile(r"/share/video/(\d+)"), "path"),
+    (KIND_NOTE, re.compile(r"/share/note/(\d+)"), "path"),
+    (KIND_USER, re.compile(r"/share/user/([^/?#]+)"), "path"),
+)
+_DOUYIN_LIVE_RULES = ((KIND_LIVE, re.compile(r"^/(\d+)"), "path"),)
+_DOUYIN_WEBCAST_RULES = (
+    (KIND_LIVE, re.compile(r"/reflow/(\d+)"), "path"),
+    (KIND_LIVE, re.compile(r"(?:^|&)(?:roomId|liveId)=(\d+)"), "query"),
+)
+_TIKTOK_WEB_RULES = (
+    (KIND_VIDEO, re.compile(r"^/@[^/?#]+/video/(\d+)"), "path"),
+    (KIND_PHOTO, re.compile(r"^/@[^/?#]+/photo/(\d+)"), "path"),
+    (KIND_VIDEO, re.compile(r"^/v/(\d+)"), "path"),
+    (KIND_SHORT, re.compile(r"^/t/[A-Za-z0-9]+"), "path"),
+    (KIND_USER, re.compile(r"^/@([^/?#]+)/?$"), "path"),
+)
+_BILIBILI_WEB_RULES = (
+    (KIND_VIDEO, re.compile(r"/video/(BV[A-Za-z0-9]+)"), "path"),
+    (KIND_VIDEO, re.compile(r"/(BV[A-Za-z0-9]+)"), "path"),
+)
+# 短链域名及其平台：只能通过网络重定向解析 (Short-link hosts and their platform: resolvable only via network redirects)
+_SHORT_HOSTS = {
+    "v.douyin.com": "douyin",
+    "vt.tiktok.com": "tiktok",
+    "vm.tiktok.com": "tiktok",
+    "b23.tv": "bilibili",
+}
+
+# 主机名路由表：精确匹配，O(1) 查找 (Hostname routing table: exact match, O(1) lookup)
+_HOST_TABLE = {
+    "www.douyin.com": ("douyin", _DOUYIN_WEB_RULES),
+    "douyin.com": ("douyin", _DOUYIN_WEB_RULES),
+    "m.douyin.com": ("douyin", _DOUYIN_WEB_RULES),
+    "www.iesdouyin.com": ("douyin", _DOUYIN_SHARE_RULES),
+    "iesdouyin.com": ("douyin", _DOUYIN_SHARE_RULES),
+    "live.douyin.com": ("douyin", _DOUYIN_LIVE_RULES),
+    "webcast.amemv.com": ("douyin", _DOUYIN_WEBCAST_RULES),
+    "www.tiktok.com": ("tiktok", _TIKTOK_WEB_RULES),
+    "tiktok.com": ("tiktok", _TIKTOK_WEB_RULES),
+    "m.tiktok.com": ("tiktok", _TIKTOK_WEB_RULES),
+    "www.bilibili.com": ("bilibili", _BILIBILI_WEB_RULES),
+    "bilibili.com": ("bilibili", _BILIBILI_WEB_RULES),
+    "m.bilibili.com": ("bilibili", _BILIBILI_WEB_RULES),
+}
+
+# 未登记子域名按后缀归属平台 (Unlisted subdomains are attributed to a platform by suffix)
+_SUFFIX_TABLE = (
+    (".douyin.com", "douyin"),
+    (".iesdouyin.com", "douyin"),
+    (".tiktok.com", "tiktok"),
+    (".bilibili.com", "bilibili"),
+)
+
+
+def route_url(url: str) -> Optional[RoutedURL]:
+    """
+    根据主机名判断平台与链接类型，并尽可能在本地提取ID (Classify platform and link kind by hostname and extract the id locally)
+
+    规范链接（作品/图文/用户/直播/BV号）无需任何网络请求；只有短链返回 kind="short"，需要调用方通过重定向解析。
+    (Canonical links need no network access; only short links return kind="short" and must be resolved by the caller.)
+
+    Args:
+        url (str): 输入的URL或包含URL的分享文本 (URL or share text containing a URL)
+
+    Returns:
+        RoutedURL | None: 路由结果，无法识别的平台返回 None (Routing result, None for unsupported platforms)
+    """
+    if not isinstance(url, str):
+        return None
+    match = _URL_PATTERN.search(url)
+    if match is None:
+        return None
+    url = match.group(0)
+    try:
+        parts = urlsplit(url)
+        host = (parts.hostname or "").rstrip(".")
+    except ValueError:
+        return None
+
+    if host in _SHORT_HOSTS:
+        return RoutedURL(_SHORT_HOSTS[host], KIND_SHORT, None, url)
+
+    entry = _HOST_TABLE.get(host)
+    if entry is None:
+        for suffix, platform in _SUFFIX_TABLE:
+            if host.endswith(suffix):
+                return RoutedURL(platform, KIND_PAGE, None, url)
+        return None
+
+    platform, rules = entry
+    for kind, pattern, target in rules:
+        match = pattern.search(parts.path if target == "path" else parts.query)
+        if match:
+            # 无捕获组的规则（如短链）不提供ID/Rules without a capture group (e.g. short links) carry no id
+            return RoutedURL(platform, kind, match.group(1) if pattern.groups else None, url)
+    return RoutedURL(platform, KIND_PAGE, None, url)
@@ -0,0 +1,120 @@
+import os
+import sys
+import asyncio
+import socket
+
+import httpx
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.api.endpoints import download
+from app.download import atomic
+
+API_KEY = {"X-API-Key": "1234567890"}
+DOUYIN_URL = "/api/download?url=https://www.douyin.com/video/7372484719365098803&prefix=false"
+DOUYIN_VIDEO = {
+    "type": "video",
+    "platform": "douyin",
+    "video_id": "7372484719365098803",
+    "video_data": {"nwm_video_url_HQ": "https://v1.douyinvod.com/v.mp4", "wm_video_url_HQ": None},
+}
+
+
+class ConnectedRequest:
+    """始终保持连接的请求替身 (Request stand-in that never disconnects)"""
+
+    async def is_disconnected(self):
+        return False
+
+
+async def disconnect_before_body(response, timeout: float = 5):
+    """
+    以客户端在响应体开始前断开的方式调用响应：http.disconnect 立即到达，发送响应头时阻塞
+    (Run a response as if the client went away before the body started: http.disconnect arrives at once
+    while sending the response start blocks)
+    """
+
+    async def receive():
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        await asyncio.sleep(timeout * 2)
+
+    await asyncio.wait_for(response({"type": "http"}, receive, send), timeout)
+
+
+@pytest.fixture
+def public_dns(monkeypatch):
+    """所有主机名解析到公网地址，使严格校验通过 (Resolve every host to a public address so strict validation passes)"""
+    monkeypatch.setattr(
+        socket, "getaddrinfo", lambda host, *a, **k: [(socket.AF_INET, socket.SOCK_STREAM, 6, "", ("93.184.216.34", 0))]
+    )
+
+
+@pytest.fixture
+def upstream(monkeypatch, public_dns):
+    """
+    返回安装函数：upstream(handler) 以 MockTransport 替换下载客户端
+    (Returns an installer: upstream(handler) swaps the download client for a MockTransport)
+    """
+
+    def install(handler) -> httpx.MockTransport:
+        transport = httpx.MockTransport(handler)
+        monkeypatch.setattr(
+            download, "_download_client", lambda sec, **kw: httpx.AsyncClient(transport=transport, follow_redirects=False)
+        )
+        return transport
+
+    return install
+
+
+@pytest.fixture
+def download_root(monkeypatch, tmp_path):
+    """下载根目录指向 tmp_path (Point Download_Path at tmp_path)"""
+    monkeypatch.setitem(download.config["API"], "Download_Path", str(tmp_path))
+    return tmp_path
+
+
+@pytest.fixture
+def parsed_post(monkeypatch):
+    """
+    返回安装函数：parsed_post(data, headers) 替换解析结果与各平台下载请求头，默认为抖音视频
+    (Returns an installer: parsed_post(data, headers) fakes the parse result and the platform download headers,
+    a Douyin video by default)
+    """
+
+    def install(data: dict = DOUYIN_VIDEO, headers: dict | None = None):
+        platform_headers = {"headers": headers or {"User-Agent": "test"}}
+
+        async def parse(url, minimal=True):
+            return data
+
+        async def get_headers():
+            return platform_headers
+
+        monkeypatch.setattr(download.HybridCrawler, "hybrid_parsing_single_video", parse)
+        monkeypatch.setattr(download.HybridCrawler.DouyinWebCrawler, "get_douyin_headers", get_headers)
+        monkeypatch.setattr(download.HybridCrawler.TikTokWebCrawler, "get_tiktok_headers", get_headers)
+        monkeypatch.setattr(download.HybridCrawler.BilibiliWebCrawler, "get_bilibili_headers", get_headers)
+
+    return install
+
+
+@pytest.fixture
+def published(download_root):
+    """
+    返回发布函数：published(body) 将内容发布为抖音示例视频的缓存文件并返回其路径
+    (Returns a publisher: published(body) publishes the body as the Douyin sample video's cache file)
+    """
+
+    def publish(body: bytes):
+        target = download_root / "douyin_video" / "douyin_7372484719365098803.mp4"
+        target.parent.mkdir(parents=True, exist_ok=True)
+        part = atomic.temp_path(str(target))
+        with open(part, "wb") as f:
+            f.write(body)
+        atomic.publish(part, str(target), len(body))
+        return target
+
+    return publish
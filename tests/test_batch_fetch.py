@@ -0,0 +1,61 @@
+import os
+import sys
+import asyncio
+
+import httpx
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from crawlers.douyin.web.utils import AwemeIdFetcher
+from crawlers.utils.batch import bounded_map
+
+
+def test_bounded_map_limits_concurrency_and_keeps_order():
+    running = peak = 0
+
+    async def work(n):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        # 倒序完成，结果仍按输入顺序
+        await asyncio.sleep(0.001 * (20 - n))
+        running -= 1
+        if n % 5 == 0:
+            raise ValueError(f"bad {n}")
+        return n * 10
+
+    results = asyncio.run(bounded_map(work, range(20), concurrency=3))
+    assert peak == 3
+    assert [r["input"] for r in results] == list(range(20))
+    assert results[1] == {"input": 1, "success": True, "data": 10, "error": None}
+    assert results[5] == {"input": 5, "success": False, "data": None, "error": "bad 5"}
+    assert sum(r["success"] for r in results) == 16
+    assert asyncio.run(bounded_map(work, [])) == []
+
+
+def test_get_all_aweme_id_shares_one_client_and_isolates_failures(monkeypatch):
+    clients, calls = [], []
+
+    def handler(request):
+        calls.append(str(request.url))
+        if request.url.path == "/broken/":
+            return httpx.Response(404)
+        return httpx.Response(302, headers={"location": "https://www.douyin.com/video/7298145681699622182"})
+
+    def factory():
+        clients.append(httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+        return clients[-1]
+
+    monkeypatch.setattr(AwemeIdFetcher, "_client", classmethod(lambda cls: factory()))
+    monkeypatch.setattr("crawlers.douyin.web.utils.is_allowed_douyin_web_url", lambda url: True)
+    urls = [
+        "https://v.douyin.com/iRNBho6u/",
+        "https://www.douyin.com/video/7372484719365098803",
+        "https://v.douyin.com/broken/",
+        "https://v.douyin.com/iRNBho6v/",
+    ]
+    results = asyncio.run(AwemeIdFetcher.get_all_aweme_id(urls))
+    assert len(clients) == 1 and len(calls) == 3
+    assert [r["data"] for r in results] == ["7298145681699622182", "7372484719365098803", None, "7298145681699622182"]
+    assert [r["success"] for r in results] == [True, True, False, True]
+    assert results[2]["input"] == "https://v.douyin.com/broken/"
@@ -0,0 +1,85 @@
+import os
+import sys
+import asyncio
+import hashlib
+import json
+
+import httpx
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from starlette.testclient import TestClient
+
+from app.api.endpoints import download
+from app.download import atomic
+from app.main import app
+
+from conftest import API_KEY, DOUYIN_URL
+
+BODY = os.urandom(200 * 1024)
+
+
+def test_publish_records_size_and_checksum(tmp_path):
+    target = tmp_path / "v.mp4"
+    part = atomic.temp_path(str(target))
+    with open(part, "wb") as f:
+        f.write(BODY)
+
+    atomic.publish(part, str(target), len(BODY))
+    assert target.read_bytes() == BODY
+    assert not os.path.exists(part)
+    meta = json.loads((tmp_path / "v.mp4.meta").read_text())
+    assert meta["size"] == len(BODY)
+    assert meta["sha256"] == hashlib.sha256(BODY).hexdigest()
+    assert atomic.is_complete(str(target))
+
+    # 文件被截断后不再被信任
+    with open(target, "r+b") as f:
+        f.truncate(1000)
+    assert not atomic.is_complete(str(target))
+
+
+def test_publish_rejects_size_mismatch(tmp_path):
+    target = tmp_path / "v.mp4"
+    part = atomic.temp_path(str(target))
+    with open(part, "wb") as f:
+        f.write(BODY[:1000])
+    with pytest.raises(OSError):
+        atomic.publish(part, str(target), len(BODY))
+    assert not target.exists() and not atomic.is_complete(str(target))
+
+
+def test_unmarked_partial_file_is_not_served(upstream, download_root, parsed_post):
+    calls = []
+
+    def handler(request):
+        calls.append(1)
+        return httpx.Response(200, content=BODY, headers={"content-length": str(len(BODY))})
+
+    upstream(handler)
+    parsed_post()
+    target = download_root / "douyin_video" / "douyin_7372484719365098803.mp4"
+    target.parent.mkdir(parents=True)
+    # 崩溃遗留的半截文件，没有完整性标记
+    target.write_bytes(BODY[:1000])
+
+    client = TestClient(app)
+    assert client.get(DOUYIN_URL, headers=API_KEY).content == BODY
+    assert atomic.is_complete(str(target))
+    # 发布后走缓存快速路径，不再访问上游
+    assert client.get(DOUYIN_URL, headers=API_KEY).content == BODY
+    assert len(calls) == 1
+
+
+def test_fetch_data_stream_publishes_only_complete_files(upstream, download_root):
+    def handler(request):
+        return httpx.Response(200, content=BODY[:1000], headers={"content-length": str(len(BODY))})
+
+    upstream(handler)
+    target = download_root / "v.mp4"
+    ok = asyncio.run(
+        download.fetch_data_stream("https://v1.douyinvod.com/v.mp4", "douyin", None, file_path=str(target))
+    )
+    assert ok is False
+    assert list(download_root.iterdir()) == []
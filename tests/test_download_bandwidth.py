@@ -0,0 +1,84 @@
+import os
+import sys
+import asyncio
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from starlette.testclient import TestClient
+
+from app.api.endpoints import download
+from app.download.bandwidth import BandwidthShaper
+from app.main import app
+
+from conftest import API_KEY, DOUYIN_URL
+
+
+def test_rates_are_shared_fairly():
+    shaper = BandwidthShaper(global_rate=1200, client_rate=500)
+    a1, a2 = shaper.open("a"), shaper.open("a")
+    shaper.open("b")
+    # 全局速率在两个客户端间平分后受单客户端上限约束，再在客户端的传输间平分
+    assert shaper.rate_for("a") == 250
+    assert shaper.rate_for("b") == 500
+    shaper.open("c")
+    assert shaper.rate_for("c") == 400
+    a1.close()
+    a2.close()
+    assert shaper.rate_for("b") == 500 and shaper.rate_for("c") == 500
+    assert BandwidthShaper().rate_for("a") == 0
+
+
+def test_unused_share_of_slow_client_is_redistributed():
+    shaper = BandwidthShaper(global_rate=900)
+    for client in ("a", "b", "c"):
+        shaper.open(client)
+    assert shaper.rate_for("a") == shaper.rate_for("c") == 300
+
+    # c 已稳定传输一个统计窗口、从未被限速，实测只读取 100 字节/秒
+    # (c has been sending for a full window without being throttled and only reads 100 B/s)
+    now = time.monotonic()
+    slow = shaper._clients["c"]
+    slow.active_since = now - 10
+    slow.meter.add(500, now)
+    assert shaper.rate_for("c") == 125
+    assert shaper.rate_for("a") == shaper.rate_for("b") == (900 - 125) / 2
+
+    # 被限速说明它能读得更快，恢复等分份额 (Being throttled means it can read faster, so it gets the equal split back)
+    slow.last_throttled = now
+    assert shaper.rate_for("a") == shaper.rate_for("c") == 300
+
+
+def test_transfers_beyond_burst_are_paced():
+    shaper = BandwidthShaper(client_rate=1024 * 1024, burst=64 * 1024)
+
+    async def send(total: int) -> float:
+        transfer = shaper.open("a")
+        start = time.perf_counter()
+        for _ in range(total // 16384):
+            await transfer.pace(16384)
+        transfer.close()
+        return time.perf_counter() - start
+
+    # 小于 burst 的传输不等待
+    assert asyncio.run(send(64 * 1024)) < 0.05
+    # 超出 burst 的 256 KiB 按 1 MiB/s 发送约 0.25 秒
+    assert 0.2 < asyncio.run(send(320 * 1024)) < 1.0
+    stats = shaper.stats()["clients"]["a"]
+    assert stats["completed"] == 2 and stats["bytes_sent"] == 384 * 1024
+    assert stats["throttled_ms"] > 150 and stats["throughput_bps"] > 0
+
+
+def test_download_reports_per_client_throughput(monkeypatch, published, parsed_post):
+    body = os.urandom(128 * 1024)
+    monkeypatch.setattr(download, "bandwidth", BandwidthShaper(client_rate=10 * 1024 * 1024, burst=1024 * 1024))
+    parsed_post()
+    published(body)
+
+    client = TestClient(app)
+    assert client.get(DOUYIN_URL, headers=API_KEY).content == body
+    stats = client.get("/api/download/stats", headers=API_KEY).json()["data"]["bandwidth"]
+    assert stats["client_rate"] == 10 * 1024 * 1024
+    entry = stats["clients"]["testclient"]
+    assert entry["bytes_sent"] == len(body) and entry["active"] == 0
+    assert entry["throttled_ms"] == 0
@@ -0,0 +1,186 @@
+import os
+import sys
+import asyncio
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from starlette.responses import Response
+
+from app.download import atomic, resume
+from app.download.disk_cache import DownloadCache
+
+from conftest import API_KEY
+
+
+def _publish(root, name: str, size: int, age: float = 0) -> str:
+    path = os.path.join(str(root), name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    part = atomic.temp_path(path)
+    with open(part, "wb") as f:
+        f.write(b"x" * size)
+    atomic.publish(part, path, size)
+    if age:
+        stamp = time.time() - age
+        os.utime(path, (stamp, stamp))
+    return path
+
+
+def test_index_is_rebuilt_from_disk_in_lru_order(tmp_path):
+    old = _publish(tmp_path, "douyin_video/old.mp4", 100, age=300)
+    new = _publish(tmp_path, "douyin_video/new.mp4", 100, age=10)
+    # 没有完整性标记的文件与任务状态目录不计入缓存
+    (tmp_path / "douyin_video" / "partial.mp4").write_bytes(b"x" * 50)
+    os.makedirs(tmp_path / ".jobs")
+    (tmp_path / ".jobs" / "a.json").write_text("{}")
+
+    cache = DownloadCache(str(tmp_path), max_bytes=0)
+    asyncio.run(cache.load())
+    stats = cache.stats()
+    assert stats["files"] == 2 and stats["used_bytes"] == 200
+    assert list(cache._index) == [old, new]
+
+
+def test_relative_root_indexes_canonical_paths(monkeypatch, tmp_path):
+    a = _publish(tmp_path, "douyin_video/a.mp4", 100)
+    monkeypatch.chdir(tmp_path)
+    cache = DownloadCache("./")
+    asyncio.run(cache.load())
+    # 发布时登记的是规范化路径，不应与扫描得到的条目重复计数 (Published paths are canonical and must not double count)
+    cache.add(os.path.realpath(a), 100)
+    assert cache.stats()["files"] == 1 and cache.used_bytes == 100
+
+
+def _partial(root, name: str, size: int, age: float = 0) -> str:
+    target = os.path.join(str(root), name)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    with open(resume.partial_path(target), "wb") as f:
+        f.write(b"x" * size)
+    resume.save(target, size, {"length": size * 2, "etag": '"v1"', "last_modified": None})
+    if age:
+        stamp = time.time() - age
+        for path in (resume.partial_path(target), resume.journal_path(target)):
+            os.utime(path, (stamp, stamp))
+    return target
+
+
+def test_startup_sweeps_expired_partials_and_counts_live_ones(tmp_path):
+    live = _partial(tmp_path, "douyin_video/live.mp4", 300, age=60)
+    expired = _partial(tmp_path, "douyin_video/expired.mp4", 300, age=7200)
+    orphan = os.path.join(str(tmp_path), "douyin_video", "orphan.mp4")
+    with open(resume.journal_path(orphan), "w") as f:
+        f.write("{}")
+
+    cache = DownloadCache(str(tmp_path), partial_max_age=3600)
+    asyncio.run(cache.load())
+    assert cache.stats()["files"] == 1 and cache.used_bytes == 300
+    assert os.path.exists(resume.partial_path(live)) and os.path.exists(resume.journal_path(live))
+    assert not os.path.exists(resume.partial_path(expired)) and not os.path.exists(resume.journal_path(expired))
+    assert not os.path.exists(resume.journal_path(orphan))
+
+
+def test_partials_are_evicted_with_their_journal(tmp_path):
+    stale = _partial(tmp_path, "a.mp4", 600, age=300)
+    b = _publish(tmp_path, "b.mp4", 600, age=100)
+
+    async def run():
+        cache = DownloadCache(str(tmp_path), max_bytes=1000)
+        await cache.load()
+        return await cache._evicting
+
+    assert asyncio.run(run()) == 1
+    assert not os.path.exists(resume.partial_path(stale)) and not os.path.exists(resume.journal_path(stale))
+    assert os.path.exists(b)
+
+
+def test_eviction_removes_least_recently_used_files(tmp_path):
+    a = _publish(tmp_path, "a.mp4", 400, age=300)
+    b = _publish(tmp_path, "b.mp4", 400, age=200)
+    c = _publish(tmp_path, "c.mp4", 400, age=100)
+
+    async def run():
+        cache = DownloadCache(str(tmp_path), max_bytes=1300, low_watermark=0.8)
+        await cache.load()
+        cache.hit(a)  # a 最近被访问，b 成为最久未访问
+        d = _publish(tmp_path, "d.mp4", 400)
+        cache.add(d, 400)
+        await cache._evicting
+        return cache, d
+
+    cache, d = asyncio.run(run())
+    assert not os.path.exists(b) and not os.path.exists(atomic.sidecar_path(b))
+    assert not os.path.exists(c)
+    assert os.path.exists(a) and os.path.exists(d)
+    stats = cache.stats()
+    assert stats["used_bytes"] == 800
+    assert stats["evictions"] == 2 and stats["evicted_bytes"] == 800
+    assert stats["hits"] == 1
+
+
+def test_busy_files_are_not_evicted(tmp_path):
+    a = _publish(tmp_path, "a.mp4", 600, age=300)
+    b = _publish(tmp_path, "b.mp4", 600, age=100)
+
+    async def run():
+        cache = DownloadCache(str(tmp_path), max_bytes=1000, is_busy=lambda path: path == a)
+        # 启动时重建索引发现超出预算，立即在后台淘汰 (Over budget at startup, so loading schedules an eviction)
+        await cache.load()
+        return await cache._evicting
+
+    assert asyncio.run(run()) == 1
+    assert os.path.exists(a) and not os.path.exists(b)
+
+
+def test_files_being_served_are_not_evicted(tmp_path):
+    a = _publish(tmp_path, "blobs/aa/a", 600, age=300)
+    b = _publish(tmp_path, "blobs/bb/b", 600, age=100)
+    cache = DownloadCache(str(tmp_path))
+    asyncio.run(cache.load())
+    cache.max_bytes = 1000
+    evicted = []
+
+    class Sending(Response):
+        async def __call__(self, scope, receive, send):
+            # 发送过程中触发淘汰 (Eviction runs while the file is being sent)
+            evicted.append(await cache.evict())
+
+    asyncio.run(cache.hold(a, Sending())({"type": "http"}, None, None))
+    assert evicted == [1]
+    assert os.path.exists(a) and not os.path.exists(b)
+    assert cache._in_use == {}
+
+
+def test_hit_rate():
+    cache = DownloadCache("/nonexistent", enabled=False)
+    cache.hit("/nonexistent/a.mp4")
+    cache.miss()
+    cache.miss()
+    cache.hit("/nonexistent/a.mp4")
+    assert cache.stats()["hit_rate"] == 0.5
+
+
+def test_download_stats_reports_cache(monkeypatch, tmp_path):
+    from starlette.testclient import TestClient
+
+    from app.api.endpoints import download
+    from app.main import app
+
+    monkeypatch.setattr(download, "download_cache", DownloadCache(str(tmp_path), max_bytes=1000))
+    resp = TestClient(app).get("/api/download/stats", headers=API_KEY)
+    cache = resp.json()["data"]["cache"]
+    assert cache["max_bytes"] == 1000 and cache["used_bytes"] == 0
+
+
+def test_index_is_rebuilt_at_app_startup(monkeypatch, tmp_path):
+    from starlette.testclient import TestClient
+
+    from app.api.endpoints import download
+    from app.download.jobs import DownloadJobManager
+    from app.main import app
+
+    _publish(tmp_path, "douyin_video/a.mp4", 100)
+    monkeypatch.setattr(download, "download_cache", DownloadCache(str(tmp_path)))
+    monkeypatch.setattr(download, "job_manager", DownloadJobManager(download._run_download_job, str(tmp_path / ".jobs")))
+    with TestClient(app) as client:
+        cache = client.get("/api/download/stats", headers=API_KEY).json()["data"]["cache"]
+    assert cache["files"] == 1 and cache["used_bytes"] == 100
@@ -0,0 +1,97 @@
+import os
+import sys
+import hashlib
+
+import httpx
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from starlette.testclient import TestClient
+
+from app.api.endpoints import download
+from app.main import app
+
+from conftest import API_KEY, DOUYIN_URL
+
+BODY = os.urandom(300 * 1024)
+ETAG = f'"{hashlib.sha256(BODY).hexdigest()}"'
+
+
+@pytest.fixture
+def cached(upstream, published, parsed_post):
+    """预先发布缓存文件，请求直接命中缓存；返回上游请求记录"""
+    calls = []
+
+    def handler(request):
+        calls.append(1)
+        return httpx.Response(200, content=BODY, headers={"content-length": str(len(BODY))})
+
+    upstream(handler)
+    parsed_post()
+    published(BODY)
+    return calls
+
+
+def test_cache_hit_has_strong_validators(cached):
+    resp = TestClient(app).get(DOUYIN_URL, headers=API_KEY)
+    assert resp.status_code == 200 and resp.content == BODY
+    assert resp.headers["etag"] == ETAG
+    assert resp.headers["accept-ranges"] == "bytes"
+    assert "last-modified" in resp.headers
+    assert cached == []
+
+
+def test_range_request_returns_partial_content(cached):
+    client = TestClient(app)
+
+    resp = client.get(DOUYIN_URL, headers={**API_KEY, "Range": "bytes=1000-1999"})
+    assert resp.status_code == 206
+    assert resp.content == BODY[1000:2000]
+    assert resp.headers["content-range"] == f"bytes 1000-1999/{len(BODY)}"
+    assert resp.headers["content-length"] == "1000"
+
+    tail = client.get(DOUYIN_URL, headers={**API_KEY, "Range": "bytes=-500"})
+    assert tail.status_code == 206 and tail.content == BODY[-500:]
+
+    open_ended = client.get(DOUYIN_URL, headers={**API_KEY, "Range": f"bytes={len(BODY) - 10}-"})
+    assert open_ended.content == BODY[-10:]
+
+
+def test_unsatisfiable_range(cached):
+    resp = TestClient(app).get(DOUYIN_URL, headers={**API_KEY, "Range": f"bytes={len(BODY)}-"})
+    assert resp.status_code == 416
+    assert resp.headers["content-range"] == f"bytes */{len(BODY)}"
+
+
+def test_if_range_mismatch_returns_full_file(cached):
+    client = TestClient(app)
+    stale = client.get(DOUYIN_URL, headers={**API_KEY, "Range": "bytes=0-9", "If-Range": '"other"'})
+    assert stale.status_code == 200 and stale.content == BODY
+
+    fresh = client.get(DOUYIN_URL, headers={**API_KEY, "Range": "bytes=0-9", "If-Range": ETAG})
+    assert fresh.status_code == 206 and fresh.content == BODY[:10]
+
+
+def test_conditional_requests_return_not_modified(cached):
+    client = TestClient(app)
+    first = client.get(DOUYIN_URL, headers=API_KEY)
+
+    resp = client.get(DOUYIN_URL, headers={**API_KEY, "If-None-Match": f'W/"x", {ETAG}'})
+    assert resp.status_code == 304 and resp.content == b""
+    assert resp.headers["etag"] == ETAG
+
+    resp = client.get(DOUYIN_URL, headers={**API_KEY, "If-Modified-Since": first.headers["last-modified"]})
+    assert resp.status_code == 304
+
+    # If-None-Match 优先于 If-Modified-Since
+    resp = client.get(
+        DOUYIN_URL, headers={**API_KEY, "If-None-Match": '"other"', "If-Modified-Since": first.headers["last-modified"]}
+    )
+    assert resp.status_code == 200 and resp.content == BODY
+
+
+def test_range_on_cache_hit_releases_single_flight(cached):
+    resp = TestClient(app).get(DOUYIN_URL, headers={**API_KEY, "Range": "bytes=0-99"})
+    assert resp.status_code == 206
+    assert len(download.single_flight) == 0
@@ -0,0 +1,113 @@
+import os
+import sys
+import stat
+import asyncio
+
+import httpx
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from starlette.testclient import TestClient
+
+from app.api.endpoints import download
+from app.main import app
+
+from conftest import API_KEY, disconnect_before_body
+
+VIDEO = os.urandom(200 * 1024)
+AUDIO = os.urandom(90 * 1024)
+URL = "/api/download?url=https://www.bilibili.com/video/BV1fmp4test01&prefix=false"
+BILIBILI_VIDEO = {
+    "type": "video",
+    "platform": "bilibili",
+    "video_id": "BV1fmp4test01",
+    "video_data": {
+        "nwm_video_url_HQ": "https://upos-sz.bilivideo.com/video.m4s",
+        "audio_url": "https://upos-sz.bilivideo.com/audio.m4s",
+    },
+}
+
+# 用 Python 脚本代替 ffmpeg：读取两个 pipe:N 输入，输出参数行 + 视频 + 音频
+# (A Python script stands in for ffmpeg: reads both pipe:N inputs, writes the argv line + video + audio)
+FAKE_FFMPEG = """#!{python}
+import os, sys
+args = sys.argv[1:]
+fds = [int(args[i + 1].split(":")[1]) for i, a in enumerate(args) if a == "-i"]
+out = sys.stdout.buffer
+out.write((" ".join(args) + "\\n").encode())
+for fd in fds:
+    with os.fdopen(fd, "rb") as f:
+        while True:
+            chunk = f.read(65536)
+            if not chunk:
+                break
+            out.write(chunk)
+out.flush()
+sys.exit({code})
+"""
+
+
+@pytest.fixture
+def fmp4(monkeypatch, tmp_path, upstream, download_root, parsed_post):
+    def install(exit_code=0):
+        upstream(lambda request: httpx.Response(200, content=VIDEO if request.url.path.endswith("video.m4s") else AUDIO))
+        monkeypatch.setitem(download.config["API"], "Bilibili_Progressive_Merge", True)
+        script = tmp_path / "fake_ffmpeg"
+        script.write_text(FAKE_FFMPEG.format(python=sys.executable, code=exit_code))
+        script.chmod(script.stat().st_mode | stat.S_IEXEC)
+        monkeypatch.setattr(download.ffmpeg_pool, "binary", str(script))
+        parsed_post(BILIBILI_VIDEO)
+
+    return install
+
+
+def test_progressive_merge_streams_fragmented_mp4_and_caches(fmp4, tmp_path):
+    fmp4()
+    completed = download.ffmpeg_pool.stats()["completed"]
+
+    resp = TestClient(app).get(URL, headers=API_KEY)
+    assert resp.status_code == 200
+    assert resp.headers["content-type"] == "video/mp4"
+    argv, _, payload = resp.content.partition(b"\n")
+    assert b"frag_keyframe+empty_moov" in argv and b"-c copy" in argv
+    assert payload == VIDEO + AUDIO
+
+    cached = tmp_path / "bilibili_video" / "bilibili_BV1fmp4test01.mp4"
+    assert cached.read_bytes() == resp.content
+    assert not [p for p in cached.parent.iterdir() if p.name.endswith(".part")]
+    assert download.ffmpeg_pool.stats()["completed"] == completed + 1
+    assert download.ffmpeg_pool.running == 0
+
+
+def test_failed_merge_is_not_published(fmp4, tmp_path):
+    fmp4(exit_code=1)
+    failed = download.ffmpeg_pool.stats()["failed"]
+
+    try:
+        TestClient(app).get(URL, headers=API_KEY)
+    except RuntimeError:
+        pass
+
+    folder = tmp_path / "bilibili_video"
+    assert list(folder.iterdir()) == []
+    assert download.ffmpeg_pool.stats()["failed"] == failed + 1
+    assert download.ffmpeg_pool.running == 0
+
+
+def test_disconnect_before_body_releases_ffmpeg_slot(fmp4, tmp_path):
+    fmp4()
+    target = tmp_path / "bilibili_video" / "a.mp4"
+    target.parent.mkdir(parents=True)
+
+    async def run():
+        data = BILIBILI_VIDEO["video_data"]
+        response = await download.stream_bilibili_fmp4(
+            data["nwm_video_url_HQ"], data["audio_url"], str(target), "a.mp4", {"User-Agent": "test"}
+        )
+        assert download.ffmpeg_pool.running == 1
+        await disconnect_before_body(response)
+        return download.ffmpeg_pool.running
+
+    assert asyncio.run(run()) == 0
+    assert list(target.parent.iterdir()) == []
@@ -0,0 +1,120 @@
+import io
+import os
+import sys
+import asyncio
+import zipfile
+
+import httpx
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from starlette.testclient import TestClient
+
+from app.api.endpoints import download
+from app.main import app
+
+from conftest import API_KEY, disconnect_before_body
+
+IMAGES = [os.urandom(50_000 + i) for i in range(10)]
+ALBUM = {
+    "type": "image",
+    "platform": "douyin",
+    "video_id": "7372484719365098803",
+    "image_data": {
+        "no_watermark_image_list": [f"https://p3.douyinpic.com/img/{i}.webp" for i in range(len(IMAGES))],
+        "watermark_image_list": [],
+    },
+}
+
+
+@pytest.fixture
+def album(monkeypatch, upstream, download_root, parsed_post):
+    def install(handler, concurrency=3):
+        upstream(handler)
+        monkeypatch.setitem(download.config["API"], "Download_Image_Concurrency", concurrency)
+        monkeypatch.setitem(download.config["API"], "Download_Cache_Images", True)
+        parsed_post(ALBUM)
+
+    return install
+
+
+def test_album_is_fetched_concurrently_and_streamed_as_stored_zip(album, tmp_path):
+    state = {"inflight": 0, "peak": 0}
+
+    async def handler(request):
+        state["inflight"] += 1
+        state["peak"] = max(state["peak"], state["inflight"])
+        index = int(request.url.path.rsplit("/", 1)[1].split(".")[0])
+        # 倒序完成，验证条目按完成顺序写入且命名正确
+        await asyncio.sleep(0.002 * (len(IMAGES) - index))
+        state["inflight"] -= 1
+        return httpx.Response(200, content=IMAGES[index], headers={"content-type": "image/webp"})
+
+    album(handler)
+    client = TestClient(app)
+    resp = client.get(
+        "/api/download?url=https://www.douyin.com/note/7372484719365098803&prefix=false", headers=API_KEY
+    )
+    assert resp.status_code == 200
+    assert resp.headers["content-type"] == "application/zip"
+
+    with zipfile.ZipFile(io.BytesIO(resp.content)) as zf:
+        infos = zf.infolist()
+        assert len(infos) == len(IMAGES)
+        assert all(info.compress_type == zipfile.ZIP_STORED for info in infos)
+        for i, data in enumerate(IMAGES):
+            assert zf.read(f"douyin_7372484719365098803_{i + 1}.webp") == data
+
+    assert 1 < state["peak"] <= 3
+    cached = tmp_path / "douyin_image" / "douyin_7372484719365098803_images.zip"
+    assert cached.read_bytes() == resp.content
+    # 不再逐张写入单独的图片文件
+    assert sorted(p.name for p in cached.parent.iterdir()) == [cached.name, cached.name + ".meta"]
+
+
+def test_album_first_image_error_is_reported(album, tmp_path):
+    def handler(request):
+        return httpx.Response(200, content=b"<html>", headers={"content-type": "text/html"})
+
+    album(handler)
+    client = TestClient(app)
+    resp = client.get(
+        "/api/download?url=https://www.douyin.com/note/7372484719365098803&prefix=false", headers=API_KEY
+    )
+    assert resp.json()["code"] == 400
+    assert not (tmp_path / "douyin_image" / "douyin_7372484719365098803_images.zip").exists()
+
+
+def test_disconnect_before_body_cancels_image_fetches(album, tmp_path):
+    cancelled = []
+
+    async def handler(request):
+        index = int(request.url.path.rsplit("/", 1)[1].split(".")[0])
+        if index:
+            try:
+                await asyncio.sleep(30)
+            except asyncio.CancelledError:
+                cancelled.append(index)
+                raise
+        return httpx.Response(200, content=IMAGES[index], headers={"content-type": "image/webp"})
+
+    album(handler)
+    target = tmp_path / "douyin_image" / "a.zip"
+    target.parent.mkdir(parents=True)
+
+    async def run():
+        response = await download.stream_image_zip(
+            [f"https://p3.douyinpic.com/img/{i}.webp" for i in range(len(IMAGES))],
+            "douyin",
+            lambda index, ext: f"{index}.{ext}",
+            str(target),
+            "a.zip",
+        )
+        await disconnect_before_body(response)
+        # 响应结束时仍在下载的图片已被取消，而非留到事件循环关闭 (Cancelled by the response, not by loop shutdown)
+        return list(cancelled)
+
+    cancelled_on_close = asyncio.run(run())
+    assert cancelled_on_close and 0 not in cancelled_on_close
+    assert list(target.parent.iterdir()) == []
@@ -0,0 +1,193 @@
+import os
+import sys
+import json
+import time
+import threading
+import asyncio
+
+import httpx
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from starlette.testclient import TestClient
+
+from app.api.endpoints import download
+from app.download.jobs import DownloadJob, DownloadJobManager, JobQueueFullError
+from app.main import app
+
+from conftest import API_KEY
+
+BODY = os.urandom(200 * 1024)
+
+
+@pytest.fixture
+def jobs(monkeypatch, tmp_path, upstream, parsed_post):
+    upstream(lambda request: httpx.Response(200, content=BODY, headers={"content-length": str(len(BODY))}))
+    monkeypatch.setitem(download.config["API"], "Download_Path", str(tmp_path / "files"))
+    monkeypatch.setattr(download, "job_manager", DownloadJobManager(download._run_download_job, str(tmp_path / "jobs")))
+    parsed_post()
+
+
+def test_job_runs_in_background_and_serves_file(jobs, tmp_path):
+    with TestClient(app) as client:
+        resp = client.post(
+            "/api/download/jobs?url=https://www.douyin.com/video/7372484719365098803&prefix=false", headers=API_KEY
+        )
+        assert resp.status_code == 200
+        job = resp.json()["data"]
+        assert "file_path" not in job
+
+        # 未完成时获取文件返回 409（任务可能已完成，二者皆可）
+        early = client.get(f"/api/download/jobs/{job['id']}/file", headers=API_KEY)
+        assert early.status_code in (200, 409)
+
+        for _ in range(20):
+            job = client.get(
+                f"/api/download/jobs/{job['id']}?wait=5&version={job['version']}", headers=API_KEY
+            ).json()["data"]
+            if job["status"] in ("done", "failed"):
+                break
+        assert job["status"] == "done", job
+        assert job["bytes_done"] == job["bytes_total"] == len(BODY)
+
+        resp = client.get(f"/api/download/jobs/{job['id']}/file", headers=API_KEY)
+        assert resp.status_code == 200
+        assert resp.content == BODY
+
+    # 任务状态已持久化
+    with open(tmp_path / "jobs" / f"{job['id']}.json", encoding="utf-8") as f:
+        assert json.load(f)["status"] == "done"
+
+
+def test_unknown_job_and_invalid_id_return_404(jobs):
+    client = TestClient(app)
+    assert client.get(f"/api/download/jobs/{'0' * 32}", headers=API_KEY).status_code == 404
+    assert client.get("/api/download/jobs/..%2F..%2Fetc", headers=API_KEY).status_code == 404
+
+
+def test_queue_is_bounded(tmp_path):
+    release = asyncio.Event()
+
+    async def runner(job):
+        await release.wait()
+
+    async def run(state_dir):
+        manager = DownloadJobManager(runner, state_dir, workers=1, max_queue=1)
+        manager.submit("https://www.douyin.com/video/1")
+        await asyncio.sleep(0)  # 工作协程取走第一个任务
+        manager.submit("https://www.douyin.com/video/2")
+        with pytest.raises(JobQueueFullError):
+            manager.submit("https://www.douyin.com/video/3")
+        release.set()
+
+    asyncio.run(run(str(tmp_path)))
+
+
+def test_unfinished_jobs_resume_after_restart(tmp_path):
+    interrupted = DownloadJob("https://www.douyin.com/video/1")
+    interrupted.status = interrupted.stage = "running"
+    interrupted.bytes_done = 123
+    (tmp_path / f"{interrupted.id}.json").write_text(json.dumps(interrupted.to_dict()))
+    ran = []
+
+    async def runner(job):
+        ran.append(job.id)
+        job.add_progress(10, 10)
+
+    async def run():
+        manager = DownloadJobManager(runner, str(tmp_path))
+        job = manager.get(interrupted.id)
+        while not job.finished:
+            await job.wait_for_change(job.version, 1)
+        return job
+
+    job = asyncio.run(run())
+    assert ran == [interrupted.id]
+    assert job.status == "done" and job.bytes_done == 10
+
+
+def test_long_poll_wakes_on_progress():
+    async def run():
+        job = DownloadJob("https://www.douyin.com/video/1")
+        asyncio.get_running_loop().call_later(0.05, job.add_progress, 1)
+        start = asyncio.get_running_loop().time()
+        await job.wait_for_change(job.version, 5)
+        return asyncio.get_running_loop().time() - start, job.bytes_done
+
+    elapsed, done = asyncio.run(run())
+    assert done == 1 and elapsed < 1
+
+
+def test_app_startup_resumes_unfinished_jobs(jobs, tmp_path):
+    interrupted = DownloadJob("https://www.douyin.com/video/7372484719365098803", prefix=False)
+    interrupted.status = interrupted.stage = "running"
+    state_dir = tmp_path / "jobs"
+    state_dir.mkdir()
+    (state_dir / f"{interrupted.id}.json").write_text(json.dumps(interrupted.to_dict()))
+
+    # 仅启动应用、不发起任何任务请求 (Only start the app, no job requests)
+    with TestClient(app):
+        job = download.job_manager.jobs[interrupted.id]
+        for _ in range(100):
+            if job.finished:
+                break
+            time.sleep(0.05)
+        assert job.status == "done", job.to_dict()
+
+
+def test_expired_jobs_are_pruned_while_running(tmp_path):
+    async def runner(job):
+        pass
+
+    async def run():
+        manager = DownloadJobManager(runner, str(tmp_path), retention=60)
+        first = manager.submit("https://www.douyin.com/video/1")
+        while not first.finished:
+            await first.wait_for_change(first.version, 1)
+        await manager.flush()
+        assert first.id in manager.jobs and (tmp_path / f"{first.id}.json").exists()
+
+        first.finished_at -= 120
+        second = manager.submit("https://www.douyin.com/video/2")
+        await manager.flush()
+        return first, second, manager
+
+    first, second, manager = asyncio.run(run())
+    assert first.id not in manager.jobs
+    assert not (tmp_path / f"{first.id}.json").exists()
+    assert second.id in manager.jobs
+
+
+def test_state_is_written_off_the_event_loop_in_order(monkeypatch, tmp_path):
+    from app.download import atomic
+
+    loop_thread = threading.get_ident()
+    writes = []
+    write_json_atomic = atomic.write_json_atomic
+
+    def record(path, data):
+        writes.append((threading.get_ident(), data["stage"]))
+        time.sleep(0.02)
+        write_json_atomic(path, data)
+
+    monkeypatch.setattr(atomic, "write_json_atomic", record)
+
+    async def runner(job):
+        for stage in ("a", "b", "c"):
+            job.set_stage(stage)
+
+    async def run():
+        manager = DownloadJobManager(runner, str(tmp_path))
+        job = manager.submit("https://www.douyin.com/video/1")
+        while not job.finished:
+            await job.wait_for_change(job.version, 1)
+        await manager.flush()
+        return job
+
+    job = asyncio.run(run())
+    assert writes and all(ident != loop_thread for ident, _ in writes)
+    # 排队期间只保留最新快照，最终落盘的是完成状态 (Only the latest snapshot is kept; the final state wins)
+    assert writes[-1][1] == "done"
+    with open(tmp_path / f"{job.id}.json", encoding="utf-8") as f:
+        assert json.load(f)["status"] == "done"
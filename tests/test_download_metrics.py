@@ -0,0 +1,59 @@
+import os
+import sys
+
+import httpx
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from starlette.testclient import TestClient
+
+from app.api.endpoints import download
+from app.download.metrics import DownloadMetrics, Histogram
+from app.main import app
+
+from conftest import API_KEY, DOUYIN_URL
+
+BODY = os.urandom(96 * 1024)
+
+
+def test_histogram_renders_cumulative_buckets():
+    hist = Histogram("t_seconds", "test", buckets=(0.1, 1))
+    hist.observe(0.05, platform="douyin")
+    hist.observe(0.5, platform="douyin")
+    hist.observe(5, platform="douyin")
+    lines = hist.render()
+    assert 't_seconds_bucket{platform="douyin",le="0.1"} 1' in lines
+    assert 't_seconds_bucket{platform="douyin",le="1"} 2' in lines
+    assert 't_seconds_bucket{platform="douyin",le="+Inf"} 3' in lines
+    assert 't_seconds_sum{platform="douyin"} 5.55' in lines
+    assert 't_seconds_count{platform="douyin"} 3' in lines
+    assert hist.count(platform="douyin") == 3 and hist.count(platform="tiktok") == 0
+
+
+def test_download_populates_metrics(monkeypatch, upstream, download_root, parsed_post):
+    metrics = DownloadMetrics()
+    monkeypatch.setattr(download, "download_metrics", metrics)
+    upstream(lambda request: httpx.Response(200, content=BODY, headers={"content-length": str(len(BODY))}))
+    parsed_post()
+
+    client = TestClient(app)
+    # 第一次从上游获取，第二次命中缓存
+    assert client.get(DOUYIN_URL, headers=API_KEY).content == BODY
+    assert client.get(DOUYIN_URL, headers=API_KEY).content == BODY
+
+    labels = {"platform": "douyin", "media_type": "video"}
+    assert metrics.cache.value(result="miss", **labels) == 1
+    assert metrics.cache.value(result="hit", **labels) == 1
+    assert metrics.fetched.value(**labels) == len(BODY)
+    assert metrics.served.value(**labels) == 2 * len(BODY)
+    assert metrics.resolve.count(**labels) == 2
+    assert metrics.headers.count(**labels) == 1
+    assert metrics.ttfb.count(**labels) == 1
+    assert metrics.throughput.count(**labels) == 1
+    assert metrics.request.count(source="proxy", **labels) == 2
+
+    resp = client.get("/api/download/metrics", headers=API_KEY)
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/plain")
+    assert "# TYPE download_upstream_ttfb_seconds histogram" in resp.text
+    assert 'download_bytes_fetched_total{media_type="video",platform="douyin"} %d' % len(BODY) in resp.text
@@ -0,0 +1,66 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from starlette.testclient import TestClient
+
+from app.api.endpoints import download
+from app.download.offload import offload_response
+from app.main import app
+
+from conftest import API_KEY, DOUYIN_URL
+
+BODY = os.urandom(64 * 1024)
+
+
+@pytest.fixture
+def offloaded(monkeypatch, published, parsed_post):
+    def install(offload: dict):
+        monkeypatch.setitem(download.config["API"], "Download_Offload", offload)
+        parsed_post()
+        return published(BODY)
+
+    return install
+
+
+def test_x_accel_redirect_on_cache_hit(offloaded):
+    offloaded({"Mode": "x-accel", "Internal_Prefix": "/protected"})
+    resp = TestClient(app).get(DOUYIN_URL, headers=API_KEY)
+    assert resp.status_code == 200
+    assert resp.content == b""
+    assert resp.headers["x-accel-redirect"] == "/protected/douyin_video/douyin_7372484719365098803.mp4"
+    assert resp.headers["content-type"] == "video/mp4"
+    assert 'filename="douyin_7372484719365098803.mp4"' in resp.headers["content-disposition"]
+
+
+def test_x_sendfile_on_cache_hit(offloaded):
+    target = offloaded({"Mode": "x-sendfile"})
+    resp = TestClient(app).get(DOUYIN_URL, headers=API_KEY)
+    assert resp.content == b""
+    assert resp.headers["x-sendfile"] == os.path.realpath(target)
+
+
+def test_offload_disabled_serves_file(offloaded):
+    offloaded({"Mode": "none"})
+    resp = TestClient(app).get(DOUYIN_URL, headers=API_KEY)
+    assert resp.content == BODY
+    assert "x-accel-redirect" not in resp.headers
+
+
+def test_offload_only_covers_download_root(tmp_path):
+    root = tmp_path / "root"
+    root.mkdir()
+    outside = tmp_path / "other.mp4"
+    outside.write_bytes(b"x")
+    cfg = {"Mode": "x-accel"}
+    assert offload_response(cfg, str(root), str(outside), "a.mp4", "video/mp4") is None
+    # 路径中的特殊字符需要编码
+    inside = root / "a b#.mp4"
+    inside.write_bytes(b"x")
+    resp = offload_response(cfg, str(root), str(inside), "a.mp4", "video/mp4")
+    assert resp.headers["x-accel-redirect"] == "/_downloads/a%20b%23.mp4"
+    with pytest.raises(ValueError):
+        offload_response({"Mode": "bogus"}, str(root), str(inside), "a.mp4", "video/mp4")
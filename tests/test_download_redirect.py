@@ -0,0 +1,78 @@
+import os
+import sys
+import time
+
+import httpx
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from starlette.testclient import TestClient
+
+from app.api.endpoints import download
+from app.main import app
+
+from conftest import API_KEY, DOUYIN_URL, DOUYIN_VIDEO
+
+BODY = os.urandom(32 * 1024)
+EXPIRES = int(time.time()) + 3600
+FINAL = f"https://v2.douyinvod.com/final.mp4?x-expires={EXPIRES}&sig=abc"
+
+
+@pytest.fixture
+def origin(monkeypatch, upstream, download_root, parsed_post):
+    def install(head_status=200, platforms=None, final=FINAL):
+        calls = []
+
+        def handler(request):
+            calls.append((request.method, request.url.host, dict(request.headers)))
+            if request.url.host == "v1.douyinvod.com":
+                return httpx.Response(302, headers={"location": final})
+            if request.url.host == "v2.douyinvod.com":
+                if request.method == "HEAD":
+                    return httpx.Response(head_status, headers={"content-length": str(len(BODY))})
+                return httpx.Response(200, content=BODY, headers={"content-length": str(len(BODY))})
+            return httpx.Response(404)
+
+        upstream(handler)
+        monkeypatch.setitem(download.config["API"], "Download_Redirect", {"Platforms": platforms or []})
+        video = {**DOUYIN_VIDEO, "video_data": {"nwm_video_url_HQ": "https://v1.douyinvod.com/start.mp4"}}
+        parsed_post(video, headers={"User-Agent": "test", "Cookie": "secret"})
+        return calls
+
+    return install
+
+
+def test_redirects_to_validated_origin_url(origin, tmp_path):
+    calls = origin()
+    resp = TestClient(app).get(DOUYIN_URL + "&redirect=true", headers=API_KEY, follow_redirects=False)
+    assert resp.status_code == 302
+    assert resp.headers["location"] == FINAL
+    assert resp.headers["x-media-expires"] == str(EXPIRES)
+    assert "expires" in resp.headers and "max-age=" in resp.headers["cache-control"]
+    # 只发送 HEAD 探测，不携带本服务的 Cookie，也不下载内容
+    assert [c[0] for c in calls] == ["HEAD", "HEAD"]
+    assert all("cookie" not in c[2] for c in calls)
+    assert not (tmp_path / "douyin_video").exists() or not os.listdir(tmp_path / "douyin_video")
+
+
+def test_falls_back_to_proxy_when_origin_needs_headers(origin):
+    calls = origin(head_status=403)
+    resp = TestClient(app).get(DOUYIN_URL + "&redirect=true", headers=API_KEY, follow_redirects=False)
+    assert resp.status_code == 200 and resp.content == BODY
+    assert ("GET", "v2.douyinvod.com") in [(c[0], c[1]) for c in calls]
+
+
+def test_platform_default_and_request_override(origin):
+    origin(platforms=["douyin"])
+    client = TestClient(app)
+    assert client.get(DOUYIN_URL, headers=API_KEY, follow_redirects=False).status_code == 302
+    resp = client.get(DOUYIN_URL + "&redirect=false", headers=API_KEY, follow_redirects=False)
+    assert resp.status_code == 200 and resp.content == BODY
+
+
+def test_redirect_target_must_pass_allowlist(origin):
+    calls = origin(final="https://evil.example.com/x.mp4")
+    resp = TestClient(app).get(DOUYIN_URL + "&redirect=true", headers=API_KEY, follow_redirects=False)
+    assert resp.status_code != 302
+    assert all(c[1] != "evil.example.com" for c in calls)
@@ -0,0 +1,160 @@
+import os
+import sys
+import asyncio
+
+import httpx
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.api.endpoints import download
+from app.download import atomic, resume
+from app.download.disk_cache import DownloadCache
+
+BODY = os.urandom(512 * 1024)
+ETAG = '"v1"'
+
+
+class _DroppingStream(httpx.AsyncByteStream):
+    """发送 limit 字节后模拟上游连接断开"""
+
+    def __init__(self, data: bytes, limit: int):
+        self.data = data
+        self.limit = limit
+
+    async def __aiter__(self):
+        yield self.data[: self.limit]
+        raise httpx.ReadError("connection reset")
+
+
+class _Disconnecting:
+    """第二次检查时报告客户端已断开"""
+
+    def __init__(self):
+        self.checks = 0
+
+    async def is_disconnected(self):
+        self.checks += 1
+        return self.checks > 1
+
+
+@pytest.fixture
+def resumable(monkeypatch, upstream, download_root):
+    def install(handler, **resume_cfg):
+        upstream(handler)
+        monkeypatch.setitem(download.config["API"], "Download_Segments", {"Enabled": False})
+        monkeypatch.setitem(
+            download.config["API"], "Download_Resume", {"Enabled": True, "Journal_Interval": 65536, **resume_cfg}
+        )
+
+    return install
+
+
+def _range_response(request, body: bytes, etag: str = ETAG):
+    start = int(request.headers["range"][len("bytes=") : -1])
+    return httpx.Response(
+        206,
+        content=body[start:],
+        headers={
+            "content-length": str(len(body) - start),
+            "content-range": f"bytes {start}-{len(body) - 1}/{len(body)}",
+            "etag": etag,
+        },
+    )
+
+
+def _fetch(target, request=None):
+    return asyncio.run(
+        download.fetch_data_stream("https://v1.douyinvod.com/v.mp4", "douyin", request, file_path=str(target))
+    )
+
+
+def test_upstream_drop_resumes_with_range(resumable, tmp_path):
+    seen = []
+
+    def handler(request):
+        seen.append(dict(request.headers))
+        if "range" in request.headers:
+            return _range_response(request, BODY)
+        headers = {"content-length": str(len(BODY)), "etag": ETAG}
+        return httpx.Response(200, stream=_DroppingStream(BODY, 192 * 1024), headers=headers)
+
+    resumable(handler)
+    target = tmp_path / "v.mp4"
+    assert _fetch(target) is True
+    assert target.read_bytes() == BODY and atomic.is_complete(str(target))
+    assert seen[1]["range"] == f"bytes={192 * 1024}-" and seen[1]["if-range"] == ETAG
+    assert sorted(os.listdir(tmp_path)) == ["v.mp4", "v.mp4.meta"]
+
+
+def test_client_disconnect_keeps_partial_for_next_request(resumable, monkeypatch, tmp_path):
+    seen = []
+    cache = DownloadCache(str(tmp_path))
+    monkeypatch.setattr(download, "download_cache", cache)
+
+    def handler(request):
+        seen.append(request.headers.get("range"))
+        if "range" in request.headers:
+            return _range_response(request, BODY)
+        return httpx.Response(200, content=BODY, headers={"content-length": str(len(BODY)), "etag": ETAG})
+
+    resumable(handler)
+    target = tmp_path / "v.mp4"
+    assert _fetch(target, _Disconnecting()) is False
+    assert not target.exists()
+    journal = resume.load(str(target))
+    assert journal["offset"] == os.path.getsize(resume.partial_path(str(target))) > 0
+    # 保留的部分文件计入缓存预算 (The kept partial counts against the cache budget)
+    assert cache.stats()["files"] == 1 and cache.used_bytes == journal["offset"]
+
+    assert _fetch(target) is True
+    assert target.read_bytes() == BODY
+    assert seen == [None, f"bytes={journal['offset']}-"]
+    assert not os.path.exists(resume.journal_path(str(target)))
+    assert cache.stats()["files"] == 1 and cache.used_bytes == len(BODY)
+
+
+def test_changed_validator_falls_back_to_full_download(resumable, tmp_path):
+    new_body = os.urandom(len(BODY))
+
+    def handler(request):
+        # 源站内容已变化：If-Range 不匹配时返回完整的新内容
+        return httpx.Response(200, content=new_body, headers={"content-length": str(len(new_body)), "etag": '"v2"'})
+
+    resumable(handler)
+    target = tmp_path / "v.mp4"
+    with open(resume.partial_path(str(target)), "wb") as f:
+        f.write(BODY[:100000])
+    resume.save(str(target), 100000, {"length": len(BODY), "etag": ETAG, "last_modified": None})
+
+    assert _fetch(target) is True
+    assert target.read_bytes() == new_body
+
+
+def test_rejected_range_restarts_from_scratch(resumable, tmp_path):
+    seen = []
+
+    def handler(request):
+        seen.append(request.headers.get("range"))
+        if "range" in request.headers:
+            return httpx.Response(416, headers={"content-range": f"bytes */{len(BODY)}"})
+        return httpx.Response(200, content=BODY, headers={"content-length": str(len(BODY)), "etag": ETAG})
+
+    resumable(handler)
+    target = tmp_path / "v.mp4"
+    with open(resume.partial_path(str(target)), "wb") as f:
+        f.write(b"x" * 100000)
+    resume.save(str(target), 100000, {"length": len(BODY), "etag": ETAG, "last_modified": None})
+
+    assert _fetch(target) is True
+    assert target.read_bytes() == BODY
+    assert seen == ["bytes=100000-", None]
+
+
+def test_partial_without_validator_is_discarded(resumable, tmp_path):
+    def handler(request):
+        return httpx.Response(200, stream=_DroppingStream(BODY, 1000), headers={"content-length": str(len(BODY))})
+
+    resumable(handler)
+    assert _fetch(tmp_path / "v.mp4") is False
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,143 @@
+import os
+import sys
+import asyncio
+
+import httpx
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.api.endpoints import download
+from app.download.jobs import DownloadJob
+
+from conftest import ConnectedRequest
+
+BODY = os.urandom(1024 * 1024 + 123)
+
+
+def _range_handler(calls, honor_ranges=True):
+    def handler(request):
+        rng = request.headers.get("range")
+        calls.append(rng)
+        headers = {"accept-ranges": "bytes", "etag": '"v1"'}
+        if rng and honor_ranges:
+            start, end = (int(x) for x in rng[len("bytes="):].split("-"))
+            part = BODY[start : end + 1]
+            headers.update({"content-range": f"bytes {start}-{end}/{len(BODY)}", "content-length": str(len(part))})
+            return httpx.Response(206, content=part, headers=headers)
+        headers["content-length"] = str(len(BODY))
+        return httpx.Response(200, content=BODY, headers=headers)
+
+    return handler
+
+
+@pytest.fixture
+def segmented(monkeypatch, upstream):
+    def install(handler, count=4):
+        upstream(handler)
+        monkeypatch.setitem(
+            download.config["API"],
+            "Download_Segments",
+            {"Enabled": True, "Count": count, "Min_Size": 1024, "Min_Segment_Size": 1024},
+        )
+
+    return install
+
+
+def test_segmented_download_reassembles_file(segmented, tmp_path):
+    calls = []
+    segmented(_range_handler(calls))
+    target = tmp_path / "v.mp4"
+    ok = asyncio.run(
+        download.fetch_data_stream("https://v1.douyinvod.com/v.mp4", "douyin", ConnectedRequest(), file_path=str(target))
+    )
+    assert ok is True
+    assert target.read_bytes() == BODY
+    # 首个请求复用为第一段，其余 3 段使用 Range 请求
+    assert calls[0] is None
+    assert sorted(c for c in calls[1:]) == sorted(
+        f"bytes={s}-{e}" for s, e in download._segment_plan(httpx.Response(200, headers={
+            "accept-ranges": "bytes", "content-length": str(len(BODY))}))[1:]
+    )
+
+
+def test_segment_plan_covers_whole_file(monkeypatch):
+    monkeypatch.setitem(
+        download.config["API"], "Download_Segments", {"Count": 3, "Min_Size": 10, "Min_Segment_Size": 10}
+    )
+    plan = download._segment_plan(httpx.Response(200, headers={"accept-ranges": "bytes", "content-length": "100"}))
+    assert plan == [(0, 33), (34, 67), (68, 99)]
+    assert download._segment_plan(httpx.Response(200, headers={"content-length": "100"})) == []
+    assert download._segment_plan(httpx.Response(200, headers={"accept-ranges": "bytes", "content-length": "5"})) == []
+
+
+def test_segmented_download_fails_when_ranges_ignored(segmented, tmp_path):
+    calls = []
+    segmented(_range_handler(calls, honor_ranges=False))
+    target = tmp_path / "v.mp4"
+    ok = asyncio.run(
+        download.fetch_data_stream("https://v1.douyinvod.com/v.mp4", "douyin", ConnectedRequest(), file_path=str(target))
+    )
+    assert ok is False
+    assert not target.exists()
+
+
+class _SlowStream(httpx.AsyncByteStream):
+    def __init__(self, body: bytes):
+        self.body = body
+
+    async def __aiter__(self):
+        for i in range(0, len(self.body), 16 * 1024):
+            await asyncio.sleep(0.005)
+            yield self.body[i : i + 16 * 1024]
+
+
+def test_failed_segment_stops_the_others_before_closing_the_file(monkeypatch, segmented, tmp_path):
+    closed, late_writes = set(), []
+    pwrite, close = os.pwrite, os.close
+
+    def tracked_pwrite(fd, data, offset):
+        if fd in closed:
+            late_writes.append(offset)
+        return pwrite(fd, data, offset)
+
+    def tracked_close(fd):
+        closed.add(fd)
+        close(fd)
+
+    def handler(request):
+        rng = request.headers.get("range")
+        # 最后一段立即失败，其余段仍在慢速写入 (The last segment fails at once while the others are still writing)
+        if rng and rng.endswith(f"-{len(BODY) - 1}"):
+            raise httpx.ReadError("segment failed", request=request)
+        response = _range_handler([])(request)
+        return httpx.Response(response.status_code, headers=response.headers, stream=_SlowStream(response.content))
+
+    segmented(handler)
+    monkeypatch.setattr(os, "pwrite", tracked_pwrite)
+    monkeypatch.setattr(os, "close", tracked_close)
+
+    async def run():
+        ok = await download.fetch_data_stream(
+            "https://v1.douyinvod.com/v.mp4", "douyin", ConnectedRequest(), file_path=str(tmp_path / "v.mp4")
+        )
+        # 给可能遗留的分段任务继续运行的机会 (Give any orphaned segment a chance to keep writing)
+        await asyncio.sleep(0.2)
+        return ok
+
+    assert asyncio.run(run()) is False
+    assert late_writes == []
+    assert not (tmp_path / "v.mp4").exists()
+
+
+def test_background_job_downloads_in_segments(monkeypatch, segmented, download_root, parsed_post):
+    # 边下边传开启时（默认配置），后台任务仍先写入文件，因此分段下载
+    calls = []
+    segmented(_range_handler(calls))
+    monkeypatch.setitem(download.config["API"], "Download_Stream_Through", True)
+    parsed_post()
+
+    job = DownloadJob("https://www.douyin.com/video/7372484719365098803", prefix=False)
+    asyncio.run(download._run_download_job(job))
+    assert open(job.file_path, "rb").read() == BODY
+    assert len([c for c in calls if c]) == 3
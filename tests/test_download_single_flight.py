@@ -0,0 +1,184 @@
+import os
+import sys
+import asyncio
+
+import httpx
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.api.endpoints import download
+from app.download.single_flight import SingleFlight, TransferStalledError
+from app.main import app
+
+from conftest import API_KEY, DOUYIN_URL, disconnect_before_body
+
+BODY = os.urandom(512 * 1024)
+
+
+class SlowCDNStream(httpx.AsyncByteStream):
+    """本地替身 CDN：分块慢速返回，保证并发请求在传输过程中到达 (Local stand-in CDN sending slow chunks)"""
+
+    def __init__(self, body: bytes, chunk: int = 32 * 1024, delay: float = 0.01):
+        self.body, self.chunk, self.delay = body, chunk, delay
+
+    async def __aiter__(self):
+        for i in range(0, len(self.body), self.chunk):
+            await asyncio.sleep(self.delay)
+            yield self.body[i : i + self.chunk]
+
+
+@pytest.fixture
+def flights(monkeypatch, upstream, download_root, parsed_post):
+    monkeypatch.setitem(download.config["API"], "Download_Stream_Through", True)
+    monkeypatch.setattr(download, "single_flight", SingleFlight())
+    parsed_post()
+    return upstream
+
+
+async def _fire(count: int):
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        return await asyncio.gather(*(client.get(DOUYIN_URL, headers=API_KEY) for _ in range(count)))
+
+
+def test_concurrent_downloads_share_one_upstream_transfer(flights, tmp_path):
+    upstream = []
+
+    def handler(request):
+        upstream.append(str(request.url))
+        return httpx.Response(200, stream=SlowCDNStream(BODY), headers={"content-length": str(len(BODY))})
+
+    flights(handler)
+    responses = asyncio.run(_fire(12))
+
+    assert len(upstream) == 1
+    assert all(r.status_code == 200 for r in responses)
+    assert all(r.content == BODY for r in responses)
+    cached = tmp_path / "douyin_video" / "douyin_7372484719365098803.mp4"
+    assert cached.read_bytes() == BODY
+    assert not [p for p in cached.parent.iterdir() if p.name.endswith(".part")]
+    assert len(download.single_flight) == 0
+
+
+def test_followers_see_leader_failure_and_nothing_is_published(flights, tmp_path):
+    upstream = []
+
+    def handler(request):
+        upstream.append(str(request.url))
+        # 声明长度大于实际内容，模拟上游中途断开
+        return httpx.Response(
+            200, stream=SlowCDNStream(BODY[: 64 * 1024]), headers={"content-length": str(len(BODY))}
+        )
+
+    flights(handler)
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            requests = (client.get(DOUYIN_URL, headers=API_KEY) for _ in range(4))
+            return await asyncio.gather(*requests, return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert len(upstream) == 1
+    assert not any(isinstance(r, httpx.Response) and r.content == BODY for r in results)
+    assert list((tmp_path / "douyin_video").iterdir()) == []
+    assert len(download.single_flight) == 0
+
+
+def test_follower_tails_leader_temp_file(tmp_path):
+    part = tmp_path / "f.mp4.part"
+    final = tmp_path / "f.mp4"
+
+    async def run():
+        flights = SingleFlight()
+        transfer, leader = flights.join(str(final))
+        follower, is_leader = flights.join(str(final))
+        assert leader and not is_leader and follower is transfer
+
+        async def lead():
+            with open(part, "wb") as f:
+                transfer.start(str(part), 3 * 1000)
+                for i in range(3):
+                    f.write(bytes([i]) * 1000)
+                    f.flush()
+                    transfer.advance(1000)
+                    await asyncio.sleep(0.01)
+            os.replace(part, final)
+            transfer.finish()
+
+        async def follow():
+            await follower.wait_started()
+            return b"".join([chunk async for chunk in follower.follow(str(final))])
+
+        _, received = await asyncio.gather(lead(), follow())
+        return received, flights
+
+    received, flights = asyncio.run(run())
+    assert received == b"\x00" * 1000 + b"\x01" * 1000 + b"\x02" * 1000
+    assert len(flights) == 0
+
+
+def test_wait_reraises_leader_error():
+    async def run():
+        flights = SingleFlight()
+        transfer, _ = flights.join("/tmp/x")
+        asyncio.get_running_loop().call_later(0.01, transfer.finish, ValueError("boom"))
+        with pytest.raises(ValueError):
+            await transfer.wait()
+        # 结束后可重新成为领头请求
+        assert flights.join("/tmp/x")[1] is True
+
+    asyncio.run(run())
+
+
+def test_stalled_wait_abandons_transfer():
+    async def run():
+        flights = SingleFlight()
+        transfer, _ = flights.join("/tmp/x")
+        other, _ = flights.join("/tmp/x")
+        waiting = asyncio.create_task(other.wait())
+        with pytest.raises(TransferStalledError):
+            await transfer.wait_started(timeout=0.05)
+        # 其他跟随请求同样收到停滞错误，下一个加入的请求成为领头请求
+        with pytest.raises(TransferStalledError):
+            await waiting
+        assert flights.join("/tmp/x")[1] is True
+
+    asyncio.run(run())
+
+
+def test_leader_response_dropped_before_body_finishes_transfer(flights, tmp_path):
+    flights(lambda request: httpx.Response(200, content=BODY))
+    target = tmp_path / "douyin_video" / "a.mp4"
+    target.parent.mkdir()
+
+    async def run():
+        transfer, _ = download.single_flight.join(str(target))
+        response = await download.stream_data_tee(
+            "https://v1.douyinvod.com/v.mp4", "douyin", str(target), "a.mp4", "video/mp4", transfer=transfer
+        )
+        await disconnect_before_body(response)
+        return transfer
+
+    transfer = asyncio.run(run())
+    assert transfer.done and transfer.error is not None
+    assert len(download.single_flight) == 0
+
+
+def test_follower_takes_over_leader_whose_response_was_never_sent(flights, monkeypatch, tmp_path):
+    upstream = []
+
+    def handler(request):
+        upstream.append(str(request.url))
+        return httpx.Response(200, content=BODY)
+
+    flights(handler)
+    monkeypatch.setitem(download.config["API"], "Download_Stall_Timeout", 0.2)
+    cached = tmp_path / "douyin_video" / "douyin_7372484719365098803.mp4"
+    # 领头请求登记后其响应从未发送，任何清理都不会执行 (The leader registered but its response was never sent)
+    stale, _ = download.single_flight.join(str(cached))
+
+    (response,) = asyncio.run(_fire(1))
+    assert response.status_code == 200 and response.content == BODY
+    assert len(upstream) == 1
+    assert isinstance(stale.error, TransferStalledError)
+    assert len(download.single_flight) == 0
@@ -0,0 +1,87 @@
+import os
+import sys
+import hashlib
+
+import httpx
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from starlette.testclient import TestClient
+
+from app.api.endpoints import download
+from app.download import atomic
+from app.download.storage import ContentAddressedStorage
+from app.main import app
+
+from conftest import API_KEY
+
+BODY = os.urandom(64 * 1024)
+URL = "/api/download?url=https://www.douyin.com/video/7372484719365098803"
+
+
+def _stage(store: ContentAddressedStorage, media_id: str, body: bytes) -> tuple[str, str]:
+    target = store.target("douyin", media_id, "video", "ignored.mp4")
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    part = atomic.temp_path(target)
+    with open(part, "wb") as f:
+        f.write(body)
+    return part, target
+
+
+def test_identical_content_is_stored_once(tmp_path):
+    store = ContentAddressedStorage(str(tmp_path))
+    digest = hashlib.sha256(BODY).hexdigest()
+
+    first = store.commit(*_stage(store, "111", BODY), len(BODY))
+    second = store.commit(*_stage(store, "222", BODY), len(BODY))
+    assert first == second == str(tmp_path / "blobs" / digest[:2] / digest[2:4] / digest)
+    assert open(first, "rb").read() == BODY
+    assert os.listdir(tmp_path / ".staging") == []
+
+    assert store.lookup(store.target("douyin", "111", "video", "x.mp4")) == first
+    assert store.lookup(store.target("douyin", "222", "video", "x.mp4")) == first
+    assert store.lookup(store.target("douyin", "333", "video", "x.mp4")) is None
+
+
+def test_remove_drops_index_rows(tmp_path):
+    store = ContentAddressedStorage(str(tmp_path))
+    blob = store.commit(*_stage(store, "111", BODY), len(BODY))
+
+    store.remove(blob)
+    assert not os.path.exists(blob) and not os.path.exists(atomic.sidecar_path(blob))
+    assert store.lookup(store.target("douyin", "111", "video", "x.mp4")) is None
+
+
+def test_index_survives_restart(tmp_path):
+    store = ContentAddressedStorage(str(tmp_path))
+    blob = store.commit(*_stage(store, "111", BODY), len(BODY))
+    store.close()
+
+    reopened = ContentAddressedStorage(str(tmp_path))
+    assert reopened.lookup(reopened.target("douyin", "111", "video", "x.mp4")) == blob
+
+
+def test_download_endpoint_uses_content_addressed_storage(monkeypatch, upstream, download_root, parsed_post):
+    calls = []
+
+    def handler(request):
+        calls.append(1)
+        return httpx.Response(200, content=BODY, headers={"content-length": str(len(BODY))})
+
+    upstream(handler)
+    monkeypatch.setitem(download.config["API"], "Download_Storage", {"Backend": "cas"})
+    monkeypatch.setattr(download, "_storages", {})
+    parsed_post()
+
+    client = TestClient(app)
+    first = client.get(URL + "&prefix=false", headers=API_KEY)
+    assert first.content == BODY
+    # 带前缀的文件名只影响下载名，命中同一索引条目，不再访问上游
+    second = client.get(URL + "&prefix=true", headers=API_KEY)
+    assert second.content == BODY
+    assert "douyin_7372484719365098803.mp4" in second.headers["content-disposition"]
+    assert len(calls) == 1
+
+    digest = hashlib.sha256(BODY).hexdigest()
+    assert (download_root / "blobs" / digest[:2] / digest[2:4] / digest).exists()
+    assert not (download_root / "douyin_video").exists()
@@ -0,0 +1,89 @@
+import os
+import sys
+import asyncio
+
+import httpx
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.api.endpoints import download
+
+from conftest import ConnectedRequest
+
+BODY = os.urandom(256 * 1024)
+
+
+@pytest.fixture
+def recorded(upstream):
+    """返回安装函数：按顺序记录请求地址后交给 handler (Installer recording request URLs before calling handler)"""
+
+    def install(handler) -> list:
+        calls = []
+
+        def wrapped(request):
+            calls.append(str(request.url))
+            return handler(request)
+
+        upstream(wrapped)
+        return calls
+
+    return install
+
+
+def _redirecting_handler(request):
+    if request.url.host == "v1.douyinvod.com":
+        return httpx.Response(302, headers={"location": "https://v2.douyinvod.com/final.mp4"}, content=b"moved")
+    if request.url.host == "v2.douyinvod.com":
+        return httpx.Response(200, content=BODY, headers={"content-length": str(len(BODY))})
+    return httpx.Response(404)
+
+
+def test_stream_follows_redirects_with_single_body_transfer(recorded, tmp_path):
+    calls = recorded(_redirecting_handler)
+    target = tmp_path / "video.mp4"
+
+    ok = asyncio.run(
+        download.fetch_data_stream(
+            "https://v1.douyinvod.com/start.mp4", "douyin", ConnectedRequest(), file_path=str(target)
+        )
+    )
+    assert ok is True
+    assert target.read_bytes() == BODY
+    # 每一跳只请求一次，最终响应体只下载一次
+    assert calls == ["https://v1.douyinvod.com/start.mp4", "https://v2.douyinvod.com/final.mp4"]
+
+
+def test_stream_rejects_redirect_before_requesting_target(recorded, tmp_path):
+    def handler(request):
+        return httpx.Response(302, headers={"location": "https://evil.example.com/x.mp4"})
+
+    calls = recorded(handler)
+    with pytest.raises(download.HTTPException):
+        asyncio.run(
+            download.fetch_data_stream(
+                "https://v1.douyinvod.com/start.mp4", "douyin", ConnectedRequest(), file_path=str(tmp_path / "x.mp4")
+            )
+        )
+    assert calls == ["https://v1.douyinvod.com/start.mp4"]
+
+
+def test_stream_stops_after_too_many_redirects(recorded, tmp_path):
+    def handler(request):
+        return httpx.Response(302, headers={"location": "/loop"})
+
+    calls = recorded(handler)
+    with pytest.raises(download.HTTPException):
+        asyncio.run(
+            download.fetch_data_stream(
+                "https://v1.douyinvod.com/loop", "douyin", ConnectedRequest(), file_path=str(tmp_path / "x.mp4")
+            )
+        )
+    assert len(calls) == download._MAX_REDIRECTS + 1
+
+
+def test_safe_get_reads_body_once(recorded):
+    calls = recorded(_redirecting_handler)
+    response = asyncio.run(download.fetch_data("https://v1.douyinvod.com/start.mp4", "douyin"))
+    assert response.content == BODY
+    assert len(calls) == 2
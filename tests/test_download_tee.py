@@ -0,0 +1,125 @@
+import os
+import sys
+import asyncio
+
+import httpx
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from starlette.testclient import TestClient
+
+from app.api.endpoints import download
+from app.main import app
+
+from conftest import API_KEY, DOUYIN_URL, disconnect_before_body
+
+BODY = os.urandom(300 * 1024)
+
+
+@pytest.fixture
+def tee(monkeypatch, upstream, download_root, parsed_post):
+    monkeypatch.setitem(download.config["API"], "Download_Stream_Through", True)
+    parsed_post()
+    return upstream
+
+
+def test_stream_through_serves_client_and_caches(tee, tmp_path):
+    calls = []
+
+    def handler(request):
+        calls.append(str(request.url))
+        return httpx.Response(200, content=BODY, headers={"content-length": str(len(BODY))})
+
+    tee(handler)
+    client = TestClient(app)
+
+    resp = client.get(DOUYIN_URL, headers=API_KEY)
+    assert resp.status_code == 200
+    assert resp.content == BODY
+    assert resp.headers["content-length"] == str(len(BODY))
+    cached = tmp_path / "douyin_video" / "douyin_7372484719365098803.mp4"
+    assert cached.read_bytes() == BODY
+    assert not [p for p in cached.parent.iterdir() if p.name.endswith(".part")]
+
+    # 第二次请求直接命中缓存文件，不再访问上游
+    resp = client.get(DOUYIN_URL, headers=API_KEY)
+    assert resp.content == BODY
+    assert len(calls) == 1
+
+
+def test_incomplete_transfer_is_not_published(tee, tmp_path):
+    def handler(request):
+        # 声明的长度大于实际响应体，模拟上游中途断开
+        return httpx.Response(200, content=BODY[:1000], headers={"content-length": str(len(BODY))})
+
+    tee(handler)
+    target = tmp_path / "douyin_video" / "v.mp4"
+    target.parent.mkdir(parents=True)
+
+    async def run():
+        response = await download.stream_data_tee(
+            "https://v1.douyinvod.com/v.mp4", "douyin", str(target), "v.mp4", "video/mp4"
+        )
+        received = b""
+        with pytest.raises(httpx.ReadError):
+            async for chunk in response.body_iterator:
+                received += chunk
+        return received
+
+    received = asyncio.run(run())
+    assert received == BODY[:1000]
+    assert not target.exists()
+    assert list(target.parent.iterdir()) == []
+
+
+def test_client_disconnect_discards_partial_file(tee, tmp_path):
+    def handler(request):
+        return httpx.Response(200, content=BODY, headers={"content-length": str(len(BODY))})
+
+    tee(handler)
+    target = tmp_path / "douyin_video" / "v.mp4"
+    target.parent.mkdir(parents=True)
+
+    async def run():
+        response = await download.stream_data_tee(
+            "https://v1.douyinvod.com/v.mp4", "douyin", str(target), "v.mp4", "video/mp4"
+        )
+        iterator = response.body_iterator
+        await iterator.__anext__()
+        # 模拟客户端断开：提前关闭生成器
+        await iterator.aclose()
+
+    asyncio.run(run())
+    assert not target.exists()
+    assert list(target.parent.iterdir()) == []
+
+
+class _TrackedStream(httpx.AsyncByteStream):
+    """记录是否被关闭的上游响应体 (Upstream body recording whether it was closed)"""
+
+    def __init__(self, body: bytes):
+        self.body, self.closed = body, False
+
+    async def __aiter__(self):
+        yield self.body
+
+    async def aclose(self):
+        self.closed = True
+
+
+def test_disconnect_before_body_releases_upstream(tee, tmp_path):
+    stream = _TrackedStream(BODY)
+    tee(lambda request: httpx.Response(200, stream=stream, headers={"content-length": str(len(BODY))}))
+    target = tmp_path / "douyin_video" / "v.mp4"
+    target.parent.mkdir(parents=True)
+
+    async def run():
+        response = await download.stream_data_tee(
+            "https://v1.douyinvod.com/v.mp4", "douyin", str(target), "v.mp4", "video/mp4"
+        )
+        await disconnect_before_body(response)
+
+    asyncio.run(run())
+    assert stream.closed
+    assert list(target.parent.iterdir()) == []
@@ -0,0 +1,72 @@
+import os
+import sys
+import asyncio
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.download.ffmpeg_pool import FFmpegPool, FFmpegQueueFullError
+
+from conftest import API_KEY
+
+# 用 Python 子进程代替 ffmpeg (A Python subprocess stands in for ffmpeg)
+SLEEP = [sys.executable, "-c", "import time; time.sleep(0.2)"]
+NOISY = [sys.executable, "-c", "import sys; sys.stderr.write('x' * 200000); sys.exit(3)"]
+
+
+def test_pool_limits_concurrency_and_records_wait():
+    pool = FFmpegPool(workers=2, max_queue=10)
+
+    async def run():
+        peak = 0
+
+        async def watch():
+            nonlocal peak
+            while True:
+                peak = max(peak, pool.running)
+                await asyncio.sleep(0.01)
+
+        watcher = asyncio.create_task(watch())
+        results = await asyncio.gather(*(pool.run(SLEEP) for _ in range(4)))
+        watcher.cancel()
+        return results, peak
+
+    results, peak = asyncio.run(run())
+    assert [code for code, _ in results] == [0, 0, 0, 0]
+    assert peak == 2
+    stats = pool.stats()
+    assert stats["completed"] == 4 and stats["running"] == 0 and stats["waiting"] == 0
+    # 后两个任务必须排队等待前两个完成
+    assert stats["queue_wait_ms_max"] >= 150
+
+
+def test_pool_rejects_when_queue_full():
+    pool = FFmpegPool(workers=1, max_queue=1)
+
+    async def run():
+        return await asyncio.gather(*(pool.run(SLEEP) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert sum(isinstance(r, FFmpegQueueFullError) for r in results) == 1
+    assert pool.stats()["rejected"] == 1
+
+
+def test_pool_keeps_bounded_stderr_tail():
+    pool = FFmpegPool(workers=1, stderr_limit=1000)
+    code, stderr = asyncio.run(pool.run(NOISY))
+    assert code == 3
+    assert stderr == b"x" * 1000
+    assert pool.stats()["failed"] == 1
+
+
+def test_default_workers_is_cpu_count():
+    assert FFmpegPool.from_config({}).workers == (os.cpu_count() or 1)
+
+
+def test_download_stats_endpoint():
+    from starlette.testclient import TestClient
+
+    from app.main import app
+
+    resp = TestClient(app).get("/api/download/stats", headers=API_KEY)
+    assert resp.status_code == 200
+    assert "workers" in resp.json()["data"]["ffmpeg"]
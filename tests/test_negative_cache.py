@@ -0,0 +1,138 @@
+import os
+import sys
+import asyncio
+
+import pytest
+
+# 保证测试可导入项目包
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from crawlers.utils.api_exceptions import APIContentUnavailableError
+from crawlers.utils.availability import check_bilibili_detail, check_douyin_detail, check_tiktok_web_detail
+from crawlers.utils.cache import ResultCache
+
+
+def test_negative_cache_short_circuits_upstream():
+    cache = ResultCache(negative_ttls={"not_found": 60})
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        raise APIContentUnavailableError("deleted", APIContentUnavailableError.NOT_FOUND)
+
+    for _ in range(3):
+        with pytest.raises(APIContentUnavailableError) as exc:
+            asyncio.run(cache.get_or_load("k", loader))
+        assert exc.value.reason == "not_found"
+    assert len(calls) == 1
+
+
+def test_negative_ttl_zero_disables_and_expiry_retries():
+    cache = ResultCache(negative_ttls={"id_mismatch": 0})
+
+    async def mismatch():
+        raise APIContentUnavailableError("mismatch", APIContentUnavailableError.ID_MISMATCH)
+
+    with pytest.raises(APIContentUnavailableError):
+        asyncio.run(cache.get_or_load("k", mismatch))
+    assert "k" not in cache._negative
+
+    cache.set_negative("j", APIContentUnavailableError("gone", "not_found"))
+    message, reason, _ = cache._negative["j"]
+    cache._negative["j"] = (message, reason, 0)
+
+    async def ok():
+        return {"v": 1}
+
+    assert asyncio.run(cache.get_or_load("j", ok)) == {"v": 1}
+
+
+def test_unavailable_error_skips_stale_value():
+    cache = ResultCache(stale_if_error=600)
+
+    async def ok():
+        return {"v": 1}
+
+    async def gone():
+        raise APIContentUnavailableError("deleted", APIContentUnavailableError.NOT_FOUND)
+
+    asyncio.run(cache.get_or_load("k", ok))
+    cache._entries["k"].expires_at = 0
+    cache.stale_if_error = float("inf")
+    with pytest.raises(APIContentUnavailableError):
+        asyncio.run(cache.get_or_load("k", gone))
+    assert "k" not in cache._entries
+
+
+def test_transient_errors_are_not_negatively_cached():
+    cache = ResultCache()
+    calls = []
+
+    async def flaky():
+        calls.append(1)
+        raise RuntimeError("timeout")
+
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            asyncio.run(cache.get_or_load("k", flaky))
+    assert len(calls) == 2
+
+
+@pytest.mark.parametrize(
+    "data, reason",
+    [
+        ({"aweme_detail": None, "filter_detail": {"filter_reason": "status_self_see"}}, "private"),
+        ({"aweme_detail": None, "filter_detail": {"filter_reason": "status_deleted"}}, "not_found"),
+        ({"aweme_detail": None}, "empty_detail"),
+        ({"aweme_detail": {"aweme_id": "999"}}, "id_mismatch"),
+    ],
+)
+def test_check_douyin_detail(data, reason):
+    with pytest.raises(APIContentUnavailableError) as exc:
+        check_douyin_detail(data, "123")
+    assert exc.value.reason == reason
+
+
+def test_check_detail_passes_valid_responses():
+    ok = {"aweme_detail": {"aweme_id": "123"}}
+    assert check_douyin_detail(ok, "123") is ok
+    ok = {"statusCode": 0, "itemInfo": {"itemStruct": {"id": "1"}}}
+    assert check_tiktok_web_detail(ok, "1") is ok
+    ok = {"code": 0, "data": {"bvid": "BV1"}}
+    assert check_bilibili_detail(ok, "BV1") is ok
+
+
+def test_check_tiktok_and_bilibili_codes():
+    with pytest.raises(APIContentUnavailableError) as exc:
+        check_tiktok_web_detail({"statusCode": 10204, "statusMsg": "item doesn't exist"}, "1")
+    assert exc.value.reason == "not_found"
+    with pytest.raises(APIContentUnavailableError) as exc:
+        check_bilibili_detail({"code": -10403, "message": "地区限制"}, "BV1")
+    assert exc.value.reason == "region_blocked"
+
+
+def test_tiktok_app_id_mismatch_is_not_retried(monkeypatch):
+    from crawlers.tiktok.app import app_crawler
+
+    calls = []
+
+    class _DummyCrawler:
+        def __init__(self, *args, **kwargs):
+            pass
+
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, exc_type, exc, tb):
+            return False
+
+        async def fetch_get_json(self, url):
+            calls.append(url)
+            return {"aweme_list": [{"aweme_id": "other"}]}
+
+    monkeypatch.setattr(app_crawler, "BaseCrawler", _DummyCrawler)
+    crawler = app_crawler.TikTokAPPCrawler()
+    with pytest.raises(APIContentUnavailableError) as exc:
+        asyncio.run(crawler.fetch_one_video("7350810998023949599"))
+    assert exc.value.reason == "id_mismatch"
+    assert len(calls) == 1
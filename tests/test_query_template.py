@@ -0,0 +1,54 @@
+import os
+import sys
+from urllib.parse import urlencode
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from crawlers.douyin.web import models as douyin
+from crawlers.tiktok.web import models as tiktok
+from crawlers.utils.query_template import QueryTemplate, render_query
+
+CASES = [
+    (douyin.PostDetail, {"aweme_id": "7372484719365098803"}),
+    (douyin.UserPost, {"sec_user_id": "MS4wLjABAAAA a+b/c", "max_cursor": "0", "count": 20}),
+    (douyin.PostComments, {"aweme_id": "7372484719365098803", "cursor": 40, "count": 20}),
+    (douyin.PostDanmaku, {"item_id": "1", "duration": 1000, "end_time": 99}),
+    (douyin.PostFeed, {}),
+    (douyin.BaseRequestModel, {}),
+    (tiktok.UserProfile, {"secUid": "", "uniqueId": "tiktok&co"}),
+    (tiktok.UserPost, {"secUid": "MS4wLjABAAAA", "cursor": 0, "count": 35, "coverFormat": 2}),
+    (tiktok.PostCommentReply, {"item_id": "1", "comment_id": "2", "cursor": 0, "count": 20, "current_region": ""}),
+]
+
+
+@pytest.mark.parametrize("model, values", CASES)
+def test_output_is_byte_identical(model, values):
+    # a_bogus 路径：urlencode(dict) 且 msToken 置空
+    params = model(**values).dict()
+    params["msToken"] = ""
+    assert render_query(model, values, overrides={"msToken": ""}) == urlencode(params)
+    # X-Bogus 路径：未编码的 "&".join
+    raw = "&".join(f"{k}={v}" for k, v in model(**values).dict().items())
+    assert render_query(model, values, encode=False) == raw
+    # 第二次使用缓存的模板
+    assert render_query(model, values, encode=False) == raw
+
+
+def test_variables_are_validated_like_the_model():
+    template = QueryTemplate(douyin.UserPost, ("sec_user_id", "max_cursor", "count"))
+    assert "max_cursor=5&count=7" in template.render(sec_user_id="x", max_cursor="5", count=7)
+    with pytest.raises(Exception):
+        template.render(sec_user_id="x", max_cursor="abc", count=7)
+    with pytest.raises(TypeError):
+        template.render(sec_user_id="x", count=7)
+    with pytest.raises(TypeError):
+        QueryTemplate(douyin.UserPost, ("sec_user_id",))
+
+
+def test_unknown_fields_are_ignored():
+    values = {"itemId": "1", "unknown": "x"}
+    assert render_query(tiktok.PostDetail, values, encode=False) == render_query(
+        tiktok.PostDetail, {"itemId": "1"}, encode=False
+    )
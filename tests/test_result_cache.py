@@ -0,0 +1,182 @@
+import os
+import sys
+import asyncio
+import time
+
+# 保证测试可导入项目包
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from crawlers.utils.cache import ResultCache, earliest_expiry, parse_url_expiry
+
+
+def test_parse_url_expiry_params():
+    assert parse_url_expiry("https://upos-sz.bilivideo.com/a.m4s?e=x&deadline=1700000000&gen=playurlv2") == 1700000000
+    assert parse_url_expiry("https://v16m.tiktokcdn.com/a/?x-expires=1700000100&x-signature=abc") == 1700000100
+    assert parse_url_expiry("https://v3-dy.douyinvod.com/a/?expire=1700000200000") == 1700000200
+    assert parse_url_expiry("https://www.douyin.com/video/123") is None
+
+
+def test_earliest_expiry_walks_nested_data():
+    data = {
+        "video_data": {"nwm_video_url": "https://a.com/v?deadline=2000", "audio_url": "https://a.com/a?deadline=1500"},
+        "cover_data": {"cover": {"url_list": ["https://p.com/c?x-expires=1800"]}},
+        "desc": "no url",
+    }
+    assert earliest_expiry(data) == 1500
+
+
+def test_ttl_follows_signature_minus_margin():
+    cache = ResultCache(default_ttl=300, max_ttl=3600, safety_margin=60)
+    now = time.time()
+    assert cache.ttl_for({"u": f"https://a.com/v?deadline={int(now) + 1000}"}, now) == int(now) + 1000 - 60 - now
+    assert cache.ttl_for({"u": "https://a.com/v"}, now) == 300
+    assert cache.ttl_for({"u": f"https://a.com/v?deadline={int(now) + 99999}"}, now) == 3600
+    # 已临近过期的结果不应缓存
+    assert not cache.set("k", {"u": f"https://a.com/v?deadline={int(now) + 30}"})
+
+
+def test_get_or_load_hits_cache():
+    cache = ResultCache()
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        return {"u": f"https://a.com/v?deadline={int(time.time()) + 3600}"}
+
+    async def run():
+        first = await cache.get_or_load(("douyin", "1", True), loader)
+        second = await cache.get_or_load(("douyin", "1", True), loader)
+        assert first is second
+        await cache.get_or_load(("douyin", "1", False), loader)
+
+    asyncio.run(run())
+    assert len(calls) == 2
+
+
+def test_hot_key_refreshes_ahead_of_expiry():
+    cache = ResultCache(safety_margin=0, refresh_ahead=100, hot_hits=2)
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        return {"n": len(calls), "u": f"https://a.com/v?deadline={int(time.time()) + 50 + 1000 * (len(calls) - 1)}"}
+
+    async def run():
+        await cache.get_or_load("k", loader)
+        await cache.get_or_load("k", loader)  # hit 1
+        stale = await cache.get_or_load("k", loader)  # hit 2 -> 后台刷新
+        assert stale["n"] == 1
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        return await cache.get_or_load("k", loader)
+
+    fresh = asyncio.run(run())
+    assert fresh["n"] == 2
+    assert len(calls) == 2
+
+
+def test_lru_eviction():
+    cache = ResultCache(max_entries=2)
+    for k in ("a", "b", "c"):
+        cache.set(k, {"v": k})
+    assert cache.get("a") is None
+    assert cache.get("c") == {"v": "c"}
+
+
+def _expire(cache, key):
+    # 将条目的过期时间拨回到当前时刻之前
+    cache._entries[key].expires_at = time.time() - 1
+
+
+def test_stale_while_revalidate_serves_stale_and_refreshes_once():
+    from crawlers.utils.cache import cache_status
+
+    cache = ResultCache(stale_while_revalidate=60, stale_if_error=600)
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"n": len(calls)}
+
+    async def run():
+        await cache.get_or_load("k", loader)
+        _expire(cache, "k")
+        first = await cache.get_or_load("k", loader)
+        assert cache_status.get()[0] == "STALE"
+        results = await asyncio.gather(*(cache.get_or_load("k", loader) for _ in range(4)))
+        assert [r["n"] for r in [first, *results]] == [1] * 5
+        await asyncio.sleep(0.05)
+        return await cache.get_or_load("k", loader)
+
+    fresh = asyncio.run(run())
+    assert fresh["n"] == 2
+    # 首次加载 + 仅一次后台刷新
+    assert len(calls) == 2
+
+
+def test_stale_if_error_serves_bounded_stale_value():
+    from crawlers.utils.cache import cache_headers
+
+    cache = ResultCache(stale_while_revalidate=0, stale_if_error=600)
+
+    async def ok():
+        return {"v": 1}
+
+    async def boom():
+        raise RuntimeError("upstream down")
+
+    async def run():
+        await cache.get_or_load("k", ok)
+        _expire(cache, "k")
+        value = await cache.get_or_load("k", boom)
+        return value, cache_headers()
+
+    value, headers = asyncio.run(run())
+    assert value == {"v": 1}
+    assert headers["X-Cache"] == "STALE-ERROR"
+    assert headers["Warning"].startswith("111")
+
+    # 超出 stale-if-error 窗口后错误照常抛出
+    cache._entries["k"].expires_at = time.time() - 601
+    import pytest
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(cache.get_or_load("k", boom))
+
+
+def test_endpoint_marks_stale_response(monkeypatch):
+    from starlette.testclient import TestClient
+
+    from app.api.endpoints import bilibili_web
+    from app.main import app
+    from crawlers.utils.cache import metadata_cache
+
+    calls = []
+
+    async def fetch_ok(bv_id):
+        calls.append(bv_id)
+        return {"data": {"bvid": bv_id}}
+
+    async def fetch_fail(bv_id):
+        raise RuntimeError("upstream down")
+
+    client = TestClient(app)
+    headers = {"X-API-Key": "1234567890"}
+    url = "/api/bilibili/web/fetch_one_video?bv_id=BV1stale0001"
+
+    monkeypatch.setattr(bilibili_web.BilibiliWebCrawler, "fetch_one_video", fetch_ok)
+    monkeypatch.setattr(metadata_cache, "stale_while_revalidate", 0)
+    monkeypatch.setattr(metadata_cache, "stale_if_error", 600)
+    resp = client.get(url, headers=headers)
+    assert resp.status_code == 200
+    assert resp.headers["X-Cache"] == "MISS"
+
+    _expire(metadata_cache, ("bilibili_web", "BV1stale0001"))
+    monkeypatch.setattr(bilibili_web.BilibiliWebCrawler, "fetch_one_video", fetch_fail)
+    resp = client.get(url, headers=headers)
+    assert resp.status_code == 200
+    assert resp.headers["X-Cache"] == "STALE-ERROR"
+    assert "Warning" in resp.headers
+    assert resp.json()["data"] == {"data": {"bvid": "BV1stale0001"}}
+    metadata_cache.invalidate(("bilibili_web", "BV1stale0001"))
@@ -0,0 +1,79 @@
+import os
+import sys
+import asyncio
+
+import httpx
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from crawlers.tiktok.web.utils import AwemeIdFetcher as TikTokAwemeIdFetcher
+from crawlers.utils.api_exceptions import APIResponseError
+from crawlers.utils.redirects import resolve_redirects
+
+
+def _client(routes: dict, calls: list) -> httpx.AsyncClient:
+    def handler(request):
+        calls.append(str(request.url))
+        status, location = routes.get(str(request.url), (200, None))
+        headers = {"location": location} if location else {}
+        return httpx.Response(status, headers=headers, content=b"<html>" + b"x" * 100000)
+
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+def _match(url):
+    return url.rsplit("/", 1)[-1] if "/video/" in url else None
+
+
+def test_stops_at_first_hop_with_id():
+    calls = []
+    routes = {
+        "https://s.example/a": (302, "/b"),
+        "https://s.example/b": (301, "https://www.example/video/123"),
+    }
+
+    async def run():
+        async with _client(routes, calls) as client:
+            return await resolve_redirects(client, "https://s.example/a", lambda u: True, _match)
+
+    assert asyncio.run(run()) == ("https://www.example/video/123", "123", 301)
+    # 落地页没有被请求
+    assert calls == ["https://s.example/a", "https://s.example/b"]
+
+
+def test_returns_final_url_without_id():
+    calls = []
+    routes = {"https://s.example/a": (302, "https://www.example/home")}
+
+    async def run():
+        async with _client(routes, calls) as client:
+            return await resolve_redirects(client, "https://s.example/a", lambda u: True, _match)
+
+    assert asyncio.run(run()) == ("https://www.example/home", None, 200)
+
+
+def test_rejects_disallowed_hop_and_loops():
+    calls = []
+    routes = {
+        "https://s.example/a": (302, "https://evil.example/x"),
+        "https://s.example/loop": (302, "https://s.example/loop"),
+    }
+
+    async def run(url):
+        async with _client(routes, calls) as client:
+            return await resolve_redirects(client, url, lambda u: u.startswith("https://s.example/"), _match)
+
+    with pytest.raises(APIResponseError):
+        asyncio.run(run("https://s.example/a"))
+    assert "https://evil.example/x" not in calls
+    with pytest.raises(APIResponseError):
+        asyncio.run(run("https://s.example/loop"))
+
+
+def test_tiktok_short_link_resolves_from_location(monkeypatch, public_dns):
+    calls = []
+    routes = {"https://vt.tiktok.com/ZSabc/": (301, "https://www.tiktok.com/@user/video/7255716763118226715?lang=en")}
+    monkeypatch.setattr(TikTokAwemeIdFetcher, "_client", classmethod(lambda cls: _client(routes, calls)))
+    assert asyncio.run(TikTokAwemeIdFetcher.get_aweme_id("https://vt.tiktok.com/ZSabc/")) == "7255716763118226715"
+    assert calls == ["https://vt.tiktok.com/ZSabc/"]
@@ -0,0 +1,77 @@
+import os
+import sys
+import json
+import asyncio
+
+import httpx
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from crawlers.tiktok.web.utils import SecUserIdFetcher
+
+URL = "https://www.tiktok.com/@tiktok"
+SEC_UID = "MS4wLjABAAAAv7iSuuXDJGDvJkmH_vz1qkDZYo1apxgzaxdBSeIuPiM"
+
+
+def _page() -> bytes:
+    data = {
+        "__DEFAULT_SCOPE__": {
+            "webapp.app-context": {"language": "en", "note": "</div> webapp.user-detail"},
+            "webapp.user-detail": {"userInfo": {"user": {"uniqueId": "tiktok", "secUid": SEC_UID}}},
+            "webapp.other": {"items": list(range(2000))},
+        }
+    }
+    head = b"<html><head>" + b"<meta name='x'>" * 4000
+    script = (
+        b'<script id="__UNIVERSAL_DATA_FOR_REHYDRATION__" type="application/json">'
+        + json.dumps(data).encode()
+        + b"</script>"
+    )
+    return head + script + b"<div>" * 200000 + b"</html>"
+
+
+def _fetch(monkeypatch, page: bytes, url: str = URL):
+    sent = []
+
+    async def body():
+        for i in range(0, len(page), 16384):
+            sent.append(i)
+            yield page[i : i + 16384]
+
+    transport = httpx.MockTransport(lambda request: httpx.Response(200, content=body()))
+    monkeypatch.setattr(SecUserIdFetcher, "_client", classmethod(lambda cls: httpx.AsyncClient(transport=transport)))
+    return sent
+
+
+def test_secuid_scan_stops_after_script(monkeypatch, public_dns):
+    page = _page()
+    sent = _fetch(monkeypatch, page)
+    assert asyncio.run(SecUserIdFetcher.get_secuid(URL)) == SEC_UID
+    # 页面尾部的大量内容没有被读取
+    assert len(sent) * 16384 < page.index(b"<div>") + 2 * 16384
+    assert len(sent) * 16384 < len(page) / 4
+
+
+def test_secuid_missing_script_raises(monkeypatch, public_dns):
+    _fetch(monkeypatch, b"<html>" + b"x" * 100000 + b"</html>")
+    try:
+        asyncio.run(SecUserIdFetcher.get_secuid(URL))
+    except Exception as e:
+        assert "sec_uid" in str(e)
+    else:
+        raise AssertionError("expected failure")
+
+
+def test_extract_secuid_decodes_only_user_detail():
+    blob = json.dumps({"__DEFAULT_SCOPE__": {"webapp.user-detail": {"userInfo": {"user": {"secUid": "abc"}}}}}, indent=1)
+    assert SecUserIdFetcher._extract_secuid(blob)[0] == "abc"
+    # 用户详情之后的内容不合法也不影响提取
+    compact = '{"__DEFAULT_SCOPE__":{"webapp.user-detail":{"userInfo":{"user":{"secUid":"def"}}},"broken":'
+    assert SecUserIdFetcher._extract_secuid(compact)[0] == "def"
+    assert SecUserIdFetcher._extract_secuid('{"__DEFAULT_SCOPE__":{}}') == (None, {})
+
+
+def test_uniqueid_does_not_read_the_page(monkeypatch, public_dns):
+    sent = _fetch(monkeypatch, _page())
+    assert asyncio.run(SecUserIdFetcher.get_uniqueid(URL)) == "tiktok"
+    assert len(sent) <= 1
@@ -0,0 +1,81 @@
+import os
+import sys
+import asyncio
+
+import pytest
+
+# 保证测试可导入项目包
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from crawlers.utils.url_router import KIND_LIVE, KIND_NOTE, KIND_PAGE, KIND_PHOTO, KIND_SHORT, KIND_USER, KIND_VIDEO, route_url
+
+
+@pytest.mark.parametrize(
+    "url, platform, kind, id_",
+    [
+        ("https://www.douyin.com/video/7298145681699622182", "douyin", KIND_VIDEO, "7298145681699622182"),
+        ("https://www.douyin.com/note/7341234567890123456", "douyin", KIND_NOTE, "7341234567890123456"),
+        ("https://www.douyin.com/discover?modal_id=7298145681699622182", "douyin", KIND_VIDEO, "7298145681699622182"),
+        ("https://www.iesdouyin.com/share/video/7298145681699622182/?region=CN", "douyin", KIND_VIDEO, "7298145681699622182"),
+        ("https://www.douyin.com/user/MS4wLjABAAAAabc", "douyin", KIND_USER, "MS4wLjABAAAAabc"),
+        ("https://live.douyin.com/766545142636", "douyin", KIND_LIVE, "766545142636"),
+        ("https://v.douyin.com/L4FJNR3/", "douyin", KIND_SHORT, None),
+        ("https://www.tiktok.com/@flukegk83/video/7360734489271700753", "tiktok", KIND_VIDEO, "7360734489271700753"),
+        ("https://www.tiktok.com/@minecraft/photo/7369296852669205791", "tiktok", KIND_PHOTO, "7369296852669205791"),
+        ("https://www.tiktok.com/@taylorswift", "tiktok", KIND_USER, "taylorswift"),
+        ("https://www.tiktok.com/t/ZTRav7308/", "tiktok", KIND_SHORT, None),
+        ("https://vt.tiktok.com/ZSxxxx/", "tiktok", KIND_SHORT, None),
+        ("https://www.bilibili.com/video/BV1M1421t7hT/?spm_id_from=333", "bilibili", KIND_VIDEO, "BV1M1421t7hT"),
+        ("https://b23.tv/abcdef", "bilibili", KIND_SHORT, None),
+        ("https://space.bilibili.com/12345", "bilibili", KIND_PAGE, None),
+        ("https://www.douyin.com/user/self?showTab=like", "douyin", KIND_PAGE, None),
+        ("https://www.douyin.com/user/self", "douyin", KIND_PAGE, None),
+        ("https://www.douyin.com/user/selfie_fan", "douyin", KIND_USER, "selfie_fan"),
+    ],
+)
+def test_route_url_offline(url, platform, kind, id_):
+    routed = route_url(url)
+    assert routed is not None
+    assert (routed.platform, routed.kind, routed.id) == (platform, kind, id_)
+
+
+def test_route_url_extracts_from_share_text():
+    text = "7.43 复制打开抖音，看看【作品】 https://www.douyin.com/video/7298145681699622182 太好看了"
+    routed = route_url(text)
+    assert routed.url == "https://www.douyin.com/video/7298145681699622182"
+    assert routed.post_id == "7298145681699622182"
+
+
+@pytest.mark.parametrize(
+    "url",
+    [
+        "https://example.com/?q=www.douyin.com/video/123",
+        "https://douyin.com.evil.example/video/123",
+        "not a url",
+        None,
+    ],
+)
+def test_route_url_rejects_unsupported(url):
+    assert route_url(url) is None
+
+
+def test_user_link_has_no_post_id():
+    assert route_url("https://www.douyin.com/user/MS4wLjABAAAAabc").post_id is None
+
+
+def test_canonical_links_skip_network(monkeypatch):
+    # 规范链接不应创建任何 HTTP 客户端
+    import httpx
+
+    def _fail(*args, **kwargs):
+        raise AssertionError("network access is not expected")
+
+    monkeypatch.setattr(httpx, "AsyncClient", _fail)
+
+    from crawlers.douyin.web.utils import AwemeIdFetcher as DouyinAwemeIdFetcher
+    from crawlers.tiktok.web.utils import AwemeIdFetcher as TikTokAwemeIdFetcher
+    from crawlers.hybrid.hybrid_crawler import HybridCrawler
+
+    assert asyncio.run(DouyinAwemeIdFetcher.get_aweme_id("https://www.douyin.com/video/7298145681699622182")) == "7298145681699622182"
+    assert asyncio.run(TikTokAwemeIdFetcher.get_aweme_id("https://www.tiktok.com/@a/video/7360734489271700753")) == "7360734489271700753"
+    assert asyncio.run(HybridCrawler().get_bilibili_bv_id("https://www.bilibili.com/video/BV1M1421t7hT")) == "BV1M1421t7hT"
@@ -11,6 +11,8 @@ class _DummyResponse:
     def __init__(self, url: str, status_code: int = 200):
         self.url = url
         self.status_code = status_code
+        self.headers = {}
+        self.is_redirect = False
 
     def raise_for_status(self):
         if not (200 <= self.status_code < 400):
@@ -31,6 +33,19 @@ class _DummyAsyncClient:
         # 返回最终 live 页面 URL 模拟
         return self._response
 
+    def stream(self, method, url, follow_redirects=False):
+        # 逐跳解析重定向时以流式请求读取响应头
+        response = self._response
+
+        class _Stream:
+            async def __aenter__(self):
+                return response
+
+            async def __aexit__(self, exc_type, exc, tb):
+                return False
+
+        return _Stream()
+
 
 def test_get_webcast_id_from_live_numeric(monkeypatch):
     # 模拟请求到最终 live 页面